@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+from itertools import islice
+
+# Numeric fields of a field profile and the aliases accepted for each
+PROFILE_NUMBERS = {
+    'ph': ('ph', 'ph_level'),
+    'nitrogen': ('nitrogen', 'N'),
+    'phosphorus': ('phosphorus', 'P'),
+    'potassium': ('potassium', 'K'),
+    'rainfall': ('rainfall',),
+    'temperature': ('temperature',),
+    'humidity': ('humidity',),
+}
+REQUIRED_NUMBERS = ('ph', 'rainfall', 'temperature')
+
+
+def iter_json_rows(data):
+    """Rows from an already decoded JSON array"""
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON array of field profiles')
+    return iter(data)
+
+
+def iter_ndjson_rows(stream):
+    """Rows from a newline-delimited JSON byte stream, decoded one line at a time"""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            # Let the row be reported as invalid instead of aborting the stream
+            yield None
+
+
+def iter_csv_rows(stream):
+    """Rows from a CSV byte stream with a header line"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    for row in csv.DictReader(text):
+        yield row
+
+
+def parse_profile(row):
+    """
+    Validate one raw row into a field profile.
+    Raises ValueError with a readable message when the row is unusable.
+    """
+    if not isinstance(row, dict):
+        raise ValueError('Each field profile must be an object')
+
+    soil_type = (row.get('soil_type') or '').strip()
+    if not soil_type:
+        raise ValueError('soil_type is required')
+
+    profile = {
+        'state': (row.get('state') or '').strip(),
+        'district': (row.get('district') or '').strip(),
+        'soil_type': soil_type,
+    }
+    for field, aliases in PROFILE_NUMBERS.items():
+        raw = next((row[name] for name in aliases if row.get(name) not in (None, '')), None)
+        if raw is None:
+            if field in REQUIRED_NUMBERS:
+                raise ValueError(f'{field} is required')
+            profile[field] = None
+            continue
+        try:
+            profile[field] = float(raw)
+        except (TypeError, ValueError):
+            raise ValueError(f'{field} must be a number')
+    return profile
+
+
+def chunked(iterable, size):
+    """Yield lists of at most size items without materialising the whole input"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,275 @@
+"""
+Benchmarks for the scoring functions, the Flask routes and model loading.
+
+    python benchmark.py                         # run everything, write benchmark_results.json
+    python benchmark.py --save-baseline         # also store the run as the baseline
+    python benchmark.py --baseline benchmark_baseline.json --threshold 0.25
+
+With a baseline, the run fails (exit code 1) when any benchmark's median
+time is more than threshold (a fraction) slower than its baseline median.
+"""
+import argparse
+import json
+import platform
+import random
+import re
+import statistics
+import sys
+import time
+from datetime import datetime
+
+DEFAULT_OUTPUT = 'benchmark_results.json'
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+BATCH_SIZES = (1, 100, 10000)
+
+CSRF_PATTERN = re.compile(r'name="csrf_token" type="hidden" value="([^"]+)"')
+
+
+def measure(func, min_time=0.2, min_runs=5, max_runs=100000):
+    """Call func repeatedly and summarize per-call wall time in microseconds"""
+    timings = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < max_runs and (len(timings) < min_runs or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+    median = statistics.median(timings)
+    return {
+        'runs': len(timings),
+        'median_us': round(median, 3),
+        'p95_us': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        'min_us': round(timings[0], 3),
+    }
+
+
+def field_profiles(n, seed=1):
+    rng = random.Random(seed)
+    return [{
+        'soil_type': rng.choice(['sandy', 'loamy', 'black cotton', 'red', 'clay']),
+        'ph_level': round(rng.uniform(4.5, 9.0), 1),
+        'rainfall': rng.randint(100, 1200),
+        'temperature': round(rng.uniform(15, 42), 1),
+    } for _ in range(n)]
+
+
+def farmers(n, seed=2):
+    rng = random.Random(seed)
+    return [{
+        'land_ownership': rng.choice(['own', 'lease', 'none']),
+        'caste_category': rng.choice(['general', 'obc', 'sc', 'st']),
+        'annual_income': rng.randint(0, 600000),
+        'age': rng.randint(18, 90),
+        'bank_account': rng.random() < 0.9,
+        'aadhaar_linked': rng.random() < 0.8,
+    } for _ in range(n)]
+
+
+DISASTER_INPUT = {
+    'state': 'Kerala', 'district': 'Wayanad', 'crop_type': 'rice', 'growth_stage': 'sowing',
+    'soil_moisture': 'wet', 'weather_forecast': 'heavy_rain', 'temperature': 31,
+    'pest_infestation': True, 'disease_signs': False, 'weed_problem': True, 'observations': '',
+}
+
+ROUTE_FORMS = {
+    'market_price': ('/market-price', {
+        'crop': 'rice', 'variety': 'Sona Masuri', 'quantity': '20',
+        'location': 'Guntur', 'harvest_date': '2025-11-01',
+    }),
+    'crop_recommendation': ('/crop-recommendation', {
+        'state': 'Andhra Pradesh', 'district': 'Guntur', 'soil_type': 'loamy', 'ph_level': '6.8',
+        'nitrogen': '90', 'phosphorus': '42', 'potassium': '43', 'rainfall': '600',
+        'temperature': '27', 'humidity': '70', 'irrigation': 'yes',
+    }),
+    'schemes': ('/schemes', {
+        'name': 'Ravi', 'age': '45', 'gender': 'male', 'state': 'Andhra Pradesh', 'district': 'Guntur',
+        'land_ownership': 'own', 'land_size': '2.5', 'annual_income': '120000', 'caste_category': 'obc',
+        'bank_account': 'yes', 'aadhaar_linked': 'yes',
+    }),
+    'disaster': ('/disaster', {
+        'state': 'Kerala', 'district': 'Wayanad', 'crop_type': 'rice', 'growth_stage': 'sowing',
+        'soil_moisture': 'wet', 'weather_forecast': 'heavy_rain', 'temperature': '31',
+    }),
+}
+
+
+def function_benchmarks():
+    from crop_scoring import score_crop_batch
+    from scheme_rules import bulk_eligibility
+    from districts import district_index
+    from app import (get_crop_recommendation, check_scheme_eligibility, predict_disaster_risk,
+                     get_historical_prices, cached_crop_recommendation, cached_scheme_eligibility)
+    import pandas as pd
+
+    single_profile = field_profiles(1)[0]
+    single_farmer = farmers(1)[0]
+    cases = {
+        'get_crop_recommendation': lambda: get_crop_recommendation(**single_profile),
+        'check_scheme_eligibility': lambda: check_scheme_eligibility(single_farmer),
+        'cached_crop_recommendation': lambda: cached_crop_recommendation(**single_profile),
+        'cached_scheme_eligibility': lambda: cached_scheme_eligibility(single_farmer),
+        'predict_disaster_risk': lambda: predict_disaster_risk(DISASTER_INPUT),
+        'get_historical_prices': lambda: get_historical_prices('rice', 'Guntur'),
+        'district_complete': lambda: district_index().complete('kham'),
+        'district_resolve': lambda: district_index().resolve('East Khasi Hills', 'Meghalaya'),
+    }
+    # The same disaster forest through sklearn and as node arrays
+    from forest_export import CompactForest
+    from model_registry import ModelRegistry
+    forest = ModelRegistry(compact=False).model('disaster')
+    compact = CompactForest.from_sklearn(forest)
+    month_row = [[100.0] * forest.n_features_in_]
+    month_frame = pd.DataFrame(month_row, columns=list(forest.feature_names_in_))
+    cases['forest_proba[sklearn]'] = lambda: forest.predict_proba(month_frame)
+    cases['forest_proba[compact]'] = lambda: compact.predict_proba(month_row)
+    for size in BATCH_SIZES:
+        profiles = field_profiles(size)
+        registry = pd.DataFrame(farmers(size))
+        cases[f'score_crop_batch[{size}]'] = lambda profiles=profiles: score_crop_batch(profiles)
+        cases[f'bulk_eligibility[{size}]'] = lambda registry=registry: bulk_eligibility(registry)
+    return cases
+
+
+def route_benchmarks():
+    from app import app
+
+    client = app.test_client()
+    cases = {}
+    for name, (path, form) in ROUTE_FORMS.items():
+        cases[f'GET {path}'] = lambda path=path: _expect_ok(client.get(path))
+
+        def post(path=path, form=form):
+            # Fetch the form first so the POST carries a valid CSRF token, like a browser
+            # would; POST timings therefore include that GET
+            page = client.get(path).get_data(as_text=True)
+            token = CSRF_PATTERN.search(page)
+            _expect_ok(client.post(path, data={**form, 'csrf_token': token.group(1) if token else ''}))
+
+        cases[f'POST {path}'] = post
+    cases['GET /api/districts'] = lambda: _expect_ok(client.get('/api/districts?q=gun'))
+    cases['GET /api/schemes/pm-kisan/top'] = lambda: _expect_ok(
+        client.get('/api/schemes/pm-kisan/top?k=10&metric=growth&from=15'))
+    return cases
+
+
+def _expect_ok(response):
+    if response.status_code != 200:
+        raise RuntimeError(f'{response.request.path} returned {response.status_code}')
+    return response
+
+
+def model_benchmarks():
+    from model_registry import ModelRegistry, registry
+
+    cases = {}
+    for name in registry.names():
+        cases[f'model_load_cold[{name}]'] = lambda name=name: ModelRegistry().get(name)
+        registry.get(name)
+        cases[f'model_load_warm[{name}]'] = lambda name=name: registry.get(name)
+    return cases
+
+
+def weather_benchmarks(districts=50, latency=0.02):
+    from weather import HttpWeatherProvider, ReplayServer, WeatherService, mock_forecast
+
+    # Recorded forecasts served with a fixed per-request latency, standing in for the provider
+    server = ReplayServer({('Kerala', f'District {i}'): mock_forecast() for i in range(districts)},
+                          latency=latency).start()
+    keys = [('Kerala', f'District {i}') for i in range(districts)]
+    service = WeatherService(HttpWeatherProvider(server.url))
+    service.prefetch(keys)
+    return {
+        f'weather_prefetch[{districts}]': lambda: service.prefetch(keys),
+        'weather_forecast_cached': lambda: service.forecast('Kerala', 'District 0'),
+    }
+
+
+SUITES = {
+    'functions': function_benchmarks,
+    'routes': route_benchmarks,
+    'models': model_benchmarks,
+    'weather': weather_benchmarks,
+}
+
+
+def run(suites=None, pattern=None, min_time=0.2):
+    results = {}
+    for suite in suites or SUITES:
+        for name, func in SUITES[suite]().items():
+            if pattern and not re.search(pattern, name):
+                continue
+            func()  # warm-up call, also surfaces errors before timing
+            results[name] = measure(func, min_time=min_time)
+            print(f"{name:45s} median {results[name]['median_us']:12.1f} us  "
+                  f"p95 {results[name]['p95_us']:12.1f} us  ({results[name]['runs']} runs)")
+    return {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Benchmarks whose median regressed by more than threshold relative to the baseline"""
+    regressions = []
+    for name, result in current['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if not before or not before.get('median_us'):
+            continue
+        ratio = result['median_us'] / before['median_us']
+        if ratio > 1 + threshold:
+            regressions.append({
+                'name': name,
+                'baseline_us': before['median_us'],
+                'current_us': result['median_us'],
+                'ratio': round(ratio, 3),
+            })
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark scoring functions, routes and model loading')
+    parser.add_argument('--suite', action='append', choices=list(SUITES), help='Suite to run (repeatable)')
+    parser.add_argument('--filter', help='Only run benchmarks whose name matches this regex')
+    parser.add_argument('--min-time', type=float, default=0.2, help='Seconds to spend timing each benchmark')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='Where to write the results JSON')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Allowed slowdown of the median as a fraction of the baseline')
+    parser.add_argument('--save-baseline', action='store_true', help='Also write this run to the baseline file')
+    args = parser.parse_args(argv)
+
+    current = run(args.suite, args.filter, args.min_time)
+    with open(args.output, 'w') as f:
+        json.dump(current, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"No baseline at {args.baseline}; skipping regression check")
+        return 0
+
+    regressions = compare(current, baseline, args.threshold)
+    for item in regressions:
+        print(f"REGRESSION {item['name']}: {item['baseline_us']:.1f} us -> {item['current_us']:.1f} us "
+              f"({item['ratio']:.2f}x)")
+    if regressions:
+        return 1
+    print(f"No regressions beyond {args.threshold:.0%} of baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
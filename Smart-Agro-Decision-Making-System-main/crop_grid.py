@@ -0,0 +1,132 @@
+"""
+Precomputed lookup table for the rule-based crop scorer.
+
+A crop's score changes only where pH, rainfall or temperature crosses one of
+its range edges (the full-credit bounds and the margins around them). Along
+each axis, the m distinct edges split the line into 2m + 1 regions: the edges
+themselves and the open intervals between them. Every value in a region scores
+the same. Regions that give every crop the same points are merged into one
+class, so the table holds one cell per (pH class, rainfall class, temperature
+class). For each soil signature (the set of crops whose soil list matches),
+a cell holds the id of its ranked crop list. Identical lists share an id.
+
+A lookup is a bisect per axis and one array index, and gives exactly what
+crop_scoring.score_crop_batch gives. The grid is rebuilt with the
+CropMatrix, i.e. whenever the knowledge base is reloaded.
+"""
+import threading
+from bisect import bisect_left
+
+import numpy as np
+
+from crop_scoring import MIN_SCORE, crop_matrix
+
+
+def region_values(breakpoints):
+    """One value from each of the 2m + 1 regions: below, at and between the breakpoints"""
+    values = []
+    for i, point in enumerate(breakpoints):
+        if i == 0:
+            values.append(point - 1 - abs(point))
+        else:
+            values.append(breakpoints[i - 1] + (point - breakpoints[i - 1]) / 2)
+        values.append(point)
+    values.append(breakpoints[-1] + 1 + abs(breakpoints[-1]))
+    return np.array(values, dtype=np.float64)
+
+
+def region(breakpoints, value):
+    """Index of the region value falls in; NaN falls below every breakpoint and scores nothing"""
+    pos = bisect_left(breakpoints, value)
+    if pos < len(breakpoints) and breakpoints[pos] == value:
+        return 2 * pos + 1
+    return 2 * pos
+
+
+class CropGrid:
+    """Ranked crop lists for every soil signature and (pH, rainfall, temperature) region"""
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+        self.breakpoints = []
+        self.region_class = []
+        axis_points = []
+        for d in range(3):
+            edges = np.unique(np.concatenate([matrix.lo[d], matrix.low[d], matrix.high[d], matrix.hi[d]]))
+            v = region_values(edges)[:, None]
+            full = (matrix.low[d] <= v) & (v <= matrix.high[d])
+            partial = ((matrix.lo[d] <= v) & (v < matrix.low[d])) | ((matrix.high[d] < v) & (v <= matrix.hi[d]))
+            points, region_class = np.unique(full * 2 + partial, axis=0, return_inverse=True)
+            self.breakpoints.append(edges.tolist())
+            self.region_class.append(region_class.ravel().tolist())
+            axis_points.append(points)
+
+        # Range points of every crop in every cell, (ph classes, rain classes, temp classes, n_crops)
+        ph, rain, temp = axis_points
+        self.range_points = ph[:, None, None, :] + rain[None, :, None, :] + temp[None, None, :, :]
+
+        self.rankings = []
+        self._ranking_ids = {}
+        self._tables = {}
+        self._soil_tables = {}
+        self._lock = threading.Lock()
+
+    @property
+    def shape(self):
+        return self.range_points.shape[:3]
+
+    def _build(self, mask):
+        # Same sum and stable tie order as CropMatrix.score and CropMatrix.rank
+        scores = mask * 3 + self.range_points + self.matrix.drought_bonus
+        order = np.argsort(-scores, axis=-1, kind='stable')
+        ranked = np.take_along_axis(scores, order, axis=-1) >= MIN_SCORE
+        table = np.empty(self.shape, dtype=np.int32)
+        for cell in np.ndindex(*self.shape):
+            ranking = tuple(order[cell][ranked[cell]].tolist())
+            ranking_id = self._ranking_ids.get(ranking)
+            if ranking_id is None:
+                ranking_id = self._ranking_ids[ranking] = len(self.rankings)
+                self.rankings.append(tuple({
+                    'name': self.matrix.names[i],
+                    'description': self.matrix.descriptions[i]
+                } for i in ranking))
+            table[cell] = ranking_id
+        return table
+
+    def table(self, soil_type):
+        """Ranking-id table for a normalized soil type, built on first use"""
+        table = self._soil_tables.get(soil_type)
+        if table is None:
+            with self._lock:
+                mask = self.matrix.soil_mask(soil_type)
+                signature = mask.tobytes()
+                table = self._tables.get(signature)
+                if table is None:
+                    table = self._tables[signature] = self._build(mask)
+                self._soil_tables[soil_type] = table
+        return table
+
+    def recommend(self, soil_type, ph_level, rainfall, temperature):
+        """Ranked recommendations for one field, the same as score_crop_batch's"""
+        table = self.table(str(soil_type).lower().strip())
+        cell = tuple(classes[region(points, float(value))] for points, classes, value in zip(
+            self.breakpoints, self.region_class, (ph_level, rainfall, temperature)))
+        return [dict(entry) for entry in self.rankings[table[cell]]]
+
+
+_grid = (None, None)
+_grid_lock = threading.Lock()
+
+
+def crop_grid():
+    """CropGrid for the current CropMatrix, rebuilt when the knowledge base is reloaded"""
+    global _grid
+    matrix = crop_matrix()
+    built_for, grid = _grid
+    if built_for is not matrix:
+        with _grid_lock:
+            built_for, grid = _grid
+            if built_for is not matrix:
+                grid = CropGrid(matrix)
+                _grid = (matrix, grid)
+    return grid
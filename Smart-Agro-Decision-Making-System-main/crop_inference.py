@@ -0,0 +1,215 @@
+import csv
+import logging
+import os
+import queue
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+
+import numpy as np
+
+from model_registry import registry, BASE_DIR
+from shadow import ShadowEvaluator
+
+# Feature order used by train_model.train_crop_recommendation
+CROP_FEATURES = ['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']
+CROP_DATASET = os.path.join(BASE_DIR, 'dataset', 'Crop_recommendation.csv')
+
+# Dataset labels that correspond to crops in the rule-based knowledge base
+LABEL_NAMES = {
+    'chickpea': 'Chickpea (Chana)',
+    'pigeonpeas': 'Pigeon Pea (Arhar/Toor)',
+    'mothbeans': 'Moth Bean',
+    'mungbean': 'Mung Bean (Green Gram)',
+    'kidneybeans': 'Kidney Beans',
+    'blackgram': 'Black Gram',
+}
+
+logger = logging.getLogger(__name__)
+
+_batchers = weakref.WeakSet()
+
+
+def _reset_batchers_after_fork():
+    # The worker thread does not survive fork; let each batcher start a new one on demand
+    for batcher in list(_batchers):
+        batcher._reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_batchers_after_fork)
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row predictions into one batched call.
+
+    The first request to arrive opens a window of window_seconds; every request
+    submitted before it closes (up to max_batch) is predicted together and each
+    caller receives its own row of the result.
+    """
+
+    def __init__(self, predict_batch, window_seconds=0.003, max_batch=64):
+        self.predict_batch = predict_batch
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self._reset()
+        _batchers.add(self)
+
+    def _reset(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_worker(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='crop-microbatcher', daemon=True)
+                    self._thread.start()
+
+    def submit(self, row):
+        """Queue one feature row; returns a Future resolving to its prediction"""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((row, future))
+        return future
+
+    def predict(self, row, timeout=1.0):
+        return self.submit(row).result(timeout=timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window_seconds
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                rows = np.array([row for row, _ in batch], dtype=np.float64)
+                results = self.predict_batch(rows)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+class CropClassifier:
+    """Ranks crops with the trained RandomForest from models/crop/model.joblib"""
+
+    def __init__(self, models=registry, name='crop', window_seconds=0.003, max_batch=64, shadow=None):
+        self.models = models
+        self.name = name
+        self.shadow = shadow
+        self.batcher = MicroBatcher(self._predict_batch, window_seconds, max_batch)
+        self._usable = (None, False)
+
+    def available(self):
+        """True when the stored model was trained on the seven crop features"""
+        try:
+            model = self.models.model(self.name)
+        except Exception:
+            return False  # logged by the registry, which retries once CURRENT changes
+        checked, usable = self._usable
+        if checked is not model:
+            # Checked once per model object, so a hot-swapped version is checked again
+            feature_names = list(getattr(model, 'feature_names_in_', CROP_FEATURES))
+            usable = (hasattr(model, 'predict_proba')
+                      and getattr(model, 'n_features_in_', None) == len(CROP_FEATURES)
+                      and sorted(feature_names) == sorted(CROP_FEATURES))
+            if not usable:
+                logger.warning('Stored %s model was not trained on %s; using rule-based scoring',
+                               self.name, CROP_FEATURES)
+            self._usable = (model, usable)
+        return usable
+
+    def predict_proba(self, rows):
+        """Class probabilities for an (n, 7) array in CROP_FEATURES order"""
+        return model_proba(self.models.model(self.name), rows)
+
+    def _predict_batch(self, rows):
+        # Probabilities and the classes they refer to come from the same model,
+        # even if a new version is swapped in while the batch runs
+        model = self.models.model(self.name)
+        return [(proba, model.classes_) for proba in model_proba(model, rows)]
+
+    def rank(self, features, top_n=5):
+        """
+        Ranked crops for one field, or None when no usable model is available.
+        features maps each name in CROP_FEATURES to a number.
+        """
+        if not self.available():
+            return None
+        row = [float(features[name]) for name in CROP_FEATURES]
+        start = time.perf_counter()
+        proba, classes = self.batcher.predict(row)
+        order = np.argsort(-proba, kind='stable')[:top_n]
+        if self.shadow is not None:
+            self.shadow.observe(row, str(classes[order[0]]), time.perf_counter() - start,
+                                self.models.version(self.name))
+        return [{
+            'label': str(classes[i]),
+            'name': LABEL_NAMES.get(str(classes[i]), str(classes[i]).title()),
+            'probability': float(proba[i])
+        } for i in order if proba[i] > 0]
+
+
+def model_proba(model, rows):
+    """predict_proba over rows in CROP_FEATURES order, reordered to the model's own feature order"""
+    feature_names = getattr(model, 'feature_names_in_', None)
+    if feature_names is not None:
+        import pandas as pd
+        frame = pd.DataFrame(rows, columns=CROP_FEATURES)
+        return model.predict_proba(frame[list(feature_names)])
+    return model.predict_proba(rows)
+
+
+def top_label(loaded, row):
+    """Most probable crop label for one row, used to compare model versions"""
+    proba = model_proba(loaded.model, [row])[0]
+    return str(loaded.model.classes_[np.argmax(proba)])
+
+
+_label_profiles = None
+
+
+def label_profile(label):
+    """Observed temperature, rainfall and pH ranges for a dataset label, for display"""
+    global _label_profiles
+    if _label_profiles is None:
+        ranges = {}
+        with open(CROP_DATASET, newline='') as f:
+            for row in csv.DictReader(f):
+                stats = ranges.setdefault(row['label'], {key: [] for key in ('temperature', 'rainfall', 'ph')})
+                for key in stats:
+                    stats[key].append(float(row[key]))
+        _label_profiles = {
+            name: {
+                'soil': 'Not specified',
+                'temperature': f"{min(stats['temperature']):.0f}-{max(stats['temperature']):.0f}°C",
+                'rainfall': f"{min(stats['rainfall']):.0f}-{max(stats['rainfall']):.0f}mm",
+                'ph_range': f"{min(stats['ph']):.1f}-{max(stats['ph']):.1f}",
+            }
+            for name, stats in ranges.items()
+        }
+    return dict(_label_profiles.get(label, {
+        'soil': 'Not specified',
+        'temperature': 'Not specified',
+        'rainfall': 'Not specified',
+        'ph_range': 'Not specified',
+    }))
+
+
+crop_classifier = CropClassifier(shadow=ShadowEvaluator('crop', top_label))
@@ -0,0 +1,131 @@
+import threading
+
+import numpy as np
+
+import knowledge_base
+
+# Minimum score a crop needs to be recommended (at least one requirement fully met)
+MIN_SCORE = 3
+
+
+class CropMatrix:
+    """
+    Crop requirements laid out as NumPy arrays, one column per crop,
+    so that many field profiles can be scored in a single pass.
+    """
+
+    def __init__(self, crops):
+        crops = list(crops)
+        self.names = [crop.name for crop in crops]
+        self.descriptions = [crop.description for crop in crops]
+        self.soils = [crop.soils for crop in crops]
+
+        ph = np.array([crop.ph_range for crop in crops], dtype=np.float64)
+        rain = np.array([crop.rainfall for crop in crops], dtype=np.float64)
+        temp = np.array([crop.temperature for crop in crops], dtype=np.float64)
+
+        # Full-credit bounds and the partial-credit margins around them
+        self.ph_min, self.ph_max = ph[:, 0], ph[:, 1]
+        self.ph_lo, self.ph_hi = self.ph_min - 0.5, self.ph_max + 0.5
+        self.rain_min, self.rain_max = rain[:, 0], rain[:, 1]
+        self.rain_lo, self.rain_hi = self.rain_min * 0.8, self.rain_max * 1.2
+        self.temp_min, self.temp_max = temp[:, 0], temp[:, 1]
+        self.temp_lo, self.temp_hi = self.temp_min - 2, self.temp_max + 2
+
+        # Stacked as (3, n_crops) in pH, rainfall, temperature order so all three
+        # ranges are checked with one set of comparisons
+        self.lo = np.stack([self.ph_lo, self.rain_lo, self.temp_lo])
+        self.low = np.stack([self.ph_min, self.rain_min, self.temp_min])
+        self.high = np.stack([self.ph_max, self.rain_max, self.temp_max])
+        self.hi = np.stack([self.ph_hi, self.rain_hi, self.temp_hi])
+
+        self.drought_bonus = np.array([2 if crop.drought_tolerant else 0 for crop in crops], dtype=np.int64)
+        self._soil_masks = {}
+
+    def soil_mask(self, soil_type):
+        """Boolean row marking crops whose soil list matches the given soil type"""
+        mask = self._soil_masks.get(soil_type)
+        if mask is None:
+            mask = np.array([any(soil in soil_type for soil in soils) for soils in self.soils])
+            self._soil_masks[soil_type] = mask
+        return mask
+
+    def _range_points(self, values):
+        """
+        2 points inside [low, high], 1 point within the margin on either side.
+        values is (N, 3); returns the (N, n_crops) sum over the three ranges.
+        """
+        v = values[:, :, None]
+        full = (self.low <= v) & (v <= self.high)
+        partial = ((self.lo <= v) & (v < self.low)) | ((self.high < v) & (v <= self.hi))
+        return (full * 2 + partial).sum(axis=1)
+
+    def score(self, soil_types, ph_levels, rainfall, temperature):
+        """
+        Score N field profiles against every crop.
+        Returns an (N, n_crops) integer matrix.
+        """
+        soil_types = [str(soil).lower().strip() for soil in soil_types]
+        values = np.column_stack([
+            np.asarray(ph_levels, dtype=np.float64),
+            np.asarray(rainfall, dtype=np.float64),
+            np.asarray(temperature, dtype=np.float64),
+        ])
+
+        if len(soil_types) == 1:
+            soil_rows = self.soil_mask(soil_types[0])[None, :]
+        else:
+            unique_soils, soil_index = np.unique(np.array(soil_types, dtype=object), return_inverse=True)
+            soil_table = np.array([self.soil_mask(soil) for soil in unique_soils]).reshape(len(unique_soils), -1)
+            soil_rows = soil_table[soil_index.reshape(-1)]
+
+        return soil_rows * 3 + self._range_points(values) + self.drought_bonus
+
+    def rank(self, scores):
+        """Turn a score matrix into ranked recommendation lists, one per profile"""
+        # Stable sort keeps ties in knowledge-base order, like sorted() did
+        order = np.argsort(-scores, axis=1, kind='stable')
+        ranked_scores = np.take_along_axis(scores, order, axis=1)
+        results = []
+        for row_order, row_scores in zip(order, ranked_scores):
+            results.append([{
+                'name': self.names[i],
+                'description': self.descriptions[i]
+            } for i in row_order[row_scores >= MIN_SCORE]])
+        return results
+
+
+_matrix = (None, None)
+_matrix_lock = threading.Lock()
+
+
+def crop_matrix():
+    """CropMatrix for the current knowledge base, rebuilt when the knowledge base is reloaded"""
+    global _matrix
+    kb = knowledge_base.current()
+    built_for, matrix = _matrix
+    if built_for is not kb:
+        with _matrix_lock:
+            built_for, matrix = _matrix
+            if built_for is not kb:
+                matrix = CropMatrix(kb.crops)
+                _matrix = (kb, matrix)
+    return matrix
+
+
+def score_crop_batch(profiles):
+    """
+    Get crop recommendations for many field profiles in one vectorized pass.
+    Each profile is a mapping with soil_type, ph_level, rainfall and temperature.
+    Returns one ranked list per profile, in input order.
+    """
+    if not profiles:
+        return []
+    matrix = crop_matrix()
+    scores = matrix.score(
+        [p['soil_type'] for p in profiles],
+        [float(p['ph_level']) for p in profiles],
+        [float(p['rainfall']) for p in profiles],
+        [float(p['temperature']) for p in profiles]
+    )
+    return matrix.rank(scores)
@@ -0,0 +1,206 @@
+"""
+All-district disaster risk sweep.
+
+Runs the trained disaster model over the monthly rainfall normals of every
+district in one batched prediction and materializes the result as a table
+keyed by canonical district id (see districts.py). Schedule it nightly, for example from cron:
+
+    0 2 * * * cd /path/to/app && python disaster_sweep.py
+
+Each run keeps the previous table and writes the list of districts whose
+risk level changed, which is what alerting should fan out from.
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from districts import district_id
+from model_registry import registry, BASE_DIR
+from feature_store import district_features
+from rainfall_store import district_normals
+
+SWEEP_DIR = os.path.join(BASE_DIR, 'models', 'cache', 'disaster')
+TABLE_FILE = 'risk_table.json'
+PREVIOUS_FILE = 'risk_table.prev.json'
+CHANGES_FILE = 'risk_changes.json'
+
+
+def risk_level(probability):
+    """Map a flood-risk probability to the levels used by the /disaster page"""
+    if probability >= 0.5:
+        return 'High'
+    if probability >= 0.25:
+        return 'Moderate'
+    return 'Low'
+
+
+def _write_json(path, payload):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(payload, f)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def score_districts(models=registry, normals=None, loaded=None):
+    """Flood-risk probability for every district, from one predict_proba call"""
+    import pandas as pd
+
+    normals = normals or district_normals()
+    loaded = loaded or models.get('disaster')
+    features = list(loaded['features'])
+    if all(name in normals.columns for name in features):
+        values = np.column_stack([normals.column(name) for name in features])
+    else:
+        # A model trained on the extended feature set; score the normals as a steady-state year
+        values = district_features(normals, features)
+    frame = pd.DataFrame(values, columns=features)
+    model = loaded.model
+    positive = list(model.classes_).index(1)
+    probabilities = model.predict_proba(frame)[:, positive]
+    return normals.keys(), probabilities
+
+
+def compare_candidate(models, normals, probabilities, primary_seconds):
+    """
+    Shadow-score every district with the CANDIDATE disaster model, if there is one,
+    and report how often its risk level agrees with the current model's.
+    """
+    candidate = models.candidate('disaster')
+    if candidate is None:
+        return None
+    start = time.perf_counter()
+    _, candidate_probabilities = score_districts(models, normals, loaded=candidate)
+    seconds = time.perf_counter() - start
+    agree = sum(risk_level(a) == risk_level(b) for a, b in zip(probabilities, candidate_probabilities))
+    report = {
+        'version': candidate.version,
+        'agreement': round(agree / len(probabilities), 4) if len(probabilities) else None,
+        'primary_seconds': round(primary_seconds, 4),
+        'candidate_seconds': round(seconds, 4),
+    }
+    print(f"Candidate {candidate.version}: risk level agrees for {report['agreement']:.1%} of districts "
+          f"({seconds:.2f}s vs {primary_seconds:.2f}s)")
+    return report
+
+
+def diff_tables(previous, current):
+    """Districts whose risk level differs between two sweeps"""
+    before = {(row['state'], row['district']): row['risk_level'] for row in (previous or {}).get('rows', [])}
+    changes = []
+    for row in current['rows']:
+        old = before.get((row['state'], row['district']))
+        if old != row['risk_level']:
+            changes.append({
+                'state': row['state'],
+                'district': row['district'],
+                'previous': old,
+                'current': row['risk_level'],
+                'flood_probability': row['flood_probability'],
+            })
+    return changes
+
+
+def run_sweep(models=registry, output_dir=SWEEP_DIR, normals=None):
+    """Score all districts, write the risk table and the change list; returns the changes"""
+    start = time.perf_counter()
+    normals = normals or district_normals()
+    keys, probabilities = score_districts(models, normals)
+    primary_seconds = time.perf_counter() - start
+    candidate = compare_candidate(models, normals, probabilities, primary_seconds)
+    table = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'rows': [{
+            'id': district_id(state, district),
+            'state': state,
+            'district': district,
+            'flood_probability': round(float(p), 4),
+            'risk_level': risk_level(p),
+        } for (state, district), p in zip(keys, probabilities)],
+    }
+
+    os.makedirs(output_dir, exist_ok=True)
+    table_path = os.path.join(output_dir, TABLE_FILE)
+    previous = _read_json(table_path)
+    changes = diff_tables(previous, table)
+    if previous is not None:
+        _write_json(os.path.join(output_dir, PREVIOUS_FILE), previous)
+    _write_json(table_path, table)
+    _write_json(os.path.join(output_dir, CHANGES_FILE), {
+        'generated_at': table['generated_at'],
+        'changes': changes,
+        'candidate': candidate,
+    })
+    print(f"Swept {len(table['rows'])} districts in {time.perf_counter() - start:.2f}s; "
+          f"{len(changes)} changed risk level")
+    return changes
+
+
+class RiskTable:
+    """
+    Read side of the sweep: the materialized table as a dict keyed by district
+    id, reloaded when the sweep replaces the file.
+    """
+
+    def __init__(self, path=os.path.join(SWEEP_DIR, TABLE_FILE)):
+        self.path = path
+        self._mtime = None
+        self._rows = {}
+        self.generated_at = None
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            table = _read_json(self.path)
+            if table is None:
+                return
+            self._rows = {row.get('id') or district_id(row['state'], row['district']): row
+                          for row in table['rows']}
+            self.generated_at = table.get('generated_at')
+            self._mtime = mtime
+
+    def lookup(self, district_id):
+        """Swept risk for a canonical district id (see canonical_location), or None"""
+        self._refresh()
+        return self._rows.get(district_id)
+
+
+risk_table = RiskTable()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the all-district disaster risk sweep')
+    parser.add_argument('--every', type=float, default=None,
+                        help='Keep running and repeat the sweep every N hours')
+    args = parser.parse_args()
+    while True:
+        run_sweep()
+        if not args.every:
+            break
+        time.sleep(args.every * 3600)
@@ -0,0 +1,254 @@
+"""
+Canonical districts and free-text district lookup.
+
+The 641 (state, district) pairs in the district rainfall normals are the
+canonical districts; a district's id is "STATE|DISTRICT" as spelled there.
+DistrictIndex maps what people type ("guntur dist", "Odisha / Khurda") onto
+them and serves autocomplete from a prefix trie over every word of every name,
+topped up with trigram matches for misspellings.
+"""
+import re
+import threading
+from collections import Counter
+
+from rainfall_store import district_normals
+
+# Words people add that are not part of the district's name
+NOISE_WORDS = ('DISTRICT', 'DIST', 'DT', 'ZILLA', 'ZILLAH', 'JILLA')
+
+# Current state names -> the spelling used in the rainfall normals; a tuple
+# for a merged territory the normals still list as separate states
+STATE_ALIASES = {
+    'ODISHA': 'ORISSA',
+    'CHHATTISGARH': 'CHATISGARH',
+    'CHHATISGARH': 'CHATISGARH',
+    'CHATTISGARH': 'CHATISGARH',
+    'UTTARAKHAND': 'UTTARANCHAL',
+    'HIMACHAL PRADESH': 'HIMACHAL',
+    'PUDUCHERRY': 'PONDICHERRY',
+    'DAMAN AND DIU': 'DAMAN AND DUI',
+    'DADRA AND NAGAR HAVELI': 'DADAR NAGAR HAVELI',
+    'NCT OF DELHI': 'DELHI',
+    'TELANGANA': 'ANDHRA PRADESH',
+    'LADAKH': 'JAMMU AND KASHMIR',
+    'DADRA AND NAGAR HAVELI AND DAMAN AND DIU': ('DADAR NAGAR HAVELI', 'DAMAN AND DUI'),
+}
+
+# Display names for states whose rainfall-data spelling is out of date
+STATE_LABELS = {
+    'ORISSA': 'Odisha',
+    'CHATISGARH': 'Chhattisgarh',
+    'UTTARANCHAL': 'Uttarakhand',
+    'HIMACHAL': 'Himachal Pradesh',
+    'PONDICHERRY': 'Puducherry',
+    'DAMAN AND DUI': 'Daman and Diu',
+    'DADAR NAGAR HAVELI': 'Dadra and Nagar Haveli',
+}
+
+# Best trigram similarity a fuzzy match needs to count
+RESOLVE_SIMILARITY = 0.5
+COMPLETE_SIMILARITY = 0.3
+
+_SEPARATORS = re.compile(r'[^A-Z0-9]+')
+
+
+def clean(text):
+    """Upper-case words of a place name with punctuation, '&' and noise words normalized"""
+    words = _SEPARATORS.sub(' ', str(text or '').upper().replace('&', ' AND ')).split()
+    while len(words) > 1 and words[-1] in NOISE_WORDS:
+        words.pop()
+    return ' '.join(words)
+
+
+def title(name):
+    return ' '.join(word.lower() if i and word in ('AND', 'OF') else word.capitalize()
+                    for i, word in enumerate(name.split(' ')))
+
+
+def district_id(state, name):
+    """Canonical id of a district as spelled in the rainfall normals"""
+    return f'{state}|{name}'
+
+
+def trigrams(key):
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class District:
+    __slots__ = ('id', 'state', 'name', 'key', 'state_label', 'district_label', 'label')
+
+    def __init__(self, state, name):
+        self.id = district_id(state, name)
+        self.state = state
+        self.name = name
+        self.key = clean(name)
+        self.state_label = STATE_LABELS.get(state, title(clean(state)))
+        self.district_label = name.title()
+        self.label = f'{self.district_label}, {self.state_label}'
+
+    def as_dict(self):
+        return {'id': self.id, 'state': self.state_label, 'district': self.district_label, 'label': self.label}
+
+    def __repr__(self):
+        return f'District({self.id!r})'
+
+
+class DistrictIndex:
+    """Prefix trie and trigram index over a fixed list of districts"""
+
+    def __init__(self, pairs):
+        self.districts = sorted((District(state, name) for state, name in pairs),
+                                key=lambda d: (d.key, d.state))
+        self.by_key = {}
+        self.by_state = {}
+        for i, district in enumerate(self.districts):
+            self.by_key.setdefault(district.key, []).append(i)
+            self.by_state.setdefault(district.state, []).append(i)
+        self.states = {clean(state): state for state in self.by_state}
+        # The normals truncate long names (KAMRUP METROP); a longer input starting with one still matches
+        longest = max(len(d.name) for d in self.districts)
+        self.truncated = [i for i, d in enumerate(self.districts) if len(d.name) == longest]
+
+        # Trie nodes are dicts of child nodes; the '' entry holds the districts
+        # under that prefix, whole-name matches first, then alphabetical
+        self.trie = {'': {}}
+        for i, district in enumerate(self.districts):
+            words = district.key.split(' ')
+            for w in range(len(words)):
+                node = self.trie
+                for char in ' '.join(words[w:]):
+                    node = node.setdefault(char, {'': {}})
+                    node[''][i] = min(node[''].get(i, 1), 0 if w == 0 else 1)
+        self._freeze(self.trie)
+
+        self.trigrams = [trigrams(d.key) for d in self.districts]
+        postings = {}
+        for i, grams in enumerate(self.trigrams):
+            for gram in grams:
+                postings.setdefault(gram, []).append(i)
+        self.postings = {gram: tuple(ids) for gram, ids in postings.items()}
+
+    def _freeze(self, node):
+        ranks = node['']
+        node[''] = tuple(sorted(ranks, key=lambda i: (ranks[i], i)))
+        for char, child in node.items():
+            if char:
+                self._freeze(child)
+
+    def resolve_states(self, state):
+        """Canonical state names for free text; empty when the state is not recognised"""
+        key = clean(state)
+        key = STATE_ALIASES.get(key, key)
+        keys = key if isinstance(key, tuple) else (key,)
+        return tuple(self.states[k] for k in keys if k in self.states)
+
+    def _in_states(self, states):
+        return {i for state in states for i in self.by_state[state]} if states else None
+
+    def _similar(self, key, candidates, threshold):
+        grams = trigrams(key)
+        shared = Counter()
+        for gram in grams:
+            for i in self.postings.get(gram, ()):
+                shared[i] += 1
+        scored = []
+        for i, count in shared.items():
+            if candidates is None or i in candidates:
+                score = count / (len(grams) + len(self.trigrams[i]) - count)
+                if score >= threshold:
+                    scored.append((-score, i))
+        scored.sort()
+        return scored
+
+    def resolve(self, district, state=None):
+        """
+        The canonical District for free-text input, or None. Tries, in order: the
+        exact name, a name the normals truncated, a unique name prefix, and the
+        closest name by trigram similarity. A recognised state narrows the search.
+        """
+        key = clean(district)
+        if not key:
+            return None
+        states = self.resolve_states(state) if state else ()
+
+        def in_state(ids):
+            return [i for i in ids if not states or self.districts[i].state in states]
+
+        exact = in_state(self.by_key.get(key, ()))
+        if len(exact) == 1:
+            return self.districts[exact[0]]
+        if exact:
+            return None  # the same name in several states and no state to tell them apart
+
+        truncated = in_state(i for i in self.truncated if key.startswith(self.districts[i].key))
+        if len(truncated) == 1:
+            return self.districts[truncated[0]]
+
+        node = self.trie
+        for char in key:
+            node = node.get(char)
+            if node is None:
+                break
+        else:
+            prefixed = in_state(i for i in node[''] if self.districts[i].key.startswith(key))
+            if len(prefixed) == 1:
+                return self.districts[prefixed[0]]
+
+        similar = self._similar(key, self._in_states(states), RESOLVE_SIMILARITY)
+        if not similar or (len(similar) > 1 and similar[0][0] == similar[1][0]):
+            return None
+        return self.districts[similar[0][1]]
+
+    def complete(self, query, state=None, limit=10):
+        """Districts for an autocomplete box: prefix matches on any word, then close spellings"""
+        key = clean(query)
+        if not key:
+            return []
+        states = self.resolve_states(state) if state else ()
+        node = self.trie
+        for char in key:
+            node = node.get(char)
+            if node is None:
+                break
+        matches = []
+        if node is not None:
+            for i in node['']:
+                if not states or self.districts[i].state in states:
+                    matches.append(i)
+                    if len(matches) == limit:
+                        break
+        if len(matches) < limit and len(key) >= 3:
+            seen = set(matches)
+            for _, i in self._similar(key, self._in_states(states), COMPLETE_SIMILARITY):
+                if i not in seen:
+                    matches.append(i)
+                    if len(matches) == limit:
+                        break
+        return [self.districts[i] for i in matches]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def district_index():
+    """Process-wide DistrictIndex over the rainfall normals, built on first use"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = DistrictIndex(district_normals().keys())
+    return _index
+
+
+def canonical_location(state, district):
+    """
+    (state, district, district_id) for form input: the canonical district's
+    display names and id when it can be resolved, otherwise the input with
+    whitespace tidied and None. Join other district data on the id, not the names.
+    """
+    found = district_index().resolve(district, state)
+    if found is None:
+        return ' '.join(str(state or '').split()), ' '.join(str(district or '').split()), None
+    return found.state_label, found.district_label, found.id
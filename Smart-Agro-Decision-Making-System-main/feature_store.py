@@ -0,0 +1,267 @@
+"""
+Rainfall features for the disaster model, computed once per version of the data.
+
+The 1901-2015 subdivision series is laid out as a dense (subdivision, year,
+month) cube. A missing month is filled with that subdivision's mean for the
+month, not a country-wide mean. All features are computed on the whole cube
+at once, with NumPy sliding windows over the flattened monthly series and the
+annual totals:
+
+    JAN..DEC, Jan-Feb, Mar-May, Jun-Sep, Oct-Dec, ANNUAL
+    PEAK_1M, PEAK_3M              wettest month / 3 consecutive months ending in the year
+    LAG1_ANNUAL, LAG1_JUN_SEP     last year's totals
+    ROLL3_ANNUAL, ROLL5_ANNUAL    mean annual total over the previous 3 / 5 years
+    DEP_ANNUAL_PCT, DEP_JUN_SEP_PCT   departure (%) from the district normals
+
+A subdivision's normal is the mean of the normals of the districts in the
+states it covers (SUBDIVISION_STATES). Results are written as one array per
+column to models/cache/features/<hash>.npz, keyed by a hash of both source
+CSVs, so training and batch scoring reuse them until the data changes.
+
+District normals are scored on the same columns as a steady-state year: the
+normal repeated, so lags and rolling means equal the normal and departures are 0.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import warnings
+from contextlib import contextmanager
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from rainfall_store import BASE_DIR, DATASETS, MONTHS, file_sha256, subdivision_rainfall, district_normals
+
+CACHE_DIR = os.path.join(BASE_DIR, 'models', 'cache', 'features')
+FEATURE_VERSION = 1
+
+SEASONS = {'Jan-Feb': (0, 2), 'Mar-May': (2, 5), 'Jun-Sep': (5, 9), 'Oct-Dec': (9, 12)}
+FEATURES = (MONTHS + list(SEASONS) + ['ANNUAL', 'PEAK_1M', 'PEAK_3M', 'LAG1_ANNUAL', 'LAG1_JUN_SEP',
+                                      'ROLL3_ANNUAL', 'ROLL5_ANNUAL', 'DEP_ANNUAL_PCT', 'DEP_JUN_SEP_PCT'])
+
+# Extended disaster-model inputs. The label is the current year's annual total
+# passing a threshold, and the months and season totals still add up to that
+# total, as they do for the monthly model: both describe an observed year rather
+# than forecast one. ANNUAL and DEP_ANNUAL_PCT are left out only so the threshold
+# cannot be read off a single column.
+EXTENDED_FEATURES = [name for name in FEATURES if name not in ('ANNUAL', 'DEP_ANNUAL_PCT')]
+
+# States (as spelled in the district normals) each meteorological subdivision covers
+SUBDIVISION_STATES = {
+    'ANDAMAN & NICOBAR ISLANDS': ('ANDAMAN AND NICOBAR ISLANDS',),
+    'ARUNACHAL PRADESH': ('ARUNACHAL PRADESH',),
+    'ASSAM & MEGHALAYA': ('ASSAM', 'MEGHALAYA'),
+    'NAGA MANI MIZO TRIPURA': ('NAGALAND', 'MANIPUR', 'MIZORAM', 'TRIPURA'),
+    'SUB HIMALAYAN WEST BENGAL & SIKKIM': ('WEST BENGAL', 'SIKKIM'),
+    'GANGETIC WEST BENGAL': ('WEST BENGAL',),
+    'ORISSA': ('ORISSA',),
+    'JHARKHAND': ('JHARKHAND',),
+    'BIHAR': ('BIHAR',),
+    'EAST UTTAR PRADESH': ('UTTAR PRADESH',),
+    'WEST UTTAR PRADESH': ('UTTAR PRADESH',),
+    'UTTARAKHAND': ('UTTARANCHAL',),
+    'HARYANA DELHI & CHANDIGARH': ('HARYANA', 'DELHI', 'CHANDIGARH'),
+    'PUNJAB': ('PUNJAB',),
+    'HIMACHAL PRADESH': ('HIMACHAL',),
+    'JAMMU & KASHMIR': ('JAMMU AND KASHMIR',),
+    'WEST RAJASTHAN': ('RAJASTHAN',),
+    'EAST RAJASTHAN': ('RAJASTHAN',),
+    'WEST MADHYA PRADESH': ('MADHYA PRADESH',),
+    'EAST MADHYA PRADESH': ('MADHYA PRADESH',),
+    'GUJARAT REGION': ('GUJARAT', 'DADAR NAGAR HAVELI', 'DAMAN AND DUI'),
+    'SAURASHTRA & KUTCH': ('GUJARAT',),
+    'KONKAN & GOA': ('MAHARASHTRA', 'GOA'),
+    'MADHYA MAHARASHTRA': ('MAHARASHTRA',),
+    'MATATHWADA': ('MAHARASHTRA',),
+    'VIDARBHA': ('MAHARASHTRA',),
+    'CHHATTISGARH': ('CHATISGARH',),
+    'COASTAL ANDHRA PRADESH': ('ANDHRA PRADESH',),
+    'TELANGANA': ('ANDHRA PRADESH',),
+    'RAYALSEEMA': ('ANDHRA PRADESH',),
+    'TAMIL NADU': ('TAMIL NADU', 'PONDICHERRY'),
+    'COASTAL KARNATAKA': ('KARNATAKA',),
+    'NORTH INTERIOR KARNATAKA': ('KARNATAKA',),
+    'SOUTH INTERIOR KARNATAKA': ('KARNATAKA',),
+    'KERALA': ('KERALA',),
+    'LAKSHADWEEP': ('LAKSHADWEEP',),
+}
+
+
+@contextmanager
+def _all_nan_ok():
+    # nanmean and nanmax warn on all-NaN slices; callers fill those themselves
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        yield
+
+
+def fill_monthly(cube):
+    """NaNs replaced by the same subdivision's mean for that month (the overall month mean if it has none)"""
+    with _all_nan_ok():
+        own = np.nanmean(cube, axis=1, keepdims=True)
+        overall = np.nanmean(cube, axis=(0, 1), keepdims=True)
+    own = np.where(np.isnan(own), overall, own)
+    return np.where(np.isnan(cube), own, cube)
+
+
+def _previous_years(annual, k):
+    """Mean of the k years before each year; NaN where there are fewer than k"""
+    out = np.full_like(annual, np.nan)
+    if annual.shape[1] > k:
+        out[:, k:] = sliding_window_view(annual, k, axis=1).mean(axis=-1)[:, :-1]
+    return out
+
+
+def compute_features(cube, normal):
+    """
+    Feature columns for a filled (n, years, 12) cube of monthly rainfall against
+    (n, 12) monthly normals; returns {name: (n, years) float64 array}.
+    """
+    n, years, _ = cube.shape
+    columns = {month: cube[:, :, m] for m, month in enumerate(MONTHS)}
+    for name, (start, stop) in SEASONS.items():
+        columns[name] = cube[:, :, start:stop].sum(axis=2)
+    annual = columns['ANNUAL'] = cube.sum(axis=2)
+
+    series = cube.reshape(n, years * 12)
+    peak_3m = np.full_like(series, np.nan)
+    peak_3m[:, 2:] = sliding_window_view(series, 3, axis=1).sum(axis=-1)
+    columns['PEAK_1M'] = cube.max(axis=2)
+    with _all_nan_ok():
+        columns['PEAK_3M'] = np.nanmax(peak_3m.reshape(n, years, 12), axis=2)
+
+    columns['LAG1_ANNUAL'] = np.full_like(annual, np.nan)
+    columns['LAG1_ANNUAL'][:, 1:] = annual[:, :-1]
+    columns['LAG1_JUN_SEP'] = np.full_like(annual, np.nan)
+    columns['LAG1_JUN_SEP'][:, 1:] = columns['Jun-Sep'][:, :-1]
+    columns['ROLL3_ANNUAL'] = _previous_years(annual, 3)
+    columns['ROLL5_ANNUAL'] = _previous_years(annual, 5)
+    # The first years have no history; use the subdivision's mean annual total
+    with _all_nan_ok():
+        mean_annual = np.nanmean(annual, axis=1, keepdims=True)
+        mean_monsoon = np.nanmean(columns['Jun-Sep'], axis=1, keepdims=True)
+    for name, fill in (('LAG1_ANNUAL', mean_annual), ('LAG1_JUN_SEP', mean_monsoon),
+                       ('ROLL3_ANNUAL', mean_annual), ('ROLL5_ANNUAL', mean_annual)):
+        columns[name] = np.where(np.isnan(columns[name]), fill, columns[name])
+
+    normal_annual = normal.sum(axis=1, keepdims=True)
+    normal_monsoon = normal[:, 5:9].sum(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        columns['DEP_ANNUAL_PCT'] = (annual - normal_annual) / normal_annual * 100
+        columns['DEP_JUN_SEP_PCT'] = (columns['Jun-Sep'] - normal_monsoon) / normal_monsoon * 100
+    return columns
+
+
+def subdivision_normals(subdivisions, normals, fallback):
+    """(n, 12) normals per subdivision from its states' districts; fallback rows where none match"""
+    months = np.asarray(normals.monthly(), dtype=np.float64)
+    by_state = {}
+    for row, (state, _) in enumerate(normals.keys()):
+        by_state.setdefault(state, []).append(row)
+    result = np.array(fallback, dtype=np.float64, copy=True)
+    for i, subdivision in enumerate(subdivisions):
+        rows = [row for state in SUBDIVISION_STATES.get(subdivision, ()) for row in by_state.get(state, ())]
+        if rows:
+            with _all_nan_ok():
+                mean = np.nanmean(months[rows], axis=0)
+            result[i] = np.where(np.isnan(mean), result[i], mean)
+    return result
+
+
+class FeatureTable:
+    """Feature columns for every (subdivision, year) row of the rainfall series"""
+
+    def __init__(self, subdivisions, years, columns, data_hash=None):
+        self.subdivisions = np.asarray(subdivisions)
+        self.years = np.asarray(years, dtype=np.int64)
+        self.columns = columns
+        self.data_hash = data_hash
+
+    def __len__(self):
+        return len(self.years)
+
+    def matrix(self, names=FEATURES):
+        return np.column_stack([self.columns[name] for name in names])
+
+    def frame(self, names=FEATURES):
+        import pandas as pd
+
+        df = pd.DataFrame({name: self.columns[name] for name in names})
+        df.insert(0, 'SUBDIVISION', self.subdivisions)
+        df.insert(1, 'YEAR', self.years)
+        return df
+
+
+def build_features(table=None, normals=None):
+    """FeatureTable for the rows present in the subdivision series"""
+    table = table or subdivision_rainfall()
+    normals = normals or district_normals()
+    subdivisions = table.key_values[0]
+    year_labels = np.asarray(table.key_values[1], dtype=np.int64)
+    codes = np.asarray(table.key_codes)
+    first_year = int(year_labels.min())
+    n_years = int(year_labels.max()) - first_year + 1
+
+    cube = np.full((len(subdivisions), n_years, 12), np.nan)
+    rows, years = codes[:, 0], year_labels[codes[:, 1]] - first_year
+    cube[rows, years] = np.asarray(table.monthly(), dtype=np.float64)
+    filled = fill_monthly(cube)
+
+    normal = subdivision_normals(subdivisions, normals, fallback=filled.mean(axis=1))
+    columns = compute_features(filled, normal)
+    return FeatureTable(np.asarray(subdivisions)[rows], years + first_year,
+                        {name: values[rows, years].astype(np.float32) for name, values in columns.items()})
+
+
+def data_hash():
+    digest = hashlib.sha256(f'features-{FEATURE_VERSION}'.encode('utf-8'))
+    for spec in DATASETS.values():
+        digest.update(file_sha256(spec['source']).encode('utf-8'))
+    digest.update(json.dumps(SUBDIVISION_STATES, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def load_features(cache_dir=CACHE_DIR):
+    """The FeatureTable for the current CSVs, from the cache or computed and saved"""
+    key = data_hash()
+    path = os.path.join(cache_dir, f'{key}.npz')
+    if os.path.exists(path):
+        with np.load(path, allow_pickle=False) as data:
+            return FeatureTable(data['SUBDIVISION'], data['YEAR'],
+                                {name: data[name] for name in FEATURES}, key)
+    features = build_features()
+    features.data_hash = key
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, SUBDIVISION=features.subdivisions.astype(str), YEAR=features.years, **features.columns)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return features
+
+
+def district_features(normals=None, names=FEATURES, years=6):
+    """(n_districts, len(names)) features for the district normals as a steady-state year"""
+    normals = normals or district_normals()
+    normal = fill_monthly(np.asarray(normals.monthly(), dtype=np.float64)[:, None, :])[:, 0, :]
+    columns = compute_features(np.repeat(normal[:, None, :], years, axis=1), normal)
+    return np.column_stack([columns[name][:, -1] for name in names])
+
+
+_features = None
+_features_lock = threading.Lock()
+
+
+def subdivision_features():
+    """Process-wide FeatureTable, loaded or computed on first use"""
+    global _features
+    if _features is None:
+        with _features_lock:
+            if _features is None:
+                _features = load_features()
+    return _features
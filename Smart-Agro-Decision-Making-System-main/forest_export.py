@@ -0,0 +1,248 @@
+"""
+Compact, array-backed random forests.
+
+A fitted sklearn RandomForestClassifier or RandomForestRegressor is flattened
+into a handful of contiguous arrays covering every node of every tree:
+
+    children    (n_nodes, 2) int32    left and right child; leaves point at themselves
+    feature     (n_nodes,)   int32    feature tested at the node
+    threshold   (n_nodes,)   float32  go left when x <= threshold
+    leaf        (n_nodes,)   int32    row of `values` holding the node's output
+    values      (n_values, n_outputs) float64, one row per distinct leaf output
+
+sklearn compares float32 inputs with float64 thresholds. Each threshold is
+stored as the largest float32 not above it, which sends every float32 input the
+same way. Leaf outputs are kept in float64 and summed tree by tree in order,
+as sklearn does with n_jobs=1, so predictions are bit-identical. Self-looping
+leaves let all trees be walked together, max_depth steps over the whole batch.
+
+train_model.py writes model.npz next to each forest's model.joblib, and
+ModelRegistry loads it in place of the pickle. The npz is stored uncompressed,
+so load(mmap_mode='r') maps the node arrays straight from the file: forked
+workers share those pages, which a pickled sklearn forest cannot do because
+unpickling a Tree copies its node arrays. To convert existing versions:
+
+    python forest_export.py crop market disaster
+"""
+import argparse
+import os
+import struct
+import zipfile
+
+import numpy as np
+
+COMPACT_SUFFIX = '.npz'
+
+
+def compact_path(path):
+    """model.joblib -> model.npz"""
+    return os.path.splitext(path)[0] + COMPACT_SUFFIX
+
+
+def is_forest(model):
+    return (hasattr(model, 'estimators_') and getattr(model, 'n_outputs_', 1) == 1
+            and all(hasattr(tree, 'tree_') for tree in model.estimators_))
+
+
+def _mapped_arrays(path, mode='r'):
+    """
+    Every array in an uncompressed .npz, memory-mapped where it lies inside the
+    archive. 0-d arrays are read normally.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f'{path} is compressed and cannot be memory-mapped')
+            # The member's data follows its local header, whose name and extra
+            # field lengths may differ from the central directory's
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack('<HH', f.read(4))
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(f)
+            read_header = (np.lib.format.read_array_header_1_0 if version == (1, 0)
+                           else np.lib.format.read_array_header_2_0)
+            shape, fortran_order, dtype = read_header(f)
+            name = info.filename[:-len('.npy')] if info.filename.endswith('.npy') else info.filename
+            if shape == () or dtype.hasobject:
+                arrays[name] = np.lib.format.read_array(archive.open(info))
+            else:
+                arrays[name] = np.memmap(f, dtype=dtype, mode=mode, offset=f.tell(), shape=shape,
+                                         order='F' if fortran_order else 'C')
+    return arrays
+
+
+def float32_floor(values):
+    """Largest float32 <= each float64 value"""
+    values = np.asarray(values, dtype=np.float64)
+    rounded = values.astype(np.float32)
+    above = rounded.astype(np.float64) > values
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+class CompactForest:
+    """
+    Node arrays for a whole forest, with the parts of the sklearn forest API the
+    app uses: predict, predict_proba, classes_, n_features_in_ and feature_names_in_.
+    """
+
+    ARRAYS = ('children', 'feature', 'threshold', 'leaf', 'values', 'roots')
+
+    def __init__(self, children, feature, threshold, leaf, values, roots, max_depth,
+                 n_features, classes=None, feature_names=None):
+        self.children = np.ascontiguousarray(children, dtype=np.int32)
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float32)
+        self.leaf = np.ascontiguousarray(leaf, dtype=np.int32)
+        self.values = np.ascontiguousarray(values, dtype=np.float64)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        self.max_depth = int(max_depth)
+        self.n_features_in_ = int(n_features)
+        if classes is not None:
+            self.classes_ = np.asarray(classes)
+        if feature_names is not None:
+            self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+
+    @property
+    def is_classifier(self):
+        return hasattr(self, 'classes_')
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self.ARRAYS)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        if not is_forest(model):
+            raise ValueError(f'{type(model).__name__} is not a single-output forest of decision trees')
+        classifier = hasattr(model, 'classes_')
+        children, feature, threshold, outputs, roots = [], [], [], [], []
+        offset = 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            ids = np.arange(tree.node_count) + offset
+            is_leaf = tree.children_left < 0
+            children.append(np.column_stack([
+                np.where(is_leaf, ids, tree.children_left + offset),
+                np.where(is_leaf, ids, tree.children_right + offset),
+            ]))
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(float32_floor(np.where(is_leaf, 0.0, tree.threshold)))
+            if classifier:
+                # Normalized the way DecisionTreeClassifier.predict_proba does it
+                value = np.ascontiguousarray(tree.value[:, 0, :model.n_classes_])
+                normalizer = value.sum(axis=1)[:, np.newaxis]
+                normalizer[normalizer == 0.0] = 1.0
+                value = value / normalizer
+            else:
+                value = tree.value[:, 0, :]
+            outputs.append(value)
+            roots.append(offset)
+            offset += tree.node_count
+
+        # Internal nodes' outputs are never read; give them row 0 and dedupe the leaves'
+        is_leaf = np.concatenate([tree.tree_.children_left < 0 for tree in model.estimators_])
+        outputs = np.concatenate(outputs)
+        values, inverse = np.unique(outputs[is_leaf], axis=0, return_inverse=True)
+        leaf = np.zeros(offset, dtype=np.int32)
+        leaf[is_leaf] = inverse.ravel()
+        return cls(np.concatenate(children), np.concatenate(feature), np.concatenate(threshold), leaf,
+                   values, roots, max(tree.tree_.max_depth for tree in model.estimators_),
+                   model.n_features_in_, model.classes_ if classifier else None,
+                   getattr(model, 'feature_names_in_', None))
+
+    def save(self, path):
+        meta = {'max_depth': self.max_depth, 'n_features': self.n_features_in_}
+        if self.is_classifier:
+            meta['classes'] = (self.classes_.astype(str) if self.classes_.dtype == object
+                               else self.classes_)
+        if hasattr(self, 'feature_names_in_'):
+            meta['feature_names'] = self.feature_names_in_.astype(str)
+        np.savez(path, **{name: getattr(self, name) for name in self.ARRAYS}, **meta)
+
+    @classmethod
+    def load(cls, path, mmap_mode=None):
+        """Read a saved forest; with mmap_mode the node arrays stay backed by the file"""
+        if mmap_mode:
+            return cls._from_arrays(_mapped_arrays(path, mmap_mode))
+        with np.load(path, allow_pickle=False) as data:
+            return cls._from_arrays({name: data[name] for name in data.files})
+
+    @classmethod
+    def _from_arrays(cls, data):
+        classes = data.get('classes')
+        if classes is not None and classes.dtype.kind == 'U':
+            classes = classes.astype(object)
+        return cls(**{name: data[name] for name in cls.ARRAYS}, max_depth=int(data['max_depth']),
+                   n_features=int(data['n_features']), classes=classes,
+                   feature_names=data.get('feature_names'))
+
+    def apply(self, X):
+        """(n_trees, n_rows) leaf node of every row in every tree"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f'Expected rows of {self.n_features_in_} features, got shape {X.shape}')
+        rows = np.arange(len(X))
+        nodes = np.repeat(self.roots[:, np.newaxis], len(X), axis=1)
+        for _ in range(self.max_depth):
+            go_right = X[rows, self.feature[nodes]] > self.threshold[nodes]
+            nodes = self.children[nodes, go_right.view(np.int8)]
+        return nodes
+
+    def predict_trees(self, X):
+        """(n_trees, n_rows, n_outputs) output of every tree, like each estimator's predict"""
+        return self.values[self.leaf[self.apply(X)]]
+
+    def _mean(self, X):
+        # Summed in tree order from zero and then divided, exactly as sklearn does
+        per_tree = self.predict_trees(X)
+        total = np.zeros(per_tree.shape[1:])
+        for output in per_tree:
+            total += output
+        total /= self.n_trees
+        return total
+
+    def predict_proba(self, X):
+        if not self.is_classifier:
+            raise AttributeError('predict_proba is only available for classifiers')
+        return self._mean(X)
+
+    def predict(self, X):
+        if self.is_classifier:
+            return self.classes_.take(np.argmax(self._mean(X), axis=1))
+        return self._mean(X)[:, 0]
+
+
+def export_forest(model, path):
+    """Write a fitted forest as a CompactForest .npz; returns the CompactForest"""
+    compact = CompactForest.from_sklearn(model)
+    compact.save(path)
+    return compact
+
+
+def main(argv=None):
+    from model_registry import ModelRegistry, read_pointer
+
+    parser = argparse.ArgumentParser(description="Write model.npz next to each model's current model.joblib")
+    parser.add_argument('names', nargs='+')
+    args = parser.parse_args(argv)
+    # Read the pickles themselves, not an existing export
+    models = ModelRegistry(compact=False)
+    for name in args.names:
+        path = models.path(name, 'model', read_pointer(models.models_dir, name))
+        model = models.model(name)
+        if not is_forest(model):
+            print(f'{name}: {type(model).__name__} is not a forest, skipped')
+            continue
+        compact = export_forest(model, compact_path(path))
+        print(f'{name}: {os.path.getsize(path)} -> {os.path.getsize(compact_path(path))} bytes on disk, '
+              f'{compact.n_trees} trees, {len(compact.values)} distinct leaf outputs')
+
+
+if __name__ == '__main__':
+    main()
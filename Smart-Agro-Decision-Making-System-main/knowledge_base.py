@@ -0,0 +1,181 @@
+"""
+Agronomic knowledge base: crop requirements, government schemes and the form
+labels, loaded once from data/knowledge_base.json into frozen records.
+
+current() returns the loaded KnowledgeBase. The file is checked for changes at
+most once per second; a changed file is parsed completely before the new
+knowledge base replaces the old one, so readers always see one consistent
+version. Compiled views (the crop matrix, the scheme rules, response caches)
+rebuild themselves when current() returns a different object.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from types import MappingProxyType
+
+KB_PATH = os.environ.get(
+    'SMART_AGRO_KNOWLEDGE_BASE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'knowledge_base.json'))
+CHECK_INTERVAL = 1.0
+
+logger = logging.getLogger(__name__)
+
+
+class Record:
+    """Immutable record; subclasses list their fields in __slots__"""
+    __slots__ = ()
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            object.__setattr__(self, name, values[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is read-only')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} is read-only')
+
+    def __repr__(self):
+        return f'{type(self).__name__}({getattr(self, "name", "")!r})'
+
+
+class Crop(Record):
+    __slots__ = ('name', 'soils', 'ph_range', 'rainfall', 'temperature', 'drought_tolerant',
+                 'description', 'display')
+
+    @classmethod
+    def from_dict(cls, raw):
+        soils = tuple(raw['soil'])
+        ph_range = tuple(float(v) for v in raw['ph_range'])
+        rainfall = tuple(raw['rainfall'])
+        temperature = tuple(raw['temperature'])
+        return cls(
+            name=raw['name'],
+            soils=soils,
+            ph_range=ph_range,
+            rainfall=rainfall,
+            temperature=temperature,
+            drought_tolerant=bool(raw.get('drought_tolerant', False)),
+            description=raw.get('description', ''),
+            # Strings shown on the recommendation page
+            display=MappingProxyType({
+                'soil': ', '.join(soil.title() for soil in soils),
+                'temperature': f'{temperature[0]}-{temperature[1]}°C',
+                'rainfall': f'{rainfall[0]}-{rainfall[1]}mm',
+                'ph_range': f'{ph_range[0]:.1f}-{ph_range[1]:.1f}',
+                'description': raw.get('description', ''),
+            }),
+        )
+
+
+class Scheme(Record):
+    __slots__ = ('name', 'description', 'eligibility', 'benefits', 'website')
+
+    @classmethod
+    def from_dict(cls, raw):
+        return cls(
+            name=raw['name'],
+            description=raw['description'],
+            eligibility=MappingProxyType({
+                key: tuple(value) if isinstance(value, list) else value
+                for key, value in raw['eligibility'].items()
+            }),
+            benefits=raw['benefits'],
+            website=raw['website'],
+        )
+
+
+class KnowledgeBase(Record):
+    __slots__ = ('version', 'crops', 'crop_index', 'schemes', 'scheme_index', 'labels', 'mtime_ns')
+
+    @classmethod
+    def from_dict(cls, raw, mtime_ns=None):
+        crops = tuple(Crop.from_dict(crop) for crop in raw['crops'])
+        schemes = tuple(Scheme.from_dict(scheme) for scheme in raw['schemes'])
+        return cls(
+            version=raw.get('version'),
+            crops=crops,
+            crop_index=MappingProxyType({crop.name: crop for crop in crops}),
+            schemes=schemes,
+            scheme_index=MappingProxyType({scheme.name: scheme for scheme in schemes}),
+            labels=MappingProxyType({
+                group: MappingProxyType(dict(labels)) for group, labels in raw.get('labels', {}).items()
+            }),
+            mtime_ns=mtime_ns,
+        )
+
+    def crop(self, name):
+        """Crop record by name, or None"""
+        return self.crop_index.get(name)
+
+    def label(self, group, value):
+        """Display label for a form value, e.g. label('crop_type', 'rice') -> 'Rice'"""
+        return self.labels.get(group, {}).get(value)
+
+    def choices(self, group):
+        """(value, label) pairs for a SelectField"""
+        return list(self.labels.get(group, {}).items())
+
+
+def load(path=KB_PATH):
+    """Parse a knowledge base file into a KnowledgeBase"""
+    mtime_ns = os.stat(path).st_mtime_ns
+    with open(path, encoding='utf-8') as f:
+        return KnowledgeBase.from_dict(json.load(f), mtime_ns)
+
+
+class KnowledgeBaseStore:
+    """Holds the current KnowledgeBase and swaps in a new one when the file changes"""
+
+    def __init__(self, path=KB_PATH, check_interval=CHECK_INTERVAL, clock=time.monotonic):
+        self.path = path
+        self.check_interval = check_interval
+        self.clock = clock
+        self._kb = load(path)
+        self._seen_mtime_ns = self._kb.mtime_ns
+        self._checked = clock()
+        self._lock = threading.Lock()
+
+    def current(self):
+        """The loaded knowledge base, reloaded first if the file has changed"""
+        now = self.clock()
+        if now - self._checked >= self.check_interval and self._lock.acquire(blocking=False):
+            try:
+                self._checked = now
+                self._reload_if_changed()
+            finally:
+                self._lock.release()
+        return self._kb
+
+    def _reload_if_changed(self):
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            logger.warning('Knowledge base %s unavailable, keeping version %s: %s', self.path, self._kb.version, e)
+            return
+        if mtime_ns != self._seen_mtime_ns:
+            # Recorded before parsing so a broken file is reported once, not on every check
+            self._seen_mtime_ns = mtime_ns
+            self.reload()
+
+    def reload(self):
+        """Load the file now; a file that fails to parse leaves the current knowledge base in place"""
+        try:
+            kb = load(self.path)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning('Knowledge base %s failed to load, keeping version %s: %s',
+                           self.path, self._kb.version, e)
+            return self._kb
+        self._kb = kb
+        logger.info('Loaded knowledge base version %s', kb.version,
+                    extra={'fields': {'crops': len(kb.crops), 'schemes': len(kb.schemes)}})
+        return kb
+
+
+store = KnowledgeBaseStore()
+
+
+def current():
+    return store.current()
@@ -0,0 +1,181 @@
+import logging
+import threading
+from datetime import date
+
+import numpy as np
+
+from model_registry import registry
+
+# Feature order and season codes used by train_model.train_market_price. The
+# regressor is fitted on the archive's Production column, so it predicts how
+# many tonnes a crop yields over `area` hectares; it says nothing about price.
+MARKET_FEATURES = ['crop', 'district', 'season', 'area']
+PRODUCTION_UNIT = 'tonnes'
+AREA_UNIT = 'hectares'
+SEASON_CODES = {'kharif': 0, 'rabi': 1, 'whole year': 2, 'summer': 3}
+UNKNOWN_SEASON = -1
+DEFAULT_AREA = 1.0
+
+# Percentiles of the per-tree predictions reported as the quote range
+RANGE_PERCENTILES = (10, 90)
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_label(value):
+    return ' '.join(str(value).split()).casefold()
+
+
+def season_for(harvest_date):
+    """Cropping season for a harvest date (a date or YYYY-MM-DD string)"""
+    if isinstance(harvest_date, str):
+        harvest_date = date.fromisoformat(harvest_date.strip())
+    month = harvest_date.month
+    if 6 <= month <= 10:
+        return 'kharif'
+    if month >= 11 or month <= 3:
+        return 'rabi'
+    return 'summer'
+
+
+class EncoderLookup:
+    """
+    A fitted LabelEncoder's classes as a dict from normalized label to code.
+    Unseen labels map to None instead of raising.
+    """
+
+    def __init__(self, encoder):
+        self.labels = [str(label) for label in encoder.classes_]
+        self.codes = {normalize_label(label): code for code, label in enumerate(self.labels)}
+
+    def __len__(self):
+        return len(self.labels)
+
+    def code(self, label):
+        return self.codes.get(normalize_label(label))
+
+
+class MarketPriceModel:
+    """Batch inference over the market production RandomForestRegressor and its label encoders"""
+
+    def __init__(self, models=registry, name='market'):
+        self.models = models
+        self.name = name
+        self._lookups = None
+        self._lookups_for = None
+        self._lock = threading.Lock()
+        self._usable = (None, False)
+
+    def _loaded(self):
+        return self.models.get(self.name)
+
+    def available(self):
+        """True when the stored model is a regressor over the four market features"""
+        try:
+            model = self._loaded().model
+        except Exception:
+            return False  # logged by the registry, which retries once CURRENT changes
+        checked, usable = self._usable
+        if checked is not model:
+            feature_names = list(getattr(model, 'feature_names_in_', MARKET_FEATURES))
+            usable = (hasattr(model, 'predict') and not hasattr(model, 'predict_proba')
+                      and getattr(model, 'n_features_in_', None) == len(MARKET_FEATURES)
+                      and feature_names == MARKET_FEATURES)
+            if not usable:
+                logger.warning('Stored %s model was not trained on %s; market quotes are unavailable',
+                               self.name, MARKET_FEATURES)
+            self._usable = (model, usable)
+        return usable
+
+    def lookups(self):
+        """(crop, district) EncoderLookups, rebuilt only when a different model is loaded"""
+        loaded = self._loaded()
+        if self._lookups_for is not loaded:
+            with self._lock:
+                if self._lookups_for is not loaded:
+                    self._lookups = (EncoderLookup(loaded['crop_encoder']),
+                                     EncoderLookup(loaded['district_encoder']))
+                    self._lookups_for = loaded
+        return self._lookups
+
+    def encode(self, rows):
+        """
+        Feature matrix for (crop, district, season, area) rows, plus a mask of
+        rows whose crop and district were both seen in training and whose area
+        is a positive, finite number.
+        """
+        crops, districts = self.lookups()
+        features = np.zeros((len(rows), len(MARKET_FEATURES)), dtype=np.float64)
+        known = np.ones(len(rows), dtype=bool)
+        for i, (crop, district, season, area) in enumerate(rows):
+            crop_code = crops.code(crop)
+            district_code = districts.code(district)
+            area = float(area)
+            if crop_code is None or district_code is None or not np.isfinite(area) or area <= 0:
+                known[i] = False
+                continue
+            features[i] = (crop_code, district_code,
+                           SEASON_CODES.get(normalize_label(season), UNKNOWN_SEASON), area)
+        return features, known
+
+    def _frame(self, model, features):
+        if getattr(model, 'feature_names_in_', None) is None:
+            return features
+        import pandas as pd
+        return pd.DataFrame(features, columns=MARKET_FEATURES)
+
+    def predict(self, rows):
+        """
+        Production in tonnes for many (crop, district, season, area) rows in one
+        call, as an (n, 3) array of low, mean and high. Rows with an unseen crop or
+        district, or an unusable area, are NaN.
+        """
+        model = self._loaded().model
+        features, known = self.encode(rows)
+        result = np.full((len(rows), 3), np.nan)
+        if known.any():
+            known_features = features[known]
+            result[known, 1] = model.predict(self._frame(model, known_features))
+            if hasattr(model, 'predict_trees'):
+                per_tree = model.predict_trees(known_features)[:, :, 0]
+            else:
+                trees = getattr(model, 'estimators_', None)
+                per_tree = np.stack([tree.predict(known_features) for tree in trees]) if trees else None
+            if per_tree is not None:
+                low, high = np.percentile(per_tree, RANGE_PERCENTILES, axis=0)
+                result[known, 0] = low
+                result[known, 2] = high
+            else:
+                result[known, 0] = result[known, 2] = result[known, 1]
+        return result
+
+    def quote_sheet(self, district, season='whole year', area=DEFAULT_AREA):
+        """
+        Production (tonnes over `area` hectares) and yield per hectare for every
+        known crop in a district, or None when the model is unusable or the
+        district was not in the training data.
+        """
+        if not self.available():
+            return None
+        crops, districts = self.lookups()
+        if districts.code(district) is None:
+            return None
+        rows = [(crop, district, season, area) for crop in crops.labels]
+        predictions = self.predict(rows)
+        return [{
+            'crop': crop,
+            'low': round(float(low), 2),
+            'prediction': round(float(mean), 2),
+            'high': round(float(high), 2),
+            'yield_per_hectare': round(float(mean) / area, 3),
+        } for crop, (low, mean, high) in zip(crops.labels, predictions)]
+
+    def quote(self, crop, district, season='whole year', area=DEFAULT_AREA):
+        """(low, prediction, high) production in tonnes for one crop, or None if it cannot be predicted"""
+        if not self.available():
+            return None
+        low, mean, high = self.predict([(crop, district, season, area)])[0]
+        return None if np.isnan(mean) else (float(low), float(mean), float(high))
+
+
+market_model = MarketPriceModel()
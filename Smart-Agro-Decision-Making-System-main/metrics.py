@@ -0,0 +1,203 @@
+import threading
+from bisect import bisect_left
+from time import perf_counter_ns
+
+from flask import g, request, Response
+
+# Upper bounds in seconds, Prometheus style (an implicit +Inf bucket follows)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+PREFIX = 'smart_agro'
+
+
+class Histogram:
+    """Cumulative-on-render latency histogram with fixed bucket bounds"""
+
+    __slots__ = ('bounds', 'counts', 'total', 'count', '_lock')
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect_left(self.bounds, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += seconds
+            self.count += 1
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.total, self.count
+
+
+class StageTimer:
+    """
+    Per-request stage recorder, used as: with timer('render'): ...
+    Calling it returns the timer itself, so timing a stage allocates nothing;
+    stages are sequential and do not nest.
+    """
+
+    __slots__ = ('records', '_name', '_start')
+
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, name):
+        self._name = name
+        return self
+
+    def __enter__(self):
+        self._start = perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.records.append((self._name, perf_counter_ns() - self._start))
+        return False
+
+
+class Metrics:
+    """
+    Per-route latency histograms and named stage timings.
+
+    Stages only record a timestamp pair while the request runs; histograms are
+    updated once in after_request, so timing a stage costs two clock reads and a
+    list append. Routes fetch the request's timer once with metrics.timer() to
+    keep the context-local lookup off the per-stage path. Results are exposed at /metrics in Prometheus text format and on
+    each response as a Server-Timing header.
+    """
+
+    def __init__(self, app=None):
+        self.routes = {}
+        self.stages = {}
+        self.extra_collectors = []
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+        app.extensions['metrics'] = self
+
+    def timer(self):
+        """The StageTimer of the current request"""
+        return g._metrics_timer
+
+    def _histogram(self, table, key):
+        histogram = table.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = table.setdefault(key, Histogram())
+        return histogram
+
+    def _before_request(self):
+        g._metrics_timer = StageTimer()
+        g._metrics_start = perf_counter_ns()
+
+    def _after_request(self, response):
+        start = g.get('_metrics_start')
+        if start is None:
+            return response
+        elapsed_ns = perf_counter_ns() - start
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        self._histogram(self.routes, (route, request.method)).observe(elapsed_ns / 1e9)
+
+        timings = []
+        for name, stage_ns in g._metrics_timer.records:
+            self._histogram(self.stages, (route, name)).observe(stage_ns / 1e9)
+            timings.append(f'{name};dur={stage_ns / 1e6:.3f}')
+        timings.append(f'total;dur={elapsed_ns / 1e6:.3f}')
+        response.headers['Server-Timing'] = ', '.join(timings)
+        return response
+
+    def render(self):
+        """All metrics in Prometheus text exposition format"""
+        lines = []
+        self._render_histograms(
+            lines, f'{PREFIX}_request_duration_seconds', 'Request latency by route and method',
+            self.routes, ('route', 'method'))
+        self._render_histograms(
+            lines, f'{PREFIX}_stage_duration_seconds', 'Time spent in named stages of a route',
+            self.stages, ('route', 'stage'))
+        for collector in self.extra_collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _render_histograms(lines, name, help_text, table, label_names):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for key, histogram in sorted(table.items()):
+            labels = ','.join(f'{label}="{_escape(value)}"' for label, value in zip(label_names, key))
+            counts, total, count = histogram.snapshot()
+            cumulative = 0
+            for bound, bucket in zip(histogram.bounds, counts):
+                cumulative += bucket
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{{labels}}} {total:.9f}')
+            lines.append(f'{name}_count{{{labels}}} {count}')
+
+    def metrics_view(self):
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def model_collector(models):
+    """Prometheus lines for the model registry's load statistics"""
+    def collect():
+        lines = [
+            f'# HELP {PREFIX}_model_load_seconds Time taken to load each model',
+            f'# TYPE {PREFIX}_model_load_seconds gauge',
+        ]
+        stats = models.stats()
+        for name, item in stats.items():
+            if item['loaded']:
+                lines.append(f'{PREFIX}_model_load_seconds{{model="{name}"}} {item["load_seconds"]:.6f}')
+        lines.append(f'# HELP {PREFIX}_model_resident_bytes RSS growth while loading each model')
+        lines.append(f'# TYPE {PREFIX}_model_resident_bytes gauge')
+        for name, item in stats.items():
+            if item['loaded'] and item['resident_bytes'] is not None:
+                lines.append(f'{PREFIX}_model_resident_bytes{{model="{name}"}} {item["resident_bytes"]}')
+        return lines
+    return collect
+
+
+def cache_collector(caches):
+    """Prometheus lines for named ResponseCache counters"""
+    def collect():
+        lines = []
+        stats = {name: cache.stats() for name, cache in caches.items()}
+        for counter in ('hits', 'misses', 'evictions', 'expirations', 'invalidations'):
+            lines.append(f'# HELP {PREFIX}_cache_{counter}_total Response cache {counter}')
+            lines.append(f'# TYPE {PREFIX}_cache_{counter}_total counter')
+            for name, item in stats.items():
+                lines.append(f'{PREFIX}_cache_{counter}_total{{cache="{name}"}} {item[counter]}')
+        lines.append(f'# HELP {PREFIX}_cache_entries Entries held by each response cache')
+        lines.append(f'# TYPE {PREFIX}_cache_entries gauge')
+        for name, item in stats.items():
+            lines.append(f'{PREFIX}_cache_entries{{cache="{name}"}} {item["size"]}')
+        return lines
+    return collect
+
+
+def log_collector(dropped):
+    """Prometheus lines for log records dropped by a full logging queue"""
+    def collect():
+        return [
+            f'# HELP {PREFIX}_log_records_dropped_total Log records dropped because the writer fell behind',
+            f'# TYPE {PREFIX}_log_records_dropped_total counter',
+            f'{PREFIX}_log_records_dropped_total {dropped()}',
+        ]
+    return collect
+
+
+metrics = Metrics()
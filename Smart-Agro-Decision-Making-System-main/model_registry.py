@@ -0,0 +1,389 @@
+"""
+Trained model artifacts, loaded on first use.
+
+train_model.py publishes each training run into its own directory,
+models/<name>/versions/<version>/, and then points models/<name>/CURRENT at it.
+The pointer is a one-line file replaced atomically, so a reader sees either the
+old version or the new one and never a half-written model. A model without a
+CURRENT pointer is read from the flat models/<name>/ layout.
+
+Running servers notice a changed pointer within SMART_AGRO_MODEL_CHECK_INTERVAL
+seconds (default 5, 0 disables) and load the new version in a background
+thread; requests keep using the old version until the new one is fully loaded.
+A model that fails to load is tried again as soon as its CURRENT pointer
+changes, or after SMART_AGRO_MODEL_RETRY_INTERVAL seconds (default 30), so a
+server started before anything was published picks the model up once it is.
+A CANDIDATE pointer names a version to evaluate in shadow mode (see shadow.py)
+before it is promoted:
+
+    python model_registry.py list crop
+    python model_registry.py promote crop           # CANDIDATE becomes CURRENT
+    python model_registry.py activate crop VERSION  # roll forward or back
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+import weakref
+from datetime import datetime, timezone
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(BASE_DIR, 'models')
+
+CURRENT = 'CURRENT'
+CANDIDATE = 'CANDIDATE'
+VERSIONS_DIR = 'versions'
+CHECK_INTERVAL = float(os.environ.get('SMART_AGRO_MODEL_CHECK_INTERVAL', 5.0))
+RETRY_INTERVAL = float(os.environ.get('SMART_AGRO_MODEL_RETRY_INTERVAL', 30.0))
+# Load a forest's compact model.npz (see forest_export.py) in place of its pickle when present
+COMPACT_MODELS = os.environ.get('SMART_AGRO_COMPACT_MODELS', '1') != '0'
+
+# Artifacts written by train_model.py, by model, as file names inside the model's directory
+ARTIFACTS = {
+    'crop': {
+        'model': 'model.joblib',
+    },
+    'market': {
+        'model': 'model.joblib',
+        'crop_encoder': 'crop_encoder.joblib',
+        'district_encoder': 'district_encoder.joblib',
+    },
+    'disaster': {
+        'model': 'model.joblib',
+        'features': 'features.joblib',
+    },
+}
+
+logger = logging.getLogger(__name__)
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None if it cannot be read"""
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def read_pointer(models_dir, name, pointer=CURRENT):
+    """Version named by a model's pointer file, or None if there is no pointer"""
+    try:
+        with open(os.path.join(models_dir, name, pointer), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def write_pointer(models_dir, name, version, pointer=CURRENT):
+    """Point a model's CURRENT (or CANDIDATE) at an existing version, atomically"""
+    if not os.path.isdir(os.path.join(models_dir, name, VERSIONS_DIR, version)):
+        raise FileNotFoundError(f'{name} has no version {version!r}')
+    path = os.path.join(models_dir, name, pointer)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(version + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def clear_pointer(models_dir, name, pointer=CANDIDATE):
+    try:
+        os.unlink(os.path.join(models_dir, name, pointer))
+    except FileNotFoundError:
+        pass
+
+
+def list_versions(models_dir, name):
+    try:
+        return sorted(entry for entry in os.listdir(os.path.join(models_dir, name, VERSIONS_DIR))
+                      if not entry.startswith('.'))
+    except FileNotFoundError:
+        return []
+
+
+def publish(name, artifacts, models_dir=MODELS_DIR, pointer=CURRENT):
+    """
+    Write artifacts (a dict of artifact key -> object) as a new version of a model
+    and point `pointer` at it. The version directory is filled under a temporary
+    name and renamed into place, so it is complete before anything can see it.
+    Returns the version.
+    """
+    import joblib
+
+    versions_dir = os.path.join(models_dir, name, VERSIONS_DIR)
+    os.makedirs(versions_dir, exist_ok=True)
+    version = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+    staging = os.path.join(versions_dir, f'.{version}.tmp')
+    os.makedirs(staging)
+    for key, value in artifacts.items():
+        path = os.path.join(staging, ARTIFACTS[name][key])
+        joblib.dump(value, path)
+        if key == 'model':
+            from forest_export import compact_path, export_forest, is_forest
+            if is_forest(value):
+                export_forest(value, compact_path(path))
+    os.rename(staging, os.path.join(versions_dir, version))
+    if pointer is not None:
+        write_pointer(models_dir, name, version, pointer)
+    return version
+
+
+class LoadedModel:
+    """A loaded model together with its companion artifacts and load statistics"""
+
+    __slots__ = ('name', 'artifacts', 'load_seconds', 'resident_bytes', 'disk_bytes', 'version')
+
+    def __init__(self, name, artifacts, load_seconds, resident_bytes, disk_bytes, version=None):
+        self.name = name
+        self.artifacts = artifacts
+        self.load_seconds = load_seconds
+        self.resident_bytes = resident_bytes
+        self.disk_bytes = disk_bytes
+        self.version = version
+
+    @property
+    def model(self):
+        return self.artifacts['model']
+
+    def __getitem__(self, key):
+        return self.artifacts[key]
+
+
+_registries = weakref.WeakSet()
+
+
+def _reset_after_fork():
+    # Background swap threads do not survive fork
+    for models in list(_registries):
+        models._swapping = set()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class ModelRegistry:
+    """
+    Loads trained artifacts lazily, on first use, and keeps them until a new
+    version is published.
+
+    Forests exported as compact node arrays (model.npz, see forest_export.py) are
+    memory-mapped, so when the registry is populated before the server forks the
+    workers share those pages instead of each holding a private copy. Pickled
+    artifacts go through joblib with the same mmap_mode, but only plain NumPy arrays
+    in them (such as an encoder's classes_) stay mapped; unpickling an sklearn tree
+    copies its node arrays into private memory.
+    """
+
+    def __init__(self, models_dir=MODELS_DIR, artifacts=ARTIFACTS, mmap_mode='r',
+                 check_interval=CHECK_INTERVAL, clock=time.monotonic, compact=COMPACT_MODELS,
+                 retry_interval=RETRY_INTERVAL):
+        self.models_dir = models_dir
+        self.artifacts = artifacts
+        self.mmap_mode = mmap_mode
+        self.compact = compact
+        self.check_interval = check_interval
+        self.retry_interval = retry_interval
+        self.clock = clock
+        self._loaded = {}
+        self._failed = {}
+        self._candidates = {}
+        self._checked = {}
+        self._swapping = set()
+        self._locks = {name: threading.Lock() for name in artifacts}
+        _registries.add(self)
+
+    def names(self):
+        return list(self.artifacts)
+
+    def path(self, name, artifact='model', version=None):
+        if version is None:
+            return os.path.join(self.models_dir, name, self.artifacts[name][artifact])
+        return os.path.join(self.models_dir, name, VERSIONS_DIR, version, self.artifacts[name][artifact])
+
+    def is_loaded(self, name):
+        return name in self._loaded
+
+    def _pointer_state(self, name):
+        try:
+            stat = os.stat(os.path.join(self.models_dir, name, CURRENT))
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, read_pointer(self.models_dir, name)
+
+    def get(self, name):
+        """
+        Return the LoadedModel for name, loading it on the first call. After a failed
+        load the same error is raised without touching the disk until the pointer
+        changes or retry_interval has passed.
+        """
+        loaded = self._loaded.get(name)
+        if loaded is not None:
+            if self.check_interval and self.clock() - self._checked.get(name, 0.0) >= self.check_interval:
+                self._check(name, loaded)
+            return loaded
+        if name not in self.artifacts:
+            raise KeyError(f'Unknown model: {name}')
+        with self._locks[name]:
+            loaded = self._loaded.get(name)
+            if loaded is None:
+                state = self._pointer_state(name)
+                failed = self._failed.get(name)
+                if failed is not None and failed[0] == state and self.clock() < failed[1]:
+                    raise failed[2].with_traceback(None)
+                self._checked[name] = self.clock()
+                try:
+                    loaded = self._load(name, state[2] if state else None)
+                except Exception as e:
+                    logger.warning('Could not load the %s model, retrying in %ss or when CURRENT changes: %s',
+                                   name, self.retry_interval, e)
+                    self._failed[name] = (state, self.clock() + self.retry_interval, e)
+                    raise
+                self._failed.pop(name, None)
+                self._loaded[name] = loaded
+        return loaded
+
+    def model(self, name):
+        return self.get(name).model
+
+    def version(self, name):
+        loaded = self._loaded.get(name)
+        return loaded.version if loaded is not None else None
+
+    def unload(self, name):
+        self._loaded.pop(name, None)
+        self._candidates.pop(name, None)
+
+    def _check(self, name, loaded):
+        """Start a background swap if the CURRENT pointer has moved"""
+        self._checked[name] = self.clock()
+        try:
+            version = read_pointer(self.models_dir, name)
+        except OSError as e:
+            logger.warning('Could not read the %s model pointer: %s', name, e)
+            return
+        if version is None or version == loaded.version or name in self._swapping:
+            return
+        self._swapping.add(name)
+        threading.Thread(target=self.refresh, args=(name,), name=f'model-swap-{name}', daemon=True).start()
+
+    def refresh(self, name):
+        """
+        Load the version CURRENT points at, if it differs from the loaded one, and
+        swap it in. Requests already holding the old LoadedModel finish with it.
+        Returns True if a new version was swapped in.
+        """
+        try:
+            with self._locks[name]:
+                loaded = self._loaded.get(name)
+                version = read_pointer(self.models_dir, name)
+                if version is None or (loaded is not None and loaded.version == version):
+                    return False
+                try:
+                    fresh = self._load(name, version)
+                except Exception as e:
+                    logger.warning('Could not load %s model version %s, keeping %s: %s',
+                                   name, version, loaded.version if loaded else None, e)
+                    return False
+                self._loaded[name] = fresh
+                logger.info('Swapped %s model from version %s to %s',
+                            name, loaded.version if loaded else None, version)
+                return True
+        finally:
+            self._swapping.discard(name)
+
+    def candidate(self, name):
+        """LoadedModel for the version CANDIDATE points at, or None; loads in the calling thread"""
+        version = read_pointer(self.models_dir, name, CANDIDATE)
+        if version is None:
+            self._candidates.pop(name, None)
+            return None
+        loaded = self._candidates.get(name)
+        if loaded is None or loaded.version != version:
+            loaded = self._load(name, version)
+            self._candidates[name] = loaded
+        return loaded
+
+    def _load(self, name, version=None):
+        import joblib
+
+        rss_before = current_rss()
+        start = time.perf_counter()
+        artifacts = {}
+        disk_bytes = 0
+        for key in self.artifacts[name]:
+            path = self.path(name, key, version)
+            if key == 'model' and self.compact:
+                from forest_export import CompactForest, compact_path
+                if os.path.exists(compact_path(path)):
+                    disk_bytes += os.path.getsize(compact_path(path))
+                    artifacts[key] = CompactForest.load(compact_path(path), mmap_mode=self.mmap_mode)
+                    continue
+            disk_bytes += os.path.getsize(path)
+            artifacts[key] = joblib.load(path, mmap_mode=self.mmap_mode)
+        load_seconds = time.perf_counter() - start
+        rss_after = current_rss()
+        resident_bytes = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+
+        logger.info('Loaded %s model version %s in %.3fs (%s bytes on disk, %s bytes resident)',
+                    name, version, load_seconds, disk_bytes, resident_bytes)
+        return LoadedModel(name, artifacts, load_seconds, resident_bytes, disk_bytes, version)
+
+    def stats(self):
+        """
+        Load time and memory figures for every known model.
+        resident_bytes is RSS growth during the load, so the first model loaded
+        also carries the cost of importing its libraries.
+        """
+        report = {}
+        for name in self.artifacts:
+            loaded = self._loaded.get(name)
+            report[name] = {
+                'loaded': loaded is not None,
+                'version': loaded.version if loaded else None,
+                'load_seconds': loaded.load_seconds if loaded else None,
+                'resident_bytes': loaded.resident_bytes if loaded else None,
+                'disk_bytes': loaded.disk_bytes if loaded else None,
+            }
+        return report
+
+
+registry = ModelRegistry()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Manage versioned model artifacts')
+    parser.add_argument('--models-dir', default=MODELS_DIR)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help='List versions and pointers').add_argument('name', choices=list(ARTIFACTS))
+    commands.add_parser('promote', help='Make the CANDIDATE version CURRENT').add_argument(
+        'name', choices=list(ARTIFACTS))
+    activate = commands.add_parser('activate', help='Point CURRENT at a version')
+    activate.add_argument('name', choices=list(ARTIFACTS))
+    activate.add_argument('version')
+    args = parser.parse_args(argv)
+
+    if args.command == 'list':
+        current = read_pointer(args.models_dir, args.name)
+        candidate = read_pointer(args.models_dir, args.name, CANDIDATE)
+        for version in list_versions(args.models_dir, args.name):
+            marks = [label for label, pointed in ((CURRENT, current), (CANDIDATE, candidate)) if pointed == version]
+            print(version, ' '.join(marks))
+    elif args.command == 'promote':
+        version = read_pointer(args.models_dir, args.name, CANDIDATE)
+        if version is None:
+            parser.error(f'{args.name} has no candidate version')
+        write_pointer(args.models_dir, args.name, version)
+        clear_pointer(args.models_dir, args.name, CANDIDATE)
+        print(f'{args.name}: CURRENT -> {version}')
+    else:
+        write_pointer(args.models_dir, args.name, args.version)
+        print(f'{args.name}: CURRENT -> {args.version}')
+
+
+if __name__ == '__main__':
+    main()
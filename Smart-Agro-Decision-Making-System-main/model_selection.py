@@ -0,0 +1,219 @@
+"""
+Cross-validated hyperparameter search for the forests, weighing serving cost.
+
+Each configuration is scored on k folds by successive halving. Every config is
+fitted on the first fold, only the better half goes on to the next fold, and
+so on, so hopeless configurations are dropped after one fit. Fits run in a
+process pool. The training data and fold indices are written once to
+models/.cv_cache/<hash>/ and memory-mapped by every worker, and reused while
+the data is unchanged. The search stops submitting work when the wall-clock
+budget runs out and decides on what has finished.
+
+Models are served as compact node arrays (see forest_export.py), so each fit
+is also measured that way: median single-row predict latency and array size.
+The winner has the highest
+
+    accuracy - LATENCY_WEIGHT * latency_ms - SIZE_WEIGHT * size_mb
+
+among the configurations that reached the deepest fold. Used by
+`python train_model.py --select`.
+"""
+import hashlib
+import itertools
+import math
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from model_registry import MODELS_DIR
+
+CACHE_DIR = os.path.join(MODELS_DIR, '.cv_cache')
+
+SEARCH_SPACE = {
+    'n_estimators': (25, 50, 100),
+    'max_depth': (None, 10, 20),
+    'max_features': ('sqrt', 'log2', 0.5),
+}
+N_SPLITS = 5
+# Share of configurations kept after each fold
+KEEP_FRACTION = 0.5
+BUDGET_SECONDS = float(os.environ.get('SMART_AGRO_SELECT_BUDGET', 300))
+
+# Accuracy (or R²) points given up per millisecond of latency and per MB of model
+LATENCY_WEIGHT = 0.01
+SIZE_WEIGHT = 0.005
+LATENCY_CALLS = 25
+
+_worker = {}
+
+
+def configurations(space=SEARCH_SPACE, base=None):
+    """Every combination in the search space, each merged over the base params"""
+    names = list(space)
+    return [{**(base or {}), **dict(zip(names, values))} for values in itertools.product(*space.values())]
+
+
+def fold_cache(X, y, classifier, n_splits=N_SPLITS, seed=42, cache_dir=CACHE_DIR):
+    """
+    Directory holding X.npy, y.npy and the test indices of each fold, written on
+    first use for this data and reused after. y is stored as integer codes for classifiers.
+    """
+    from sklearn.model_selection import KFold, StratifiedKFold
+
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    if classifier:
+        y = np.unique(np.asarray(y), return_inverse=True)[1]
+    y = np.ascontiguousarray(y, dtype=np.int64 if classifier else np.float64)
+    digest = hashlib.sha256(f'{X.shape}|{classifier}|{n_splits}|{seed}'.encode('utf-8'))
+    digest.update(X.tobytes())
+    digest.update(y.tobytes())
+    path = os.path.join(cache_dir, digest.hexdigest()[:16])
+    if os.path.exists(os.path.join(path, 'folds.npz')):
+        return path
+
+    splitter = (StratifiedKFold if classifier else KFold)(n_splits=n_splits, shuffle=True, random_state=seed)
+    staging = f'{path}.{os.getpid()}.tmp'
+    os.makedirs(staging, exist_ok=True)
+    np.save(os.path.join(staging, 'X.npy'), X)
+    np.save(os.path.join(staging, 'y.npy'), y)
+    np.savez(os.path.join(staging, 'folds.npz'),
+             *[test for _, test in splitter.split(X, y)])
+    try:
+        os.rename(staging, path)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)  # another run cached the same data first
+    return path
+
+
+def _init_worker(path, classifier):
+    with np.load(os.path.join(path, 'folds.npz')) as folds:
+        tests = [folds[f'arr_{i}'] for i in range(len(folds.files))]
+    _worker.update(X=np.load(os.path.join(path, 'X.npy'), mmap_mode='r'),
+                   y=np.load(os.path.join(path, 'y.npy'), mmap_mode='r'),
+                   tests=tests, classifier=classifier)
+
+
+def _evaluate(index, params, fold):
+    """Fit one configuration on one fold: (index, fold, score, latency_ms, size_bytes)"""
+    from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+    from forest_export import CompactForest
+
+    X, y, test = _worker['X'], _worker['y'], _worker['tests'][fold]
+    train = np.ones(len(y), dtype=bool)
+    train[test] = False
+    estimator = RandomForestClassifier if _worker['classifier'] else RandomForestRegressor
+    model = estimator(**params, n_jobs=1).fit(X[train], y[train])
+    score = model.score(X[test], y[test])
+
+    compact = CompactForest.from_sklearn(model)
+    row = np.asarray(X[test[:1]])
+    timings = []
+    for _ in range(LATENCY_CALLS):
+        start = time.perf_counter()
+        compact.predict(row)
+        timings.append(time.perf_counter() - start)
+    return index, fold, score, float(np.median(timings)) * 1000, compact.nbytes
+
+
+def utility(record, latency_weight=LATENCY_WEIGHT, size_weight=SIZE_WEIGHT):
+    return (record['score'] - latency_weight * record['latency_ms']
+            - size_weight * record['size_bytes'] / 2**20)
+
+
+def select(records, latency_weight=LATENCY_WEIGHT, size_weight=SIZE_WEIGHT):
+    """Best record among those scored on the most folds, or None"""
+    records = [r for r in records if r['folds']]
+    if not records:
+        return None
+    deepest = max(r['folds'] for r in records)
+    return max((r for r in records if r['folds'] == deepest),
+               key=lambda r: (utility(r, latency_weight, size_weight), r['score']))
+
+
+def search(X, y, classifier=True, base=None, space=SEARCH_SPACE, n_splits=N_SPLITS,
+           budget=BUDGET_SECONDS, n_jobs=None, cache_dir=CACHE_DIR):
+    """
+    Successive-halving CV search. Returns {'best': record or None, 'records': [...],
+    'fits': n, 'seconds': s, 'exhausted': bool}; each record has params, folds and
+    mean score, latency_ms and size_bytes over the folds it was scored on.
+    """
+    started = time.monotonic()
+    deadline = started + budget
+    configs = configurations(space, base)
+    path = fold_cache(X, y, classifier, n_splits, (base or {}).get('random_state', 42), cache_dir)
+    workers = n_jobs if n_jobs and n_jobs > 0 else os.cpu_count() or 1
+    results = {i: [] for i in range(len(configs))}
+    active = list(range(len(configs)))
+    fits = 0
+    exhausted = False
+
+    if workers == 1:
+        _init_worker(path, classifier)
+        pool = None
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                   initializer=_init_worker, initargs=(path, classifier))
+    try:
+        for fold in range(n_splits):
+            if pool is None:
+                for i in active:
+                    if time.monotonic() >= deadline:
+                        exhausted = True
+                        break
+                    results[i].append(_evaluate(i, configs[i], fold)[2:])
+                    fits += 1
+            else:
+                pending = {pool.submit(_evaluate, i, configs[i], fold) for i in active}
+                while pending:
+                    done, pending = wait(pending, timeout=max(deadline - time.monotonic(), 0),
+                                         return_when=FIRST_COMPLETED)
+                    for future in done:
+                        i, _, *measured = future.result()
+                        results[i].append(tuple(measured))
+                        fits += 1
+                    if not done:
+                        exhausted = True
+                        for future in pending:
+                            future.cancel()
+                        break
+            if exhausted:
+                break
+            # Successive halving: only the better configurations go on to the next fold
+            keep = max(1, math.ceil(len(active) * KEEP_FRACTION))
+            active = sorted(active, key=lambda i: -np.mean([r[0] for r in results[i]]))[:keep]
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=not exhausted, cancel_futures=True)
+
+    records = []
+    for i, measured in results.items():
+        scores, latencies, sizes = zip(*measured) if measured else ((), (), ())
+        records.append({
+            'params': configs[i],
+            'folds': len(measured),
+            'score': float(np.mean(scores)) if measured else None,
+            'latency_ms': float(np.mean(latencies)) if measured else None,
+            'size_bytes': int(np.mean(sizes)) if measured else None,
+        })
+    return {'best': select(records), 'records': records, 'fits': fits,
+            'seconds': time.monotonic() - started, 'exhausted': exhausted}
+
+
+def best_params(X, y, base, classifier=True, n_jobs=None, budget=BUDGET_SECONDS, cache_dir=CACHE_DIR):
+    """Search and print a summary; returns the winning params, or base if nothing finished"""
+    result = search(X, y, classifier=classifier, base=base, n_jobs=n_jobs, budget=budget, cache_dir=cache_dir)
+    best = result['best']
+    print(f"Model selection: {result['fits']} fits in {result['seconds']:.1f}s"
+          f"{' (budget exhausted)' if result['exhausted'] else ''}")
+    if best is None:
+        print("Model selection: no configuration finished a fold; keeping the default parameters")
+        return base
+    print(f"Selected {best['params']}: score {best['score']:.4f} over {best['folds']} folds, "
+          f"{best['latency_ms']:.3f} ms per row, {best['size_bytes'] / 2**20:.2f} MB")
+    return best['params']
@@ -0,0 +1,224 @@
+"""
+Local mandi price store.
+
+Raw (crop, market, date, price) ticks live in an SQLite file next to daily,
+weekly and monthly rollups. Rollups are updated on every ingest by upserting
+per-batch aggregates, so reads never aggregate raw ticks:
+
+    python price_store.py ingest agmarknet_2015.csv agmarknet_2016.csv
+
+Rollups are also kept for market '*' (all markets of a crop), which is what the
+chart falls back to when a location has no history of its own.
+"""
+import argparse
+import csv
+import io
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB = os.environ.get('SMART_AGRO_PRICE_DB', os.path.join(BASE_DIR, 'dataset', 'mandi_prices.sqlite'))
+
+ALL_MARKETS = '*'
+PERIODS = ('day', 'week', 'month')
+
+# Accepted CSV header names for each tick field, e.g. Agmarknet exports
+COLUMN_ALIASES = {
+    'crop': ('crop', 'commodity'),
+    'market': ('market', 'mandi', 'district', 'district_name'),
+    'date': ('date', 'arrival_date', 'price_date'),
+    'price': ('price', 'modal_price', 'modal price'),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ticks (
+    crop TEXT NOT NULL,
+    market TEXT NOT NULL,
+    date TEXT NOT NULL,
+    price REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rollups (
+    period TEXT NOT NULL,
+    crop TEXT NOT NULL,
+    market TEXT NOT NULL,
+    start TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    total REAL NOT NULL,
+    low REAL NOT NULL,
+    high REAL NOT NULL,
+    PRIMARY KEY (period, crop, market, start)
+) WITHOUT ROWID;
+"""
+
+UPSERT_ROLLUP = """
+INSERT INTO rollups (period, crop, market, start, n, total, low, high)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (period, crop, market, start) DO UPDATE SET
+    n = n + excluded.n,
+    total = total + excluded.total,
+    low = MIN(low, excluded.low),
+    high = MAX(high, excluded.high)
+"""
+
+
+def normalize_name(value):
+    return ' '.join(str(value).split()).lower()
+
+
+def parse_date(text):
+    """ISO (2016-03-14) or Indian day-first (14/03/2016, 14-03-2016) dates"""
+    text = text.strip()
+    for pattern in ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y'):
+        try:
+            return datetime.strptime(text, pattern).date()
+        except ValueError:
+            continue
+    raise ValueError(f'Unrecognized date {text!r}')
+
+
+def period_starts(day):
+    """First day of the day, ISO week (Monday) and month containing day"""
+    return (
+        day,
+        day - timedelta(days=day.weekday()),
+        day.replace(day=1),
+    )
+
+
+def rollup_rows(ticks):
+    """Aggregate (crop, market, date, price) ticks into rollup upsert rows"""
+    groups = {}
+    for crop, market, day, price in ticks:
+        for period, start in zip(PERIODS, period_starts(day)):
+            for name in (market, ALL_MARKETS):
+                key = (period, crop, name, start.isoformat())
+                group = groups.get(key)
+                if group is None:
+                    groups[key] = [1, price, price, price]
+                else:
+                    group[0] += 1
+                    group[1] += price
+                    if price < group[2]:
+                        group[2] = price
+                    if price > group[3]:
+                        group[3] = price
+    return [key + tuple(values) for key, values in groups.items()]
+
+
+class PriceStore:
+    """SQLite-backed price ticks with incrementally maintained rollups"""
+
+    def __init__(self, path=DEFAULT_DB):
+        self.path = path
+        self._local = threading.local()
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def connect(self):
+        """This thread's connection, creating the database on first use"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            connection = sqlite3.connect(self.path)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    def ingest(self, ticks, batch_size=100000):
+        """
+        Append ticks and fold them into the rollups, one transaction per batch.
+        ticks is an iterable of (crop, market, date, price). Returns the count.
+        """
+        connection = self.connect()
+        count = 0
+        batch = []
+        for crop, market, day, price in ticks:
+            if isinstance(day, str):
+                day = parse_date(day)
+            batch.append((normalize_name(crop), normalize_name(market), day, float(price)))
+            if len(batch) >= batch_size:
+                count += self._write(connection, batch)
+                batch = []
+        if batch:
+            count += self._write(connection, batch)
+        return count
+
+    @staticmethod
+    def _write(connection, batch):
+        with connection:
+            connection.executemany(
+                'INSERT INTO ticks (crop, market, date, price) VALUES (?, ?, ?, ?)',
+                [(crop, market, day.isoformat(), price) for crop, market, day, price in batch]
+            )
+            connection.executemany(UPSERT_ROLLUP, rollup_rows(batch))
+        return len(batch)
+
+    def ingest_csv(self, source, batch_size=100000):
+        """Bulk-load a CSV file (path or binary/text file object); returns the tick count"""
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, newline='', encoding='utf-8-sig') as f:
+                return self.ingest(_csv_ticks(f), batch_size)
+        if isinstance(source, io.TextIOBase):
+            return self.ingest(_csv_ticks(source), batch_size)
+        return self.ingest(_csv_ticks(io.TextIOWrapper(source, encoding='utf-8-sig', newline='')), batch_size)
+
+    def history(self, crop, market=ALL_MARKETS, period='month', limit=6):
+        """
+        The latest `limit` rollups, oldest first, as (start date, average, low, high).
+        Reads `limit` rows from the rollup primary key.
+        """
+        if not self.exists():
+            return []
+        rows = self.connect().execute(
+            'SELECT start, total / n, low, high FROM rollups '
+            'WHERE period = ? AND crop = ? AND market = ? ORDER BY start DESC LIMIT ?',
+            (period, normalize_name(crop), normalize_name(market), limit)
+        ).fetchall()
+        return [(date.fromisoformat(start), average, low, high) for start, average, low, high in reversed(rows)]
+
+    def monthly_history(self, crop, market, months=6):
+        """Monthly rollups for a crop at a market, or across all markets if that one has none"""
+        return self.history(crop, market, 'month', months) or self.history(crop, ALL_MARKETS, 'month', months)
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+def _csv_ticks(text_file):
+    reader = csv.DictReader(text_file)
+    header = {normalize_name(name): name for name in reader.fieldnames or []}
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        match = next((header[alias] for alias in aliases if alias in header), None)
+        if match is None:
+            raise ValueError(f'CSV has no {field} column (looked for {", ".join(aliases)})')
+        columns[field] = match
+    for row in reader:
+        price = row[columns['price']].strip()
+        if not price:
+            continue
+        yield row[columns['crop']], row[columns['market']], row[columns['date']], price
+
+
+price_store = PriceStore()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Manage the local mandi price store')
+    subcommands = parser.add_subparsers(dest='command', required=True)
+    ingest = subcommands.add_parser('ingest', help='Bulk-load price CSV files')
+    ingest.add_argument('files', nargs='+')
+    ingest.add_argument('--db', default=DEFAULT_DB)
+    args = parser.parse_args()
+
+    store = PriceStore(args.db)
+    for path in args.files:
+        print(f"Ingested {store.ingest_csv(path)} ticks from {path}")
@@ -0,0 +1,121 @@
+"""
+Streaming ingest of the crop production archive for market model training.
+
+The archive can be larger than memory, so it is never loaded whole. A first
+pass reads only the label columns, in chunks, to fix the crop and district
+encoders. A second pass yields (features, target) chunks with explicit dtypes
+and categorical label columns. The chunk size is derived from a memory ceiling
+and halved whenever the process grows past it:
+
+    SMART_AGRO_TRAIN_MEMORY_MB=2048   # default 2048
+"""
+import os
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import LabelEncoder
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from market_inference import MARKET_FEATURES, SEASON_CODES, UNKNOWN_SEASON, normalize_label
+
+PRODUCTION_CSV = 'dataset/crop_production.csv'
+
+# Only the columns the market model uses are parsed
+DTYPES = {
+    'District_Name': 'category',
+    'Season': 'category',
+    'Crop': 'category',
+    'Area': 'float32',
+    'Production': 'float64',
+}
+LABEL_COLUMNS = ['Crop', 'District_Name']
+
+MEMORY_LIMIT_MB = int(os.environ.get('SMART_AGRO_TRAIN_MEMORY_MB', 2048))
+
+# Rough parse-time cost of one row, text buffers included
+ROW_BYTES = 512
+# Share of the ceiling one chunk may take; the rest is the model and the holdout
+CHUNK_SHARE = 0.25
+MIN_CHUNK_ROWS = 10_000
+
+
+def rss_mb():
+    """Resident memory of this process in MB (the peak where the current figure is unavailable)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, IndexError, AttributeError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else 0.0
+
+
+def chunk_rows(memory_limit_mb=MEMORY_LIMIT_MB):
+    """Rows per chunk for a memory ceiling"""
+    return max(int(memory_limit_mb * 2**20 * CHUNK_SHARE // ROW_BYTES), MIN_CHUNK_ROWS)
+
+
+def read_chunks(path=PRODUCTION_CSV, columns=None, memory_limit_mb=MEMORY_LIMIT_MB):
+    """
+    Typed DataFrame chunks of the archive with incomplete rows dropped. The next
+    chunk is half the size whenever the process is over the ceiling; MemoryError
+    once it is over at the smallest chunk size.
+    """
+    columns = list(columns or DTYPES)
+    rows = chunk_rows(memory_limit_mb)
+    with pd.read_csv(path, usecols=columns, dtype={c: DTYPES[c] for c in columns},
+                     chunksize=rows) as reader:
+        while True:
+            if rss_mb() > memory_limit_mb:
+                if rows == MIN_CHUNK_ROWS:
+                    raise MemoryError(f'Training is using {rss_mb():.0f} MB, over the '
+                                      f'{memory_limit_mb} MB ceiling (SMART_AGRO_TRAIN_MEMORY_MB)')
+                rows = max(rows // 2, MIN_CHUNK_ROWS)
+            try:
+                chunk = reader.get_chunk(rows)
+            except StopIteration:
+                return
+            yield chunk.dropna()
+
+
+def fit_encoders(path=PRODUCTION_CSV, memory_limit_mb=MEMORY_LIMIT_MB):
+    """
+    First pass: (crop encoder, district encoder, usable row count). The encoders
+    are the LabelEncoders a fit over the whole file would give.
+    """
+    vocabularies = {column: set() for column in LABEL_COLUMNS}
+    total = 0
+    for chunk in read_chunks(path, memory_limit_mb=memory_limit_mb):
+        total += len(chunk)
+        for column, vocabulary in vocabularies.items():
+            vocabulary.update(chunk[column].unique())
+    encoders = []
+    for column in LABEL_COLUMNS:
+        encoder = LabelEncoder()
+        encoder.fit(np.array(sorted(vocabularies[column]), dtype=object))
+        encoders.append(encoder)
+    return encoders[0], encoders[1], total
+
+
+def _encode(series, encoder):
+    # Map each category once, then index by the per-row category codes
+    codes = np.searchsorted(encoder.classes_, np.asarray(series.cat.categories, dtype=object))
+    return codes[series.cat.codes.to_numpy()]
+
+
+def training_chunks(crop_encoder, district_encoder, path=PRODUCTION_CSV, memory_limit_mb=MEMORY_LIMIT_MB):
+    """Second pass: (X, y) per chunk, X with the MARKET_FEATURES columns"""
+    for chunk in read_chunks(path, memory_limit_mb=memory_limit_mb):
+        if chunk.empty:
+            continue
+        seasons = chunk['Season'].cat.categories
+        season_codes = np.array([SEASON_CODES.get(normalize_label(s), UNKNOWN_SEASON) for s in seasons])
+        X = pd.DataFrame({
+            'crop': _encode(chunk['Crop'], crop_encoder),
+            'district': _encode(chunk['District_Name'], district_encoder),
+            'season': season_codes[chunk['Season'].cat.codes.to_numpy()],
+            'area': chunk['Area'].to_numpy(),
+        }, columns=MARKET_FEATURES)
+        yield X, chunk['Production'].to_numpy()
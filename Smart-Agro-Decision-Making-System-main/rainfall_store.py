@@ -0,0 +1,244 @@
+import csv
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RAINFALL_DIR = os.path.join(BASE_DIR, 'dataset', 'disastermanagement')
+CACHE_DIR = os.path.join(BASE_DIR, 'models', 'cache', 'rainfall')
+
+MONTHS = ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC']
+
+# Source CSV and the columns that form the lookup key for each dataset
+DATASETS = {
+    'subdivision': {
+        'source': os.path.join(RAINFALL_DIR, 'rainfall in india 1901-2015.csv'),
+        'keys': ('SUBDIVISION', 'YEAR'),
+    },
+    'district': {
+        'source': os.path.join(RAINFALL_DIR, 'district wise rainfall normal.csv'),
+        'keys': ('STATE_UT_NAME', 'DISTRICT'),
+    },
+}
+
+FORMAT_VERSION = 1
+
+
+def normalize_key(value):
+    """Canonical form of a key part: trimmed upper-case text, or an int for years"""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    text = str(value).strip().upper()
+    return int(text) if text.isdigit() else text
+
+
+def _parse_number(text):
+    """CSV cell as float; blanks and NA markers become NaN"""
+    text = text.strip()
+    if not text or text.upper() in ('NA', 'NAN', 'NULL'):
+        return np.nan
+    return float(text)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class RainfallTable:
+    """
+    Monthly rainfall rows in a float32 matrix (memory-mapped from disk) plus a
+    dictionary from (key1, key2) to row number for O(1) lookups.
+    """
+
+    def __init__(self, name, key_names, columns, key_values, key_codes, values):
+        self.name = name
+        self.key_names = tuple(key_names)
+        self.columns = list(columns)
+        self.key_values = [list(values_) for values_ in key_values]
+        self.key_codes = key_codes
+        self.values = values
+        self._column_index = {column: i for i, column in enumerate(self.columns)}
+        month_positions = [self._column_index[month] for month in MONTHS]
+        if month_positions == list(range(month_positions[0], month_positions[0] + len(MONTHS))):
+            self._months = slice(month_positions[0], month_positions[0] + len(MONTHS))
+        else:
+            self._months = month_positions
+        self.index = {
+            (self.key_values[0][a], self.key_values[1][b]): row
+            for row, (a, b) in enumerate(key_codes.tolist())
+        }
+
+    def __len__(self):
+        return len(self.values)
+
+    def keys(self):
+        return list(self.index)
+
+    def row(self, first, second):
+        """Row number for a key pair, or None if it is not in the table"""
+        return self.index.get((normalize_key(first), normalize_key(second)))
+
+    def get(self, first, second, columns=MONTHS):
+        """Values of the requested columns for a key pair, or None if absent"""
+        row = self.row(first, second)
+        if row is None:
+            return None
+        return self.values[row, [self._column_index[column] for column in columns]]
+
+    def monthly(self, first=None, second=None):
+        """The 12 monthly columns, for one key pair or for the whole table"""
+        if first is None:
+            return self.values[:, self._months]
+        row = self.row(first, second)
+        return None if row is None else self.values[row, self._months]
+
+    def column(self, name):
+        return self.values[:, self._column_index[name]]
+
+    def frame(self):
+        """The table as a pandas DataFrame with the original column names"""
+        import pandas as pd
+
+        df = pd.DataFrame(np.asarray(self.values), columns=self.columns)
+        for position, key_name in enumerate(self.key_names):
+            labels = np.array(self.key_values[position])
+            df.insert(position, key_name, labels[self.key_codes[:, position]])
+        return df
+
+
+def _paths(name, cache_dir):
+    return {
+        'meta': os.path.join(cache_dir, f'{name}.json'),
+        'values': os.path.join(cache_dir, f'{name}.npy'),
+        'keys': os.path.join(cache_dir, f'{name}_keys.npy'),
+    }
+
+
+def _atomic_save(path, writer):
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            writer(f)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def build_table(name, source, key_names, cache_dir=CACHE_DIR):
+    """Parse the source CSV once and write the binary store for it"""
+    with open(source, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        key_positions = [header.index(key) for key in key_names]
+        value_positions = [i for i in range(len(header)) if i not in key_positions]
+        columns = [header[i] for i in value_positions]
+
+        key_values = [{} for _ in key_names]
+        codes = []
+        rows = []
+        for record in reader:
+            if not record:
+                continue
+            codes.append([
+                key_values[k].setdefault(normalize_key(record[pos]), len(key_values[k]))
+                for k, pos in enumerate(key_positions)
+            ])
+            rows.append([_parse_number(record[i]) for i in value_positions])
+
+    values = np.array(rows, dtype=np.float32).reshape(len(rows), len(columns))
+    key_codes = np.array(codes, dtype=np.int32).reshape(len(codes), len(key_names))
+
+    os.makedirs(cache_dir, exist_ok=True)
+    paths = _paths(name, cache_dir)
+    _atomic_save(paths['values'], lambda f: np.save(f, values))
+    _atomic_save(paths['keys'], lambda f: np.save(f, key_codes))
+    stat = os.stat(source)
+    meta = {
+        'format': FORMAT_VERSION,
+        'source': os.path.basename(source),
+        'sha256': file_sha256(source),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'key_names': list(key_names),
+        'columns': columns,
+        'key_values': [list(mapping) for mapping in key_values],
+    }
+    _atomic_save(paths['meta'], lambda f: f.write(json.dumps(meta).encode('utf-8')))
+    return meta
+
+
+def _is_current(meta, source, meta_path):
+    """
+    True when the stored table was built from the current contents of source.
+    A touched but unchanged file only refreshes the recorded size and mtime.
+    """
+    if meta.get('format') != FORMAT_VERSION:
+        return False
+    stat = os.stat(source)
+    if meta.get('size') == stat.st_size and meta.get('mtime_ns') == stat.st_mtime_ns:
+        return True
+    if meta.get('sha256') != file_sha256(source):
+        return False
+    meta.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+    _atomic_save(meta_path, lambda f: f.write(json.dumps(meta).encode('utf-8')))
+    return True
+
+
+def load_table(name, cache_dir=CACHE_DIR, mmap_mode='r', source=None):
+    """Open the binary store for a dataset, rebuilding it first if the CSV changed"""
+    spec = DATASETS[name]
+    source = source or spec['source']
+    paths = _paths(name, cache_dir)
+    meta = None
+    if all(os.path.exists(path) for path in paths.values()):
+        with open(paths['meta'], encoding='utf-8') as f:
+            meta = json.load(f)
+        if not _is_current(meta, source, paths['meta']):
+            meta = None
+    if meta is None:
+        meta = build_table(name, source, spec['keys'], cache_dir)
+
+    return RainfallTable(
+        name,
+        meta['key_names'],
+        meta['columns'],
+        meta['key_values'],
+        np.load(paths['keys']),
+        np.load(paths['values'], mmap_mode=mmap_mode),
+    )
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+
+
+def get_table(name):
+    """Process-wide RainfallTable for a dataset, opened on first use"""
+    table = _tables.get(name)
+    if table is None:
+        with _tables_lock:
+            table = _tables.get(name)
+            if table is None:
+                table = _tables[name] = load_table(name)
+    return table
+
+
+def subdivision_rainfall():
+    """Monthly rainfall per (subdivision, year), 1901-2015"""
+    return get_table('subdivision')
+
+
+def district_normals():
+    """Monthly rainfall normals per (state, district)"""
+    return get_table('district')
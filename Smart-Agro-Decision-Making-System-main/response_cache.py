@@ -0,0 +1,131 @@
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+# Quantization steps for crop recommendation inputs
+PH_STEP = 0.1
+RAINFALL_STEP = 10
+TEMPERATURE_STEP = 0.5
+
+
+def snap(value, step):
+    """Round value to the nearest multiple of step (as a clean float, e.g. 6.3 not 6.300000000000001)"""
+    return round(round(float(value) / step) * step, 6)
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache with a per-entry TTL.
+
+    version is an optional callable returning a token for whatever the cached
+    results were computed from (knowledge base, model); when the token changes
+    the whole cache is dropped on the next access. Cached values are shared
+    between callers and must be treated as read-only.
+    """
+
+    def __init__(self, maxsize=4096, ttl=3600.0, version=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version = version
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._token = version() if version else None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _check_version(self):
+        if self.version is None:
+            return
+        token = self.version()
+        if token is not self._token:
+            self._entries.clear()
+            self._token = token
+            self.invalidations += 1
+
+    def get(self, key):
+        """(True, value) on a fresh hit, (False, None) otherwise"""
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > self.clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        with self._lock:
+            self._check_version()
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
+
+
+def memoize(cache, normalize):
+    """
+    Put cache in front of a pure function. normalize(*args, **kwargs) returns
+    (key, call_args); on a miss the function is called with call_args, so the
+    cached result is the one for the normalized input, whoever asked first.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key, call_args = normalize(*args, **kwargs)
+            found, value = cache.get(key)
+            if not found:
+                value = func(*call_args)
+                cache.put(key, value)
+            return value
+
+        wrapper.cache = cache
+        return wrapper
+    return decorate
+
+
+def crop_profile_key(soil_type, ph_level, rainfall, temperature):
+    """Soil type normalized; pH to 0.1, rainfall to 10 mm, temperature to 0.5 °C"""
+    args = (
+        str(soil_type).lower().strip(),
+        snap(ph_level, PH_STEP),
+        snap(rainfall, RAINFALL_STEP),
+        snap(temperature, TEMPERATURE_STEP),
+    )
+    return args, args
+
+
+def farmer_key(fields):
+    """Key on only the form fields the scheme rules read, so names and districts don't split the cache"""
+    def normalize(form_data):
+        values = tuple(form_data[field] for field in fields())
+        return values, (dict(zip(fields(), values)),)
+    return normalize
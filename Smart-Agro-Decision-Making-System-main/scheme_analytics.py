@@ -0,0 +1,229 @@
+"""
+PM-KISAN beneficiary analytics.
+
+train_model.py's schemes stage writes models/schemes/schemes_processed.csv with
+the number of beneficiaries and the amount disbursed per state for each
+instalment. It is parsed once into (state x instalment) float64 arrays;
+totals over any instalment range come from prefix sums, and deltas,
+per-beneficiary amounts and national ranks are computed at load time. The file
+is only read again when train_model.py replaces it.
+"""
+import csv
+import io
+import os
+import re
+import threading
+
+import numpy as np
+
+from model_registry import MODELS_DIR
+
+PROCESSED_CSV = os.path.join(MODELS_DIR, 'schemes', 'schemes_processed.csv')
+
+# Amounts are published in crore; 1 crore = 10 million rupees
+RUPEES_PER_CRORE = 1e7
+
+METRICS = ('beneficiaries', 'amount', 'per_beneficiary', 'growth')
+
+_COLUMN = re.compile(r'^(\d+)\w* Instalment \((.+)\) - (No\. of Beneficiaries|Amount Disbursed)')
+
+
+def _number(text):
+    text = (text or '').strip().replace(',', '')
+    return float(text) if text else np.nan
+
+
+def _json_number(value, digits=2):
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+class BeneficiaryAnalytics:
+    """Columnar PM-KISAN figures for one version of the processed CSV"""
+
+    def __init__(self, states, instalments, periods, beneficiaries, amount_crore):
+        self.states = list(states)
+        self.instalments = np.asarray(instalments, dtype=np.int64)
+        self.periods = list(periods)
+        self.state_index = {state.lower(): i for i, state in enumerate(self.states)}
+
+        # (state, instalment) figures; NaN where a state reported nothing
+        self.beneficiaries = np.ascontiguousarray(beneficiaries, dtype=np.float64)
+        self.amount_crore = np.ascontiguousarray(amount_crore, dtype=np.float64)
+        n_states = len(self.states)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.per_beneficiary = self.amount_crore * RUPEES_PER_CRORE / self.beneficiaries
+            self.delta = np.full_like(self.beneficiaries, np.nan)
+            self.delta[:, 1:] = np.diff(self.beneficiaries, axis=1)
+            self.delta_pct = np.full_like(self.beneficiaries, np.nan)
+            self.delta_pct[:, 1:] = self.delta[:, 1:] / self.beneficiaries[:, :-1] * 100
+
+        # Prefix sums along instalments, so any range total is one subtraction
+        zeros = np.zeros((n_states, 1))
+        self.beneficiaries_cumsum = np.hstack([zeros, np.nancumsum(self.beneficiaries, axis=1)])
+        self.amount_cumsum = np.hstack([zeros, np.nancumsum(self.amount_crore, axis=1)])
+
+        # National rank of each state per instalment by beneficiaries (1 = most)
+        order = np.argsort(-np.nan_to_num(self.beneficiaries, nan=-np.inf), axis=0, kind='stable')
+        self.ranks = np.empty_like(order)
+        np.put_along_axis(self.ranks, order, np.arange(1, n_states + 1)[:, None], axis=0)
+
+        self.national_beneficiaries = np.nansum(self.beneficiaries, axis=0)
+        self.national_amount = np.nansum(self.amount_crore, axis=0)
+
+    @classmethod
+    def from_csv(cls, path):
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            count_columns, amount_columns = {}, {}
+            periods = {}
+            for j, name in enumerate(header):
+                match = _COLUMN.match(name.strip())
+                if match:
+                    number = int(match.group(1))
+                    periods[number] = match.group(2)
+                    (count_columns if match.group(3).startswith('No.') else amount_columns)[number] = j
+            state_column = header.index('State/UT')
+            instalments = sorted(set(count_columns) & set(amount_columns))
+
+            states, counts, amounts = [], [], []
+            for row in reader:
+                state = row[state_column].strip()
+                if not state or state.lower().startswith('grand total'):
+                    continue
+                states.append(state)
+                counts.append([_number(row[count_columns[n]]) for n in instalments])
+                amounts.append([_number(row[amount_columns[n]]) for n in instalments])
+        return cls(states, instalments, [periods[n] for n in instalments],
+                   np.array(counts).reshape(len(states), len(instalments)),
+                   np.array(amounts).reshape(len(states), len(instalments)))
+
+    def columns(self, first=None, last=None):
+        """Column slice for an inclusive instalment-number range; raises ValueError if out of range"""
+        lowest, highest = int(self.instalments[0]), int(self.instalments[-1])
+        first = lowest if first is None else int(first)
+        last = highest if last is None else int(last)
+        if not lowest <= first <= last <= highest:
+            raise ValueError(f'Instalments must satisfy {lowest} <= from <= to <= {highest}')
+        return slice(first - lowest, last - lowest + 1)
+
+    def state(self, name):
+        """Row index for a state name (case-insensitive), or None"""
+        return self.state_index.get(' '.join(str(name).split()).lower())
+
+    def range_totals(self, columns):
+        """(beneficiaries, amount in crore) per state summed over a column slice"""
+        return (self.beneficiaries_cumsum[:, columns.stop] - self.beneficiaries_cumsum[:, columns.start],
+                self.amount_cumsum[:, columns.stop] - self.amount_cumsum[:, columns.start])
+
+    def metric(self, metric, columns):
+        """One value per state for ranking over an instalment range"""
+        beneficiaries, amount = self.range_totals(columns)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if metric == 'beneficiaries':
+                return beneficiaries
+            if metric == 'amount':
+                return amount
+            if metric == 'per_beneficiary':
+                return np.where(beneficiaries > 0, amount * RUPEES_PER_CRORE / beneficiaries, np.nan)
+            if metric == 'growth':
+                first = self.beneficiaries[:, columns.start]
+                last = self.beneficiaries[:, columns.stop - 1]
+                return (last - first) / first * 100
+        raise ValueError(f"metric must be one of {', '.join(METRICS)}")
+
+    def top(self, k=10, metric='beneficiaries', first=None, last=None):
+        """States ranked by a metric over an instalment range, best first"""
+        columns = self.columns(first, last)
+        values = self.metric(metric, columns)
+        beneficiaries, amount = self.range_totals(columns)
+        order = np.argsort(-np.nan_to_num(values, nan=-np.inf), kind='stable')[:max(int(k), 0)]
+        return [{
+            'rank': position + 1,
+            'state': self.states[i],
+            'value': _json_number(values[i]),
+            'beneficiaries': int(beneficiaries[i]),
+            'amount_crore': round(float(amount[i]), 2),
+        } for position, i in enumerate(order)]
+
+    def state_report(self, index, first=None, last=None):
+        """Per-instalment figures and range totals for one state"""
+        columns = self.columns(first, last)
+        beneficiaries, amount = self.range_totals(columns)
+        total_beneficiaries = float(beneficiaries[index])
+        return {
+            'state': self.states[index],
+            'total_beneficiaries': int(total_beneficiaries),
+            'total_amount_crore': round(float(amount[index]), 2),
+            'per_beneficiary_rs': (round(float(amount[index]) * RUPEES_PER_CRORE / total_beneficiaries, 2)
+                                   if total_beneficiaries else None),
+            'instalments': [{
+                'instalment': int(self.instalments[j]),
+                'period': self.periods[j],
+                'beneficiaries': _json_number(self.beneficiaries[index, j], 0),
+                'amount_crore': _json_number(self.amount_crore[index, j]),
+                'per_beneficiary_rs': _json_number(self.per_beneficiary[index, j]),
+                'change': _json_number(self.delta[index, j], 0),
+                'change_pct': _json_number(self.delta_pct[index, j]),
+                'national_rank': int(self.ranks[index, j]),
+            } for j in range(columns.start, columns.stop)],
+        }
+
+    def national(self, first=None, last=None):
+        """Country-wide beneficiaries and disbursement per instalment"""
+        columns = self.columns(first, last)
+        return [{
+            'instalment': int(self.instalments[j]),
+            'period': self.periods[j],
+            'beneficiaries': int(self.national_beneficiaries[j]),
+            'amount_crore': round(float(self.national_amount[j]), 2),
+        } for j in range(columns.start, columns.stop)]
+
+    def iter_csv(self, first=None, last=None, states=None):
+        """CSV export, one line per (state, instalment), yielded a state at a time"""
+        columns = self.columns(first, last)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['state', 'instalment', 'period', 'beneficiaries', 'amount_crore',
+                         'per_beneficiary_rs', 'change', 'change_pct', 'national_rank'])
+        for i in (range(len(self.states)) if states is None else states):
+            for j in range(columns.start, columns.stop):
+                writer.writerow([
+                    self.states[i], int(self.instalments[j]), self.periods[j],
+                    *('' if np.isnan(value) else f'{value:.{digits}f}' for value, digits in (
+                        (self.beneficiaries[i, j], 0), (self.amount_crore[i, j], 2),
+                        (self.per_beneficiary[i, j], 2), (self.delta[i, j], 0), (self.delta_pct[i, j], 2))),
+                    int(self.ranks[i, j]),
+                ])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+
+class AnalyticsSource:
+    """The loaded BeneficiaryAnalytics, parsed again only when the CSV is replaced"""
+
+    def __init__(self, path=PROCESSED_CSV):
+        self.path = path
+        self._mtime = None
+        self._analytics = None
+        self._lock = threading.Lock()
+
+    def current(self):
+        """Latest BeneficiaryAnalytics; raises OSError if the CSV has never been readable"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            if self._analytics is None:
+                raise
+            return self._analytics
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._analytics = BeneficiaryAnalytics.from_csv(self.path)
+                    self._mtime = mtime
+        return self._analytics
+
+
+pm_kisan = AnalyticsSource()
@@ -0,0 +1,168 @@
+import threading
+
+import numpy as np
+
+import knowledge_base
+
+# Criteria keys understood by the rule compiler. 'all_farmers' and 'crop_type'
+# place no restriction on the farmer.
+SET_RULES = ('land_ownership', 'caste_category')
+FLAG_RULES = ('bank_account', 'aadhaar_linked')
+OPEN_RULES = ('all_farmers', 'crop_type')
+
+
+class CompiledSchemes:
+    """
+    Scheme eligibility rules compiled once into predicate arrays, one entry per scheme.
+    Categorical rules become (scheme x category) allow tables whose last column
+    stands for any value not in the vocabulary.
+    """
+
+    def __init__(self, schemes):
+        self.schemes = list(schemes)
+        self.names = [scheme.name for scheme in self.schemes]
+        n = len(self.schemes)
+
+        self.categories = {}
+        self.allowed = {}
+        for key in SET_RULES:
+            vocabulary = sorted({value for scheme in self.schemes
+                                 for value in scheme.eligibility.get(key) or ()})
+            table = np.ones((n, len(vocabulary) + 1), dtype=bool)
+            for i, scheme in enumerate(self.schemes):
+                if key in scheme.eligibility:
+                    permitted = set(scheme.eligibility[key])
+                    table[i] = [value in permitted for value in vocabulary] + [False]
+            self.categories[key] = {value: j for j, value in enumerate(vocabulary)}
+            self.allowed[key] = table
+
+        self.income_max = np.full(n, np.inf)
+        self.age_min = np.full(n, -np.inf)
+        self.age_max = np.full(n, np.inf)
+        self.requires = {key: np.zeros(n, dtype=bool) for key in FLAG_RULES}
+
+        for i, scheme in enumerate(self.schemes):
+            for key, value in scheme.eligibility.items():
+                if key == 'annual_income_max':
+                    self.income_max[i] = value
+                elif key == 'age_min':
+                    self.age_min[i] = value
+                elif key == 'age_max':
+                    self.age_max[i] = value
+                elif key in FLAG_RULES:
+                    self.requires[key][i] = bool(value)
+                elif key not in SET_RULES and key not in OPEN_RULES:
+                    raise ValueError(f"Unknown eligibility rule {key!r} in scheme {scheme.name!r}")
+
+        self.uses = {key for scheme in self.schemes for key in scheme.eligibility}
+        # Farmer fields the rules actually read
+        self.fields = tuple(
+            [key for key in SET_RULES if key in self.uses]
+            + (['annual_income'] if 'annual_income_max' in self.uses else [])
+            + (['age'] if self.uses & {'age_min', 'age_max'} else [])
+            + [key for key in FLAG_RULES if key in self.uses]
+        )
+
+    def _category_index(self, key, value):
+        return self.categories[key].get(value, len(self.categories[key]))
+
+    def eligible_mask(self, form_data):
+        """Boolean vector over schemes for a single farmer"""
+        mask = np.ones(len(self.schemes), dtype=bool)
+        for key in SET_RULES:
+            if key in self.uses:
+                mask &= self.allowed[key][:, self._category_index(key, form_data[key])]
+        if 'annual_income_max' in self.uses:
+            mask &= ~(form_data['annual_income'] > self.income_max)
+        if 'age_min' in self.uses:
+            mask &= ~(form_data['age'] < self.age_min)
+        if 'age_max' in self.uses:
+            mask &= ~(form_data['age'] > self.age_max)
+        for key in FLAG_RULES:
+            if key in self.uses and not form_data[key]:
+                mask &= ~self.requires[key]
+        return mask
+
+    def eligible(self, form_data):
+        """Schemes the farmer qualifies for, in scheme order"""
+        return [scheme for scheme, ok in zip(self.schemes, self.eligible_mask(form_data)) if ok]
+
+    def matrix(self, farmers):
+        """
+        Eligibility matrix (farmers x schemes) for a DataFrame of farmers.
+        Needs the columns referenced by the rules: land_ownership, caste_category,
+        annual_income, age, bank_account and aadhaar_linked.
+        """
+        import pandas as pd
+
+        n = len(farmers)
+        result = np.ones((n, len(self.schemes)), dtype=bool)
+        for key in SET_RULES:
+            if key in self.uses:
+                vocabulary = list(self.categories[key])
+                codes = pd.Categorical(farmers[key].astype(str).str.strip().str.lower(),
+                                       categories=vocabulary).codes.astype(np.intp)
+                codes[codes < 0] = len(vocabulary)
+                result &= self.allowed[key][:, codes].T
+        if 'annual_income_max' in self.uses:
+            income = pd.to_numeric(farmers['annual_income'], errors='coerce').to_numpy(dtype=np.float64)
+            result &= ~(income[:, None] > self.income_max)
+        if 'age_min' in self.uses or 'age_max' in self.uses:
+            age = pd.to_numeric(farmers['age'], errors='coerce').to_numpy(dtype=np.float64)[:, None]
+            result &= ~(age < self.age_min)
+            result &= ~(age > self.age_max)
+        for key in FLAG_RULES:
+            if key in self.uses:
+                flags = _as_flags(farmers[key])
+                result &= ~(~flags[:, None] & self.requires[key])
+        return result
+
+
+def _as_flags(column):
+    """Yes/no style column (bools, 1/0, 'yes'/'no', 'true'/'false') as a bool array"""
+    if column.dtype == bool:
+        return column.to_numpy()
+    text = column.astype(str).str.strip().str.lower()
+    return text.isin(['yes', 'y', 'true', '1', '1.0']).to_numpy()
+
+
+_compiled = (None, None)
+_compiled_lock = threading.Lock()
+
+
+def compiled_schemes():
+    """CompiledSchemes for the current knowledge base, recompiled when the knowledge base is reloaded"""
+    global _compiled
+    kb = knowledge_base.current()
+    built_for, compiled = _compiled
+    if built_for is not kb:
+        with _compiled_lock:
+            built_for, compiled = _compiled
+            if built_for is not kb:
+                compiled = CompiledSchemes(kb.schemes)
+                _compiled = (kb, compiled)
+    return compiled
+
+
+def bulk_eligibility(farmers, chunksize=500000):
+    """
+    Eligibility matrix (farmers x schemes) for a farmer registry.
+    farmers is a DataFrame, or a CSV path / file object that is read in chunks.
+    Column j of the result corresponds to knowledge_base.current().schemes[j].
+    """
+    import pandas as pd
+
+    compiled = compiled_schemes()
+    if isinstance(farmers, pd.DataFrame):
+        return compiled.matrix(farmers)
+
+    columns = ['land_ownership', 'caste_category', 'annual_income', 'age', 'bank_account', 'aadhaar_linked']
+    parts = [compiled.matrix(chunk) for chunk in pd.read_csv(
+        farmers,
+        usecols=lambda name: name in columns,
+        dtype={'land_ownership': str, 'caste_category': str, 'bank_account': str, 'aadhaar_linked': str},
+        chunksize=chunksize
+    )]
+    if not parts:
+        return np.zeros((0, len(compiled.schemes)), dtype=bool)
+    return np.concatenate(parts)
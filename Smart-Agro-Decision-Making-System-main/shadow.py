@@ -0,0 +1,121 @@
+"""
+Shadow evaluation of candidate models.
+
+When a model has a CANDIDATE version (see model_registry.py), a sampled
+fraction of live predictions is repeated with the candidate on a background
+executor. The caller only pays for a random draw and a queue put. Each
+comparison is logged with whether the two versions agreed and how long each
+took, and running totals are kept for stats().
+
+    SMART_AGRO_SHADOW_SAMPLE=0.05   # shadow 5% of predictions (default 0, off)
+"""
+import logging
+import operator
+import os
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from model_registry import registry
+
+SAMPLE_RATE = float(os.environ.get('SMART_AGRO_SHADOW_SAMPLE', 0.0))
+
+logger = logging.getLogger(__name__)
+
+_evaluators = weakref.WeakSet()
+
+
+def _reset_after_fork():
+    # The executor's thread does not survive fork; start a new one on demand
+    for evaluator in list(_evaluators):
+        evaluator._reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class ShadowEvaluator:
+    """
+    Replays sampled inputs against a model's candidate version.
+    predict(loaded_model, inputs) must return output comparable with agree().
+    """
+
+    def __init__(self, name, predict, models=registry, sample_rate=SAMPLE_RATE, agree=operator.eq,
+                 max_pending=16, executor=None):
+        self.name = name
+        self.predict = predict
+        self.models = models
+        self.sample_rate = sample_rate
+        self.agree = agree
+        self.max_pending = max_pending
+        self.samples = 0
+        self.agreements = 0
+        self.dropped = 0
+        self.primary_seconds = 0.0
+        self.candidate_seconds = 0.0
+        self._lock = threading.Lock()
+        self._executor = executor
+        self._pending = 0
+        _evaluators.add(self)
+
+    def _reset(self):
+        self._executor = None
+        self._pending = 0
+
+    def observe(self, inputs, primary_output, primary_seconds, primary_version=None):
+        """Queue one live prediction for comparison, if sampled; returns True when queued"""
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return False
+        with self._lock:
+            if self._pending >= self.max_pending:
+                # The candidate is falling behind; shed load rather than queue without bound
+                self.dropped += 1
+                return False
+            self._pending += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'shadow-{self.name}')
+        self._executor.submit(self._evaluate, inputs, primary_output, primary_seconds, primary_version)
+        return True
+
+    def _evaluate(self, inputs, primary_output, primary_seconds, primary_version):
+        try:
+            candidate = self.models.candidate(self.name)
+            if candidate is None:
+                return
+            start = time.perf_counter()
+            candidate_output = self.predict(candidate, inputs)
+            candidate_seconds = time.perf_counter() - start
+            agreed = bool(self.agree(primary_output, candidate_output))
+            with self._lock:
+                self.samples += 1
+                self.agreements += agreed
+                self.primary_seconds += primary_seconds
+                self.candidate_seconds += candidate_seconds
+            logger.info('Shadow %s prediction %s', self.name, 'agreed' if agreed else 'disagreed',
+                        extra={'fields': {
+                            'model': self.name,
+                            'primary_version': primary_version,
+                            'candidate_version': candidate.version,
+                            'agree': agreed,
+                            'primary_ms': round(primary_seconds * 1000, 3),
+                            'candidate_ms': round(candidate_seconds * 1000, 3),
+                        }})
+        except Exception as e:
+            logger.warning('Shadow %s evaluation failed: %s', self.name, e)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def stats(self):
+        with self._lock:
+            samples = self.samples
+            return {
+                'samples': samples,
+                'agreement': self.agreements / samples if samples else None,
+                'dropped': self.dropped,
+                'primary_mean_ms': self.primary_seconds / samples * 1000 if samples else None,
+                'candidate_mean_ms': self.candidate_seconds / samples * 1000 if samples else None,
+            }
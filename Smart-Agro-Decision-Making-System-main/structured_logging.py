@@ -0,0 +1,221 @@
+"""
+Non-blocking structured logging.
+
+Request threads only put records on an in-memory queue; a QueueListener thread
+formats them and does the actual write, so a slow or blocked stdout/stderr
+never stalls a request. The queue is bounded: when the writer falls behind,
+new records are dropped and counted (dropped_records()) instead of growing
+memory without limit. Configuration comes from the environment:
+
+    SMART_AGRO_LOG_LEVEL=DEBUG                             # default INFO
+    SMART_AGRO_LOG_FORMAT=text                             # default json
+    SMART_AGRO_LOG_SAMPLE=/crop-recommendation=0.1,*=1.0   # keep 10% of that route's records
+    SMART_AGRO_LOG_QUEUE_SIZE=10000                        # records waiting to be written
+
+Sampling only drops records below WARNING; warnings and errors are always kept.
+Pass structured data with extra={'fields': {...}}. A field named like one of the
+entry's own keys (ts, level, message, ...) is written as 'fields.<name>'.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+
+from flask import has_request_context, request
+
+DEFAULT_LEVEL = 'INFO'
+QUEUE_SIZE = int(os.environ.get('SMART_AGRO_LOG_QUEUE_SIZE', 10000))
+
+
+# Keys of every JSON entry, which extra fields may not overwrite
+RESERVED_KEYS = frozenset({'ts', 'level', 'logger', 'message', 'route', 'exc'})
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the record's route and extra fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        route = getattr(record, 'route', None)
+        if route:
+            entry['route'] = route
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        fields = getattr(record, 'fields', None)
+        if fields:
+            for key, value in fields.items():
+                entry[f'fields.{key}' if key in entry or key in RESERVED_KEYS else key] = value
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            line += ' ' + json.dumps(fields, default=str)
+        return line
+
+
+class RouteSampler(logging.Filter):
+    """
+    Tags records with the current Flask route and keeps only a fraction of
+    the sub-WARNING records for routes with a sampling rate below 1.
+    """
+
+    def __init__(self, rates=None, default_rate=1.0):
+        super().__init__()
+        self.rates = dict(rates or {})
+        self.default_rate = default_rate
+
+    def filter(self, record):
+        route = None
+        if has_request_context() and request.url_rule is not None:
+            route = request.url_rule.rule
+        record.route = route
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(route, self.default_rate)
+        return rate >= 1.0 or random.random() < rate
+
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that only merges the message arguments on the request
+    thread, leaving all formatting to the listener thread. When the bounded
+    queue is full the record is dropped and counted rather than waited on.
+    """
+
+    def __init__(self, records):
+        super().__init__(records)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def prepare(self, record):
+        message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+class StderrHandler(logging.StreamHandler):
+    """StreamHandler that always writes to the current sys.stderr"""
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stderr
+
+
+def parse_sample_rates(spec):
+    """'/route=0.1,*=0.5' -> ({'/route': 0.1}, 0.5)"""
+    rates = {}
+    default_rate = 1.0
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        route, _, rate = item.rpartition('=')
+        if not route:
+            raise ValueError(f'Bad sampling rate {item!r}; expected ROUTE=RATE')
+        if route == '*':
+            default_rate = float(rate)
+        else:
+            rates[route] = float(rate)
+    return rates, default_rate
+
+
+_listener = None
+_handler = None
+
+
+def configure_logging(level=None, json_output=None, sample_rates=None, default_rate=None, target=None,
+                      queue_size=None):
+    """
+    Route the root logger through a queue to a background writer thread.
+    Safe to call again; the previous listener is flushed and replaced.
+    """
+    global _listener, _handler
+
+    level = level or os.environ.get('SMART_AGRO_LOG_LEVEL', DEFAULT_LEVEL)
+    if json_output is None:
+        json_output = os.environ.get('SMART_AGRO_LOG_FORMAT', 'json').lower() != 'text'
+    if sample_rates is None:
+        sample_rates, env_default = parse_sample_rates(os.environ.get('SMART_AGRO_LOG_SAMPLE'))
+        default_rate = env_default if default_rate is None else default_rate
+    if default_rate is None:
+        default_rate = 1.0
+
+    shutdown_logging()
+
+    target = target or StderrHandler()
+    target.setFormatter(JsonFormatter() if json_output else TextFormatter())
+
+    records = queue.Queue(maxsize=queue_size or QUEUE_SIZE)
+    _handler = StructuredQueueHandler(records)
+    _handler.addFilter(RouteSampler(sample_rates, default_rate))
+    _listener = logging.handlers.QueueListener(records, target, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    root.addHandler(_handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    return _listener
+
+
+def dropped_records():
+    """Records dropped because the queue was full, since logging was configured"""
+    return _handler.dropped if _handler is not None else 0
+
+
+def shutdown_logging():
+    """Detach the queue handler and wait for the writer thread to drain"""
+    global _listener, _handler
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _restart_after_fork():
+    # Threads do not survive fork (gunicorn --preload); give the worker its own queue and writer
+    global _listener
+    if _listener is None:
+        return
+    records = queue.Queue(maxsize=_handler.queue.maxsize)
+    _handler.queue = records
+    _listener = logging.handlers.QueueListener(records, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+atexit.register(shutdown_logging)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_after_fork)
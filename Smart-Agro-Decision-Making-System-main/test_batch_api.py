@@ -0,0 +1,60 @@
+import io
+import json
+
+from app import app, get_crop_recommendation
+
+CSV_BODY = (
+    b'state,district,soil_type,ph,N,P,K,rainfall,temperature,humidity\n'
+    b'Andhra Pradesh,Guntur,loamy,7.0,90,40,40,500,28,60\n'
+    b'Rajasthan,Jodhpur,sandy,6.5,20,20,20,250,32,30\n'
+)
+
+
+def read_lines(response):
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def expected_names(soil_type, ph, rainfall, temperature):
+    return [crop['name'] for crop in get_crop_recommendation(soil_type, ph, rainfall, temperature)]
+
+
+def test_json_array_streams_one_line_per_row():
+    client = app.test_client()
+    lines = read_lines(client.post('/api/crop-recommendation/batch', json=[
+        {'soil_type': 'sandy', 'ph': 6.5, 'rainfall': 250, 'temperature': 32},
+        {'soil_type': 'loamy', 'ph_level': '7.0', 'rainfall': 500},
+    ]))
+    assert lines[0]['row'] == 0
+    assert lines[0]['recommendations'] == expected_names('sandy', 6.5, 250, 32)
+    assert lines[1] == {'row': 1, 'error': 'temperature is required'}
+
+
+def test_csv_upload_and_raw_csv_agree():
+    client = app.test_client()
+    uploaded = read_lines(client.post(
+        '/api/crop-recommendation/batch',
+        data={'file': (io.BytesIO(CSV_BODY), 'village.csv')},
+        content_type='multipart/form-data'
+    ))
+    raw = read_lines(client.post('/api/crop-recommendation/batch', data=CSV_BODY, content_type='text/csv'))
+    assert uploaded == raw
+    assert raw[1]['district'] == 'Jodhpur'
+    assert raw[1]['recommendations'] == expected_names('sandy', 6.5, 250, 32)
+
+
+def test_ndjson_reports_bad_lines_without_aborting():
+    client = app.test_client()
+    body = b'{"soil_type": "red", "ph": 7, "rainfall": 500, "temperature": 28}\nnot json\n'
+    lines = read_lines(client.post('/api/crop-recommendation/batch', data=body,
+                                   content_type='application/x-ndjson'))
+    assert len(lines) == 2
+    assert lines[0]['recommendations'] == expected_names('red', 7, 500, 28)
+    assert 'error' in lines[1]
+
+
+def test_unsupported_body_is_rejected():
+    client = app.test_client()
+    response = client.post('/api/crop-recommendation/batch', data='x', content_type='text/plain')
+    assert response.status_code == 400
@@ -0,0 +1,27 @@
+import json
+
+import benchmark
+
+
+def test_compare_flags_only_slowdowns_beyond_threshold():
+    baseline = {'results': {'a': {'median_us': 100.0}, 'b': {'median_us': 100.0}, 'gone': {'median_us': 1.0}}}
+    current = {'results': {'a': {'median_us': 120.0}, 'b': {'median_us': 130.0}, 'new': {'median_us': 5.0}}}
+    regressions = benchmark.compare(current, baseline, threshold=0.25)
+    assert [item['name'] for item in regressions] == ['b']
+    assert regressions[0]['ratio'] == 1.3
+
+
+def test_routes_run_with_csrf_and_gate_on_baseline(tmp_path):
+    output = tmp_path / 'results.json'
+    baseline = tmp_path / 'baseline.json'
+    args = ['--suite', 'routes', '--filter', 'POST /schemes', '--min-time', '0',
+            '--output', str(output), '--baseline', str(baseline)]
+
+    assert benchmark.main(args + ['--save-baseline']) == 0
+    results = json.loads(output.read_text())['results']
+    assert list(results) == ['POST /schemes']
+
+    saved = json.loads(baseline.read_text())
+    saved['results']['POST /schemes']['median_us'] /= 100
+    baseline.write_text(json.dumps(saved))
+    assert benchmark.main(args) == 1
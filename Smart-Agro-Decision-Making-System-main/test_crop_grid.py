@@ -0,0 +1,48 @@
+import json
+import random
+
+import numpy as np
+
+import knowledge_base
+from crop_grid import crop_grid, region_values
+from crop_scoring import score_crop_batch
+from knowledge_base import KnowledgeBaseStore, KB_PATH
+
+SOILS = ['black', 'red', 'sandy', 'clay', 'loamy', 'Sandy Loam', ' clay loam ', 'black cotton', '']
+
+
+def test_grid_matches_scorer_at_every_edge():
+    grid = crop_grid()
+    # Each region's sample value plus values just either side of every edge
+    axes = [list(region_values(np.array(edges))) + [edge + step for edge in edges for step in (1e-9, -1e-9)]
+            for edges in grid.breakpoints]
+    rng = random.Random(7)
+    profiles = [{'soil_type': rng.choice(SOILS), 'ph_level': rng.choice(axes[0]),
+                 'rainfall': rng.choice(axes[1]), 'temperature': rng.choice(axes[2])} for _ in range(3000)]
+    profiles.append({'soil_type': 'loamy', 'ph_level': float('nan'), 'rainfall': float('inf'),
+                     'temperature': 25})
+    assert [grid.recommend(**p) for p in profiles] == score_crop_batch(profiles)
+
+
+def test_grid_dedupes_rankings_and_returns_fresh_lists():
+    grid = crop_grid()
+    first = grid.recommend('loamy', 6.5, 800, 25)
+    first[0]['name'] = 'changed'
+    assert grid.recommend('loamy', 6.5, 800, 25)[0]['name'] != 'changed'
+    assert grid.table('black') is grid.table('black soil')  # same soil signature, one table
+    assert len(grid.rankings) <= len(grid._tables) * np.prod(grid.shape)
+
+
+def test_grid_is_rebuilt_when_knowledge_base_changes(tmp_path, monkeypatch):
+    before = crop_grid()
+    with open(KB_PATH, encoding='utf-8') as f:
+        raw = json.load(f)
+    raw['crops'] = raw['crops'][:2]
+    path = tmp_path / 'kb.json'
+    path.write_text(json.dumps(raw), encoding='utf-8')
+    monkeypatch.setattr(knowledge_base, 'store', KnowledgeBaseStore(str(path)))
+
+    grid = crop_grid()
+    assert grid is not before and len(grid.matrix.names) == 2
+    profile = {'soil_type': 'loamy', 'ph_level': 6.5, 'rainfall': 800, 'temperature': 25}
+    assert grid.recommend(**profile) == score_crop_batch([profile])[0]
@@ -0,0 +1,66 @@
+import threading
+
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+from crop_inference import CROP_DATASET, CROP_FEATURES, CropClassifier, MicroBatcher
+
+
+class StubRegistry:
+    def __init__(self, model):
+        self._model = model
+
+    def model(self, name):
+        return self._model
+
+
+def small_crop_model():
+    df = pd.read_csv(CROP_DATASET)
+    model = RandomForestClassifier(n_estimators=10, random_state=42)
+    model.fit(df[CROP_FEATURES], df['label'])
+    return model
+
+
+def test_microbatcher_coalesces_concurrent_rows():
+    batch_sizes = []
+
+    def predict_batch(rows):
+        batch_sizes.append(len(rows))
+        return rows.sum(axis=1)
+
+    batcher = MicroBatcher(predict_batch, window_seconds=0.05, max_batch=16)
+    results = [None] * 8
+
+    def worker(i):
+        results[i] = batcher.predict([i, 1.0], timeout=5)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == [i + 1.0 for i in range(8)]
+    assert sum(batch_sizes) == 8
+    assert len(batch_sizes) < 8
+
+
+def test_classifier_ranks_by_predict_proba():
+    model = small_crop_model()
+    classifier = CropClassifier(models=StubRegistry(model))
+    features = {'N': 90, 'P': 42, 'K': 43, 'temperature': 20.9, 'humidity': 82.0, 'ph': 6.5, 'rainfall': 203}
+
+    ranked = classifier.rank(features, top_n=3)
+    proba = model.predict_proba(pd.DataFrame([features])[CROP_FEATURES])[0]
+    assert ranked[0]['label'] == model.classes_[proba.argmax()]
+    assert ranked[0]['probability'] == proba.max()
+    assert [r['probability'] for r in ranked] == sorted((r['probability'] for r in ranked), reverse=True)
+
+
+def test_classifier_rejects_model_with_other_features():
+    model = RandomForestClassifier(n_estimators=2).fit(
+        pd.DataFrame({'JAN': [0.0, 1.0], 'FEB': [1.0, 0.0]}), [0, 1]
+    )
+    classifier = CropClassifier(models=StubRegistry(model))
+    assert classifier.available() is False
+    assert classifier.rank(dict.fromkeys(CROP_FEATURES, 1.0)) is None
@@ -0,0 +1,64 @@
+import random
+
+from crop_scoring import score_crop_batch
+from knowledge_base import current
+from app import get_crop_recommendation
+
+
+def reference_recommendation(soil_type, ph_level, rainfall, temperature):
+    # Original per-crop loop, kept here to check the vectorized scorer against
+    soil_type = soil_type.lower().strip()
+    crop_scores = {}
+    for crop in current().crops:
+        score = 0
+        if any(soil in soil_type for soil in crop.soils):
+            score += 3
+        min_ph, max_ph = crop.ph_range
+        if min_ph <= ph_level <= max_ph:
+            score += 2
+        elif min_ph - 0.5 <= ph_level < min_ph or max_ph < ph_level <= max_ph + 0.5:
+            score += 1
+        min_rain, max_rain = crop.rainfall
+        if min_rain <= rainfall <= max_rain:
+            score += 2
+        elif min_rain * 0.8 <= rainfall < min_rain or max_rain < rainfall <= max_rain * 1.2:
+            score += 1
+        min_temp, max_temp = crop.temperature
+        if min_temp <= temperature <= max_temp:
+            score += 2
+        elif min_temp - 2 <= temperature < min_temp or max_temp < temperature <= max_temp + 2:
+            score += 1
+        if crop.drought_tolerant:
+            score += 2
+        if score >= 3:
+            crop_scores[crop.name] = {'score': score, 'description': crop.description}
+    sorted_crops = sorted(crop_scores.items(), key=lambda x: x[1]['score'], reverse=True)
+    return [{'name': name, 'description': details['description']} for name, details in sorted_crops]
+
+
+def random_profiles(n, seed=7):
+    rng = random.Random(seed)
+    soils = ['sandy', 'loamy', 'black cotton', 'red', 'clay', 'Sandy Loam ', 'clay loam', 'black']
+    return [{
+        'soil_type': rng.choice(soils),
+        'ph_level': round(rng.uniform(4.0, 9.5), 1),
+        'rainfall': rng.choice([rng.randint(50, 1200), 160, 200, 240, 600, 720, 780]),
+        'temperature': rng.choice([round(rng.uniform(10, 45), 1), 18, 23, 35, 37, 40, 42]),
+    } for _ in range(n)]
+
+
+def test_batch_matches_reference():
+    profiles = random_profiles(2000)
+    results = score_crop_batch(profiles)
+    assert len(results) == len(profiles)
+    for profile, result in zip(profiles, results):
+        assert result == reference_recommendation(**profile)
+
+
+def test_single_call_matches_batch():
+    for profile in random_profiles(50, seed=11):
+        assert get_crop_recommendation(**profile) == score_crop_batch([profile])[0]
+
+
+def test_empty_batch():
+    assert score_crop_batch([]) == []
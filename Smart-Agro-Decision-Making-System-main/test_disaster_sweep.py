@@ -0,0 +1,93 @@
+import glob
+import json
+import os
+import re
+
+import numpy as np
+
+import app as app_module
+from disaster_sweep import RiskTable, TABLE_FILE, CHANGES_FILE, run_sweep, risk_level
+from districts import canonical_location, district_index
+from model_registry import ModelRegistry
+from rainfall_store import district_normals
+
+
+class CertainModel:
+    """Stands in for the disaster model and reports certain flood risk everywhere"""
+
+    classes_ = np.array([0, 1])
+
+    def predict_proba(self, X):
+        return np.column_stack([np.zeros(len(X)), np.ones(len(X))])
+
+
+class StubRegistry:
+    def __init__(self, loaded):
+        self.loaded = loaded
+
+    def get(self, name):
+        return self.loaded
+
+    def candidate(self, name):
+        return None
+
+
+def test_sweep_materializes_every_district(tmp_path):
+    changes = run_sweep(models=ModelRegistry(), output_dir=str(tmp_path))
+    with open(tmp_path / TABLE_FILE) as f:
+        table = json.load(f)
+
+    assert len(table['rows']) == len(district_normals()) == 641
+    assert len(changes) == 641
+    row = table['rows'][0]
+    assert row['risk_level'] == risk_level(row['flood_probability'])
+
+    lookup = RiskTable(str(tmp_path / TABLE_FILE))
+    found = lookup.lookup('KERALA|WAYANAD')
+    assert found is not None and found['district'] == 'WAYANAD'
+    assert lookup.lookup('KERALA|NOWHERE') is None and lookup.lookup(None) is None
+
+
+def test_second_sweep_reports_only_changed_districts(tmp_path):
+    registry = ModelRegistry()
+    run_sweep(models=registry, output_dir=str(tmp_path))
+    assert run_sweep(models=registry, output_dir=str(tmp_path)) == []
+
+    loaded = registry.get('disaster')
+    shifted = StubRegistry(type(loaded)('disaster', {**loaded.artifacts, 'model': CertainModel()},
+                                        0, 0, 0))
+    changes = run_sweep(models=shifted, output_dir=str(tmp_path))
+    assert changes and all(change['current'] == 'High' for change in changes)
+    assert all(change['previous'] != 'High' for change in changes)
+    with open(tmp_path / CHANGES_FILE) as f:
+        assert len(json.load(f)['changes']) == len(changes)
+    assert os.path.exists(tmp_path / 'risk_table.prev.json')
+
+
+def form_states():
+    """Every state a form offers, from the WTForms choices and the hand-written selects"""
+    states = {value for form in (app_module.CropRecommendationForm, app_module.DisasterPredictionForm)
+              for value, _ in form.state.kwargs['choices']}
+    for path in glob.glob(os.path.join(os.path.dirname(app_module.__file__), 'templates', '*.html')):
+        with open(path, encoding='utf-8') as f:
+            for select in re.findall(r'<select[^>]*name="state".*?</select>', f.read(), re.S):
+                states.update(re.findall(r'value="([^"]*)"', select))
+    return sorted(states - {''})
+
+
+def test_every_form_state_resolves_to_a_risk_row(tmp_path):
+    loaded = ModelRegistry().get('disaster')
+    run_sweep(models=StubRegistry(loaded), output_dir=str(tmp_path))
+    lookup = RiskTable(str(tmp_path / TABLE_FILE))
+    index = district_index()
+
+    for state in form_states():
+        states = index.resolve_states(state)
+        assert states, state
+        for district in (index.districts[i] for name in states for i in index.by_state[name][:3]):
+            district_id = canonical_location(state, district.district_label)[2]
+            assert district_id == district.id, (state, district)
+            assert lookup.lookup(district_id) is not None, (state, district)
+    for state, district in (('Odisha', 'Khurda'), ('Chhattisgarh', 'Raipur'),
+                            ('Uttarakhand', 'Dehradun'), ('Himachal Pradesh', 'Shimla')):
+        assert lookup.lookup(canonical_location(state, district)[2]) is not None, state
@@ -0,0 +1,42 @@
+import time
+
+import app as app_module
+from districts import DistrictIndex, canonical_location, district_index
+
+
+def test_free_text_resolves_to_canonical_district():
+    index = district_index()
+    assert len(index.districts) == 641
+    assert index.resolve('guntur dist').id == 'ANDHRA PRADESH|GUNTUR'
+    assert index.resolve(' GUNTUR ', 'Andhra Pradesh').id == 'ANDHRA PRADESH|GUNTUR'
+    assert index.resolve('East Khasi Hills', 'Meghalaya').id == 'MEGHALAYA|EAST KHASI HI'
+    assert index.resolve('Wayand', 'Kerala').id == 'KERALA|WAYANAD'
+    assert index.resolve('khurda', 'Odisha').id == 'ORISSA|KHURDA'
+    assert index.resolve('aurangabad') is None  # in Bihar and Maharashtra
+    assert index.resolve('aurangabad', 'Maharashtra').id == 'MAHARASHTRA|AURANGABAD'
+    assert index.resolve('diu', 'Dadra and Nagar Haveli and Daman and Diu').id == 'DAMAN AND DUI|DIU'
+    assert canonical_location('Kerala', 'Nowhere  Town') == ('Kerala', 'Nowhere Town', None)
+    assert canonical_location('odisha', 'khurda dist') == ('Odisha', 'Khurda', 'ORISSA|KHURDA')
+
+
+def test_completion_prefers_name_prefixes_then_fuzzy_matches():
+    index = DistrictIndex([('KERALA', 'WAYANAD'), ('MEGHALAYA', 'WEST GARO HIL'),
+                           ('MEGHALAYA', 'EAST GARO HIL'), ('KARNATAKA', 'GADAG')])
+    assert [d.name for d in index.complete('ga')] == ['GADAG', 'EAST GARO HIL', 'WEST GARO HIL']
+    assert [d.name for d in index.complete('ga', state='Meghalaya', limit=1)] == ['EAST GARO HIL']
+    assert [d.name for d in index.complete('wyanad')] == ['WAYANAD']
+    assert index.complete('  ') == []
+
+
+def test_autocomplete_endpoint_answers_quickly():
+    client = app_module.app.test_client()
+    body = client.get('/api/districts?q=gunt').get_json()
+    assert body['districts'][0] == {'id': 'ANDHRA PRADESH|GUNTUR', 'state': 'Andhra Pradesh',
+                                    'district': 'Guntur', 'label': 'Guntur, Andhra Pradesh'}
+    assert client.get('/api/districts?q=x&limit=many').status_code == 400
+
+    index = district_index()
+    start = time.perf_counter()
+    for query in ('g', 'gun', 'east k', 'kamrup', 'wyanad') * 20:
+        index.complete(query)
+    assert (time.perf_counter() - start) / 100 < 0.001
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+import feature_store
+from disaster_sweep import score_districts
+from feature_store import (EXTENDED_FEATURES, FEATURES, compute_features, district_features, fill_monthly,
+                           load_features)
+from model_registry import LoadedModel
+from rainfall_store import subdivision_rainfall
+
+
+def test_window_and_lag_features_on_a_small_series():
+    cube = np.ones((2, 6, 12))
+    cube[0, :, 6] = [10, 20, 30, 40, 50, 60]  # July
+    cube[1, 2, 0] = np.nan
+    filled = fill_monthly(cube)
+    assert filled[1, 2, 0] == 1.0  # that subdivision's own January mean
+
+    columns = compute_features(filled, normal=np.ones((2, 12)))
+    annual = 11 + np.array([10, 20, 30, 40, 50, 60])
+    np.testing.assert_array_equal(columns['ANNUAL'][0], annual)
+    np.testing.assert_array_equal(columns['PEAK_1M'][0], [10, 20, 30, 40, 50, 60])
+    np.testing.assert_array_equal(columns['PEAK_3M'][0], [12, 22, 32, 42, 52, 62])
+    assert columns['LAG1_ANNUAL'][0, 3] == annual[2]
+    assert columns['ROLL3_ANNUAL'][0, 4] == annual[1:4].mean()
+    assert columns['ROLL3_ANNUAL'][0, 0] == annual.mean()  # no history yet
+    assert columns['DEP_ANNUAL_PCT'][1, 0] == 0.0
+
+
+def test_store_is_computed_once_per_data_hash(tmp_path, monkeypatch):
+    first = load_features(str(tmp_path))
+    assert len(first) == len(subdivision_rainfall()) == 4116
+    assert not np.isnan(first.matrix()).any()
+    raw = subdivision_rainfall().frame()
+    kerala_1901 = (first.subdivisions == 'KERALA') & (first.years == 1901)
+    assert first.columns['JUN'][kerala_1901][0] == raw[(raw.SUBDIVISION == 'KERALA') & (raw.YEAR == 1901)].JUN.iloc[0]
+
+    monkeypatch.setattr(feature_store, 'build_features', lambda: pytest.fail('features were recomputed'))
+    again = load_features(str(tmp_path))
+    assert again.data_hash == first.data_hash
+    np.testing.assert_array_equal(again.matrix(), first.matrix())
+
+
+def test_districts_are_scored_on_extended_features():
+    values = district_features()
+    assert values.shape == (641, len(FEATURES))
+    column = {name: values[:, i] for i, name in enumerate(FEATURES)}
+    np.testing.assert_array_equal(column['LAG1_ANNUAL'], column['ANNUAL'])
+    assert (column['DEP_JUN_SEP_PCT'] == 0).all()
+
+    store = load_features()
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(
+        store.frame()[EXTENDED_FEATURES], store.columns['ANNUAL'] > np.quantile(store.columns['ANNUAL'], 0.9))
+    loaded = LoadedModel('disaster', {'model': model, 'features': EXTENDED_FEATURES}, 0, 0, 0)
+    keys, probabilities = score_districts(loaded=loaded)
+    assert len(keys) == len(probabilities) == 641
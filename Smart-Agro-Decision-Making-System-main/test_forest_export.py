@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+
+from crop_inference import CROP_FEATURES
+from forest_export import CompactForest, float32_floor
+from model_registry import ModelRegistry, publish
+
+crops = pd.read_csv('dataset/Crop_recommendation.csv')
+
+
+def test_thresholds_round_down_to_float32():
+    values = np.array([0.1, 1.0, -0.1, 2.5e-8, 123.456])
+    floored = float32_floor(values)
+    assert floored.dtype == np.float32
+    assert (floored.astype(np.float64) <= values).all()
+    assert (np.nextafter(floored, np.float32(np.inf)).astype(np.float64) > values).all()
+
+
+def test_classifier_predictions_are_bit_identical(tmp_path):
+    model = RandomForestClassifier(n_estimators=15, random_state=0).fit(crops[CROP_FEATURES], crops['label'])
+    rows = crops[CROP_FEATURES].sample(400, random_state=1)
+    rows.iloc[0] = [90, 42, 43, 20.87974371, 82.00274423, 6.502985292, 202.9355362]
+
+    path = str(tmp_path / 'model.npz')
+    CompactForest.from_sklearn(model).save(path)
+    compact = CompactForest.load(path)
+    np.testing.assert_array_equal(compact.predict_proba(rows.to_numpy()), model.predict_proba(rows))
+    np.testing.assert_array_equal(compact.predict(rows.to_numpy()), model.predict(rows))
+    assert list(compact.feature_names_in_) == CROP_FEATURES
+    assert len(compact.values) <= len(model.classes_) * 4  # pure leaves share one row per class
+
+
+def test_registry_serves_compact_regressor(tmp_path):
+    features = CROP_FEATURES[:-1]
+    model = RandomForestRegressor(n_estimators=10, random_state=0).fit(crops[features], crops['rainfall'])
+    version = publish('crop', {'model': model}, models_dir=str(tmp_path))
+    assert (tmp_path / 'crop' / 'versions' / version / 'model.npz').exists()
+
+    loaded = ModelRegistry(str(tmp_path)).model('crop')
+    assert isinstance(loaded, CompactForest)
+    assert all(isinstance(getattr(loaded, name).base, np.memmap) for name in CompactForest.ARRAYS)
+    X = crops[features].to_numpy()
+    np.testing.assert_array_equal(loaded.predict(X), model.predict(crops[features]))
+    np.testing.assert_array_equal(loaded.predict_trees(X)[:, :, 0],
+                                  np.stack([tree.predict(X) for tree in model.estimators_]))
+    assert not isinstance(ModelRegistry(str(tmp_path), compact=False).model('crop'), CompactForest)
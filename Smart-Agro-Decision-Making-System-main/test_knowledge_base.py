@@ -0,0 +1,56 @@
+import json
+import os
+
+import pytest
+
+import app as app_module
+import knowledge_base
+from knowledge_base import KnowledgeBaseStore, KB_PATH
+
+
+def test_records_are_frozen_and_indexed():
+    kb = knowledge_base.current()
+    crop = kb.crop('Moth Bean')
+    assert crop.soils == ('sandy', 'sandy loam')
+    assert crop.display['rainfall'] == '200-500mm'
+    assert crop.display['ph_range'] == '6.0-8.0'
+    with pytest.raises(AttributeError):
+        crop.name = 'Other'
+    with pytest.raises(TypeError):
+        kb.schemes[0].eligibility['age_min'] = 0
+    assert kb.label('crop_type', 'rice') == 'Rice'
+    assert kb.label('growth_stage', 'unknown') is None
+
+
+def test_disaster_labels_come_from_knowledge_base():
+    form_data = {'state': 'Kerala', 'district': 'Wayanad', 'crop_type': 'pulses', 'growth_stage': 'flowering',
+                 'soil_moisture': 'normal', 'weather_forecast': 'clear', 'temperature': '28'}
+    result = app_module.predict_disaster_risk(form_data)
+    assert (result['crop'], result['growth_stage']) == ('Pulses', 'Flowering')
+
+
+def test_reload_swaps_on_change_and_keeps_old_version_on_bad_file(tmp_path):
+    with open(KB_PATH, encoding='utf-8') as f:
+        raw = json.load(f)
+    path = tmp_path / 'kb.json'
+    path.write_text(json.dumps(raw), encoding='utf-8')
+    now = [0.0]
+    store = KnowledgeBaseStore(str(path), check_interval=1.0, clock=lambda: now[0])
+    first = store.current()
+    assert store.current() is first
+
+    raw['version'] = 2
+    raw['crops'] = raw['crops'][:3]
+    staged = tmp_path / 'kb.json.new'
+    staged.write_text(json.dumps(raw), encoding='utf-8')
+    os.utime(staged, ns=(first.mtime_ns + 10**9, first.mtime_ns + 10**9))
+    os.replace(staged, path)
+    assert store.current() is first  # not rechecked until the interval has passed
+    now[0] = 1.0
+    second = store.current()
+    assert second.version == 2 and len(second.crops) == 3
+
+    path.write_text('{"crops": [', encoding='utf-8')
+    os.utime(path, ns=(first.mtime_ns + 2 * 10**9, first.mtime_ns + 2 * 10**9))
+    now[0] = 2.0
+    assert store.current() is second
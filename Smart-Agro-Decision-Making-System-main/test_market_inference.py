@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import LabelEncoder
+
+import app as app_module
+from market_inference import MarketPriceModel, MARKET_FEATURES, season_for
+from model_registry import LoadedModel
+
+
+class StubRegistry:
+    def __init__(self, artifacts):
+        self.loaded = LoadedModel('market', artifacts, 0.0, None, None)
+
+    def get(self, name):
+        return self.loaded
+
+
+def small_market_model():
+    rng = np.random.default_rng(0)
+    crops = rng.choice(['Rice', 'Wheat', 'Maize'], 300)
+    districts = rng.choice(['GUNTUR', 'KRISHNA'], 300)
+    le_crop, le_district = LabelEncoder(), LabelEncoder()
+    X = pd.DataFrame({
+        'crop': le_crop.fit_transform(crops),
+        'district': le_district.fit_transform(districts),
+        'season': rng.integers(0, 4, 300),
+        'area': rng.uniform(1, 100, 300),
+    })
+    y = X['area'] * (X['crop'] + 1) * 10
+    model = RandomForestRegressor(n_estimators=10, random_state=42).fit(X, y)
+    return MarketPriceModel(StubRegistry({
+        'model': model, 'crop_encoder': le_crop, 'district_encoder': le_district,
+    })), model
+
+
+def test_batch_prediction_matches_regressor_and_skips_unseen_labels():
+    service, model = small_market_model()
+    assert service.available()
+    predictions = service.predict([
+        ('rice', ' Guntur ', 'Kharif', 10),
+        ('Wheat', 'KRISHNA', 'rabi', 50),
+        ('Cotton', 'GUNTUR', 'kharif', 10),
+    ])
+    expected = model.predict(pd.DataFrame([[1, 0, 0, 10], [2, 1, 1, 50]], columns=MARKET_FEATURES))
+    assert np.allclose(predictions[:2, 1], expected)
+    assert np.all(predictions[:2, 0] <= predictions[:2, 2])
+    assert np.isnan(predictions[2]).all()
+
+
+def test_quote_endpoint_returns_every_crop_for_a_district(monkeypatch):
+    service, _ = small_market_model()
+    monkeypatch.setattr(app_module, 'market_model', service)
+    client = app_module.app.test_client()
+
+    body = client.get('/api/market-price/quote?district=guntur&season=kharif&area=5').get_json()
+    assert [quote['crop'] for quote in body['quotes']] == ['Maize', 'Rice', 'Wheat']
+    assert (body['unit'], body['area_unit']) == ('tonnes', 'hectares')
+    assert body['quotes'][0]['yield_per_hectare'] == round(body['quotes'][0]['prediction'] / 5, 3)
+    for area in ('nan', 'inf', '-1', '0'):
+        assert client.get(f'/api/market-price/quote?district=guntur&area={area}').status_code == 400
+    assert np.isnan(service.predict([('rice', 'GUNTUR', 'kharif', float('inf'))])).all()
+    assert client.get('/api/market-price/quote?district=Nellore').status_code == 404
+    assert client.get('/api/market-price/quote').status_code == 400
+
+
+def test_shipped_classifier_is_not_used_for_quotes():
+    service = MarketPriceModel()
+    assert not service.available()
+    assert service.quote_sheet('GUNTUR') is None
+    quote = app_module.get_market_price('rice', 'x', 1, 'Guntur', '2025-11-01')
+    assert quote['predicted_price'] == '₹4,200 - ₹4,800 per quintal' and quote['expected_yield'] is None
+
+
+def test_production_model_is_reported_as_yield_not_price(monkeypatch):
+    service, _ = small_market_model()
+    monkeypatch.setattr(app_module, 'market_model', service)
+    quote = app_module.get_market_price('rice', 'x', 1, 'GUNTUR', '2025-11-01')
+    assert quote['predicted_price'] == '₹4,200 - ₹4,800 per quintal'
+    assert quote['expected_yield'].endswith('tonnes per hectare')
+
+
+def test_season_for_harvest_month():
+    assert [season_for(f'2025-{month:02d}-15') for month in (1, 5, 7, 12)] == ['rabi', 'summer', 'kharif', 'rabi']
@@ -0,0 +1,37 @@
+import timeit
+
+from app import app
+from metrics import Histogram, StageTimer
+
+
+def test_histogram_buckets_are_cumulative_on_render():
+    histogram = Histogram(bounds=(0.01, 0.1))
+    for seconds in (0.005, 0.01, 0.05, 3.0):
+        histogram.observe(seconds)
+    counts, total, count = histogram.snapshot()
+    assert counts == [2, 1, 1]
+    assert count == 4
+    assert round(total, 3) == 3.065
+
+
+def test_routes_emit_server_timing_and_prometheus_metrics():
+    client = app.test_client()
+    response = client.get('/disaster')
+    assert response.status_code == 200
+    timing = response.headers['Server-Timing']
+    assert timing.startswith('validate;dur=')
+    assert 'render;dur=' in timing and 'total;dur=' in timing
+
+    body = client.get('/metrics').get_data(as_text=True)
+    assert '# TYPE smart_agro_request_duration_seconds histogram' in body
+    assert 'smart_agro_request_duration_seconds_count{route="/disaster",method="GET"}' in body
+    assert 'smart_agro_stage_duration_seconds_bucket{route="/disaster",stage="render",le="+Inf"}' in body
+
+
+def test_stage_recording_stays_cheap():
+    timer = StageTimer()
+    code = 'with timer("score"):\n    pass'
+    runs = 20000
+    per_stage = min(timeit.repeat(code, globals={'timer': timer}, number=runs, repeat=5)) / runs
+    assert len(timer.records) == runs * 5
+    assert per_stage < 2e-6
@@ -0,0 +1,75 @@
+import os
+import time
+
+import joblib
+import pytest
+
+from crop_inference import CropClassifier
+from model_registry import ModelRegistry, publish, read_pointer
+
+
+def test_models_load_lazily_and_once():
+    registry = ModelRegistry()
+    assert not registry.is_loaded('disaster')
+    assert registry.stats()['disaster']['loaded'] is False
+
+    loaded = registry.get('disaster')
+    assert registry.is_loaded('disaster')
+    assert registry.get('disaster') is loaded
+    assert list(loaded['features']) == ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN',
+                                        'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC']
+    assert not registry.is_loaded('crop')
+
+
+def test_stats_report_load_time_and_size():
+    registry = ModelRegistry()
+    registry.get('market')
+    stats = registry.stats()['market']
+    assert stats['loaded'] is True
+    assert stats['load_seconds'] > 0
+    assert stats['disk_bytes'] > 0
+
+
+def test_unknown_model_raises():
+    with pytest.raises(KeyError):
+        ModelRegistry().get('weather')
+
+
+def test_published_version_is_swapped_in_background(tmp_path):
+    first = publish('disaster', {'model': 'v1', 'features': ['JAN']}, models_dir=str(tmp_path))
+    now = [0.0]
+    registry = ModelRegistry(models_dir=str(tmp_path), mmap_mode=None, check_interval=5, clock=lambda: now[0])
+    old = registry.get('disaster')
+    assert (old.version, old.model) == (first, 'v1')
+
+    second = publish('disaster', {'model': 'v2', 'features': ['JAN']}, models_dir=str(tmp_path))
+    assert read_pointer(str(tmp_path), 'disaster') == second
+    assert registry.get('disaster') is old  # pointer not rechecked yet
+    now[0] = 5.0
+    assert registry.get('disaster') is old  # new version loads in the background
+    deadline = time.monotonic() + 5
+    while registry.version('disaster') != second and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert registry.model('disaster') == 'v2'
+    assert registry.stats()['disaster']['version'] == second
+
+
+def test_failed_load_is_retried_when_pointer_changes_or_after_backoff(tmp_path):
+    now = [0.0]
+    registry = ModelRegistry(models_dir=str(tmp_path), mmap_mode=None, clock=lambda: now[0], retry_interval=30)
+    assert not CropClassifier(models=registry).available()
+    with pytest.raises(FileNotFoundError):
+        registry.get('disaster')
+
+    os.makedirs(tmp_path / 'disaster')
+    joblib.dump('flat', tmp_path / 'disaster' / 'model.joblib')
+    joblib.dump(['JAN'], tmp_path / 'disaster' / 'features.joblib')
+    with pytest.raises(FileNotFoundError):
+        registry.get('disaster')  # the failure is remembered, the new files are not looked at yet
+    now[0] = 30.0
+    assert registry.model('disaster') == 'flat'
+
+    with pytest.raises(FileNotFoundError):
+        registry.get('crop')
+    version = publish('crop', {'model': 'v1'}, models_dir=str(tmp_path))
+    assert registry.get('crop').version == version  # a new CURRENT is picked up at once
@@ -0,0 +1,40 @@
+import os
+
+import pandas as pd
+
+from crop_inference import CROP_FEATURES
+from model_selection import best_params, fold_cache, search, select
+
+crops = pd.read_csv('dataset/Crop_recommendation.csv').sample(660, random_state=0)
+SPACE = {'n_estimators': (5, 20), 'max_depth': (None, 4), 'max_features': ('sqrt',)}
+
+
+def test_selection_trades_accuracy_for_serving_cost():
+    fast = {'params': 'fast', 'folds': 3, 'score': 0.970, 'latency_ms': 0.2, 'size_bytes': 2**20}
+    slow = {'params': 'slow', 'folds': 3, 'score': 0.975, 'latency_ms': 2.0, 'size_bytes': 8 * 2**20}
+    shallow = {'params': 'shallow', 'folds': 1, 'score': 0.99, 'latency_ms': 0.1, 'size_bytes': 1}
+    assert select([fast, slow, shallow])['params'] == 'fast'
+    assert select([fast, slow], latency_weight=0, size_weight=0)['params'] == 'slow'
+    assert select([{'params': 'none', 'folds': 0}]) is None
+
+
+def test_search_halves_configurations_and_reuses_folds(tmp_path):
+    X, y = crops[CROP_FEATURES], crops['label']
+    result = search(X, y, base={'random_state': 0}, space=SPACE, n_splits=3, n_jobs=1, cache_dir=str(tmp_path))
+    assert result['fits'] == 4 + 2 + 1 and not result['exhausted']
+    assert sorted(r['folds'] for r in result['records']) == [1, 1, 2, 3]
+    best = result['best']
+    assert best['folds'] == 3 and best['params']['random_state'] == 0
+    assert best['score'] > 0.8 and best['latency_ms'] > 0 and best['size_bytes'] > 0
+
+    path = fold_cache(X, y, True, n_splits=3, seed=0, cache_dir=str(tmp_path))
+    written = os.path.getmtime(os.path.join(path, 'folds.npz'))
+    assert fold_cache(X, y, True, n_splits=3, seed=0, cache_dir=str(tmp_path)) == path
+    assert os.path.getmtime(os.path.join(path, 'folds.npz')) == written
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_exhausted_budget_keeps_default_params(tmp_path):
+    base = {'n_estimators': 100, 'random_state': 42}
+    assert best_params(crops[CROP_FEATURES], crops['label'], base, n_jobs=1, budget=0,
+                       cache_dir=str(tmp_path)) == base
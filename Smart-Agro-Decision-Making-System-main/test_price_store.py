@@ -0,0 +1,58 @@
+import io
+from datetime import date
+
+import app as app_module
+from price_store import PriceStore
+
+CSV_BODY = (
+    'Commodity,Market,Arrival_Date,Modal Price\n'
+    'Rice,Guntur,03/01/2024,4000\n'
+    'Rice,Guntur,29/01/2024,4200\n'
+    'Rice,Tenali,02/02/2024,4500\n'
+    'Wheat,Guntur,02/02/2024,2500\n'
+    'Rice,Guntur,05/03/2024,\n'
+).encode('utf-8')
+
+
+def rollup(store, *key):
+    return store.connect().execute(
+        'SELECT n, total, low, high FROM rollups WHERE period = ? AND crop = ? AND market = ? AND start = ?',
+        key
+    ).fetchone()
+
+
+def test_csv_ingest_maintains_rollups_incrementally(tmp_path):
+    store = PriceStore(str(tmp_path / 'prices.sqlite'))
+    assert store.ingest_csv(io.BytesIO(CSV_BODY)) == 4
+    assert rollup(store, 'month', 'rice', 'guntur', '2024-01-01') == (2, 8200.0, 4000.0, 4200.0)
+    assert rollup(store, 'week', 'rice', 'guntur', '2024-01-29') == (1, 4200.0, 4200.0, 4200.0)
+
+    store.ingest([('Rice', 'Guntur', '2024-01-15', 3800)])
+    assert rollup(store, 'month', 'rice', 'guntur', '2024-01-01') == (3, 12000.0, 3800.0, 4200.0)
+    assert rollup(store, 'month', 'rice', '*', '2024-01-01') == (3, 12000.0, 3800.0, 4200.0)
+    assert store.connect().execute('SELECT COUNT(*) FROM ticks').fetchone() == (5,)
+
+
+def test_history_reads_latest_months_and_falls_back_to_all_markets(tmp_path):
+    store = PriceStore(str(tmp_path / 'prices.sqlite'))
+    store.ingest((('rice', 'guntur', date(2023, month, 10), 1000 + month) for month in range(1, 13)))
+    store.ingest([('rice', 'tenali', date(2023, 12, 1), 2000)])
+
+    history = store.monthly_history('Rice', 'Guntur', months=3)
+    assert [(start, average) for start, average, _, _ in history] == [
+        (date(2023, 10, 1), 1010.0), (date(2023, 11, 1), 1011.0), (date(2023, 12, 1), 1012.0)]
+
+    [(_, average, low, high)] = store.monthly_history('rice', 'nellore', months=1)
+    assert (average, low, high) == (1506.0, 1012.0, 2000.0)
+    assert PriceStore(str(tmp_path / 'missing.sqlite')).monthly_history('rice', 'guntur') == []
+
+
+def test_chart_uses_store_when_it_has_history(tmp_path, monkeypatch):
+    store = PriceStore(str(tmp_path / 'prices.sqlite'))
+    store.ingest([('rice', 'guntur', date(2024, 1, 5), 4000), ('rice', 'guntur', date(2024, 2, 5), 4400)])
+    monkeypatch.setattr(app_module, 'price_store', store)
+
+    chart = app_module.get_historical_prices('rice', 'Guntur')
+    assert chart == {'months': ['Jan 2024', 'Feb 2024'], 'prices': [4000.0, 4400.0],
+                     'current_price': 4400.0, 'price_change': 10.0}
+    assert len(app_module.get_historical_prices('cotton', 'Guntur')['prices']) == 6
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import LabelEncoder
+
+import production_ingest
+import train_model
+from model_registry import ModelRegistry
+from production_ingest import fit_encoders, read_chunks, training_chunks
+
+
+def write_archive(path, rows=600):
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({
+        'State_Name': 'Kerala',
+        'District_Name': rng.choice(['WAYANAD', 'IDUKKI', 'KOLLAM'], rows),
+        'Crop_Year': 2010,
+        'Season': rng.choice(['Kharif     ', 'Rabi       ', 'Autumn     '], rows),
+        'Crop': rng.choice(['Rice', 'Banana', 'Pepper', 'Tea'], rows),
+        'Area': rng.uniform(1, 100, rows).round(1),
+        'Production': rng.uniform(10, 1000, rows).round(1),
+    })
+    frame.loc[7, 'Production'] = np.nan
+    frame.to_csv(path, index=False)
+    return frame.dropna()
+
+
+def test_chunked_passes_match_whole_file_encoding(tmp_path, monkeypatch):
+    monkeypatch.setattr(production_ingest, 'MIN_CHUNK_ROWS', 100)
+    monkeypatch.setattr(production_ingest, 'chunk_rows', lambda limit: 100)
+    path = str(tmp_path / 'production.csv')
+    frame = write_archive(path)
+
+    crop_encoder, district_encoder, total = fit_encoders(path)
+    assert total == len(frame) == 599
+    assert list(crop_encoder.classes_) == list(LabelEncoder().fit(frame['Crop']).classes_)
+
+    chunks = list(training_chunks(crop_encoder, district_encoder, path))
+    assert len(chunks) == 6
+    X = pd.concat([X for X, _ in chunks], ignore_index=True)
+    assert list(X['crop']) == list(crop_encoder.transform(frame['Crop']))
+    assert list(X['district']) == list(district_encoder.transform(frame['District_Name']))
+    assert set(X['season']) == {0, 1, -1}
+    np.testing.assert_array_equal(np.concatenate([y for _, y in chunks]), frame['Production'])
+
+
+def test_memory_ceiling_is_enforced(tmp_path):
+    path = str(tmp_path / 'production.csv')
+    write_archive(path)
+    with pytest.raises(MemoryError):
+        list(read_chunks(path, memory_limit_mb=1))
+
+
+def test_market_stage_grows_forest_chunk_by_chunk(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(production_ingest, 'MIN_CHUNK_ROWS', 100)
+    monkeypatch.setattr(production_ingest, 'chunk_rows', lambda limit: 100)
+    monkeypatch.setattr(train_model, 'MARKET_PARAMS', {'n_estimators': 10, 'random_state': 42})
+    (tmp_path / 'dataset').mkdir()
+    write_archive(tmp_path / 'dataset' / 'crop_production.csv')
+
+    assert train_model.train_market_price(n_jobs=1) is True
+    loaded = ModelRegistry(str(tmp_path / 'models')).get('market')
+    assert loaded['model'].n_trees == 10
+    assert list(loaded['model'].feature_names_in_) == ['crop', 'district', 'season', 'area']
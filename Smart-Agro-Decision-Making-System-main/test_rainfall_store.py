@@ -0,0 +1,59 @@
+import os
+
+import numpy as np
+
+import rainfall_store
+from rainfall_store import load_table
+
+CSV_TEXT = (
+    'STATE_UT_NAME,DISTRICT,JAN,FEB,MAR,APR,MAY,JUN,JUL,AUG,SEP,OCT,NOV,DEC,ANNUAL\n'
+    'KERALA,WAYANAD,10,20,30,40,50,60,70,80,90,100,110,120,780\n'
+    'KERALA,IDUKKI,1,2,3,4,5,6,7,8,9,10,11,NA,66\n'
+)
+
+
+def write_source(tmp_path, text):
+    source = tmp_path / 'normals.csv'
+    source.write_text(text)
+    return str(source)
+
+
+def test_lookup_by_key_pair(tmp_path):
+    source = write_source(tmp_path, CSV_TEXT)
+    table = load_table('district', cache_dir=str(tmp_path / 'cache'), source=source)
+
+    assert len(table) == 2
+    assert table.values.dtype == np.float32
+    assert isinstance(table.values, np.memmap)
+    assert table.monthly(' kerala', 'Wayanad').tolist() == [10, 20, 30, 40, 50, 60, 70, 80, 90, 100, 110, 120]
+    assert np.isnan(table.monthly('KERALA', 'IDUKKI')[-1])
+    assert table.get('KERALA', 'IDUKKI', ['ANNUAL']).tolist() == [66]
+    assert table.row('KERALA', 'PALAKKAD') is None
+
+
+def test_rebuilt_only_when_content_changes(tmp_path, monkeypatch):
+    source = write_source(tmp_path, CSV_TEXT)
+    cache_dir = str(tmp_path / 'cache')
+    load_table('district', cache_dir=cache_dir, source=source)
+
+    builds = []
+    original_build = rainfall_store.build_table
+    monkeypatch.setattr(rainfall_store, 'build_table',
+                        lambda *args, **kwargs: builds.append(1) or original_build(*args, **kwargs))
+
+    os.utime(source, ns=(0, 0))
+    load_table('district', cache_dir=cache_dir, source=source)
+    assert builds == []
+
+    write_source(tmp_path, CSV_TEXT.replace('780', '781'))
+    table = load_table('district', cache_dir=cache_dir, source=source)
+    assert builds == [1]
+    assert table.get('KERALA', 'WAYANAD', ['ANNUAL']).tolist() == [781]
+
+
+def test_frame_matches_source_layout():
+    table = rainfall_store.subdivision_rainfall()
+    frame = table.frame()
+    assert list(frame.columns[:2]) == ['SUBDIVISION', 'YEAR']
+    assert len(frame) == len(table) == 4116
+    assert table.row('KERALA', 1901) is not None
@@ -0,0 +1,63 @@
+from app import get_crop_recommendation, check_scheme_eligibility, cached_scheme_eligibility
+from response_cache import ResponseCache, memoize, crop_profile_key, snap
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_and_ttl():
+    clock = FakeClock()
+    cache = ResponseCache(maxsize=2, ttl=10, clock=clock)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == (True, 1)
+    cache.put('c', 3)  # evicts 'b', the least recently used
+    assert cache.get('b') == (False, None)
+    assert cache.get('c') == (True, 3)
+
+    clock.now = 11
+    assert cache.get('a') == (False, None)
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['expirations']) == (2, 2, 1, 1)
+
+
+def test_version_change_drops_entries():
+    version = [object()]
+    cache = ResponseCache(version=lambda: version[0])
+    cache.put('a', 1)
+    version[0] = object()
+    assert cache.get('a') == (False, None)
+    assert cache.stats()['invalidations'] == 1
+
+
+def test_crop_inputs_are_quantized_and_scored_at_the_bucket():
+    assert snap(6.34, 0.1) == 6.3
+    assert snap(604, 10) == 600
+    assert snap(27.7, 0.5) == 27.5
+
+    calls = []
+
+    def score(*args):
+        calls.append(args)
+        return get_crop_recommendation(*args)
+
+    cached = memoize(ResponseCache(), crop_profile_key)(score)
+    first = cached(' Loamy', 6.34, 604, 27.7)
+    second = cached('loamy', 6.26, 596, 27.6)
+    assert first is second
+    assert calls == [('loamy', 6.3, 600.0, 27.5)]
+    assert first == get_crop_recommendation('loamy', 6.3, 600, 27.5)
+
+
+def test_scheme_cache_ignores_fields_the_rules_do_not_read():
+    farmer = {'land_ownership': 'own', 'caste_category': 'obc', 'annual_income': 120000, 'age': 45,
+              'bank_account': True, 'aadhaar_linked': True}
+    first = cached_scheme_eligibility({**farmer, 'name': 'Ravi', 'district': 'Guntur'})
+    second = cached_scheme_eligibility({**farmer, 'name': 'Sita', 'district': 'Krishna'})
+    assert first is second
+    assert first == check_scheme_eligibility(farmer)
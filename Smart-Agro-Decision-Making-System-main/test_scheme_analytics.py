@@ -0,0 +1,58 @@
+import csv
+import os
+
+import numpy as np
+import pytest
+
+import app as app_module
+from scheme_analytics import AnalyticsSource, BeneficiaryAnalytics, PROCESSED_CSV, pm_kisan
+
+
+def test_range_totals_match_direct_sums():
+    analytics = pm_kisan.current()
+    assert analytics.beneficiaries.shape == (len(analytics.states), len(analytics.instalments))
+    columns = analytics.columns(8, 12)
+    beneficiaries, amount = analytics.range_totals(columns)
+    np.testing.assert_allclose(beneficiaries, np.nansum(analytics.beneficiaries[:, columns], axis=1))
+    np.testing.assert_allclose(amount, np.nansum(analytics.amount_crore[:, columns], axis=1))
+    with pytest.raises(ValueError):
+        analytics.columns(12, 8)
+
+
+def test_top_states_and_state_report():
+    analytics = BeneficiaryAnalytics(['A', 'B', 'C'], [1, 2], ['p1', 'p2'],
+                                     [[100, 110], [300, np.nan], [200, 260]],
+                                     [[2, 2.2], [6, np.nan], [4, 5.2]])
+    assert [row['state'] for row in analytics.top(metric='beneficiaries')] == ['C', 'B', 'A']
+    assert [row['state'] for row in analytics.top(k=2, metric='growth')] == ['C', 'A']
+    assert analytics.top(metric='per_beneficiary')[0]['value'] == 200000.0
+
+    report = analytics.state_report(analytics.state(' c '))
+    assert report['total_beneficiaries'] == 460
+    second = report['instalments'][1]
+    assert (second['change'], second['change_pct'], second['national_rank']) == (60, 30.0, 1)
+    assert analytics.state_report(1)['instalments'][1]['beneficiaries'] is None
+
+
+def test_endpoints_and_reload(tmp_path):
+    client = app_module.app.test_client()
+    body = client.get('/api/schemes/pm-kisan/top?k=3&from=18').get_json()
+    assert len(body['states']) == 3 and body['states'][0]['rank'] == 1
+    assert client.get('/api/schemes/pm-kisan/states/kerala').get_json()['state'] == 'Kerala'
+    assert client.get('/api/schemes/pm-kisan/states/Atlantis').status_code == 404
+    assert client.get('/api/schemes/pm-kisan?from=1').status_code == 400
+    assert client.get('/api/schemes/pm-kisan/top?metric=area').status_code == 400
+
+    export = client.get('/api/schemes/pm-kisan/export.csv?state=Goa&from=18')
+    rows = list(csv.reader(export.get_data(as_text=True).splitlines()))
+    assert rows[0][0] == 'state' and [row[1] for row in rows[1:]] == ['18', '19']
+
+    with open(PROCESSED_CSV, newline='') as f:
+        lines = f.read().splitlines()
+    path = tmp_path / 'processed.csv'
+    path.write_text('\n'.join(lines[:3]))
+    source = AnalyticsSource(str(path))
+    assert len(source.current().states) == 2
+    path.write_text('\n'.join(lines[:5]))
+    os.utime(path, ns=(0, 10**18))
+    assert len(source.current().states) == 4
@@ -0,0 +1,67 @@
+import io
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from app import check_scheme_eligibility
+from knowledge_base import current
+from scheme_rules import bulk_eligibility
+
+SCHEMES = current().schemes
+
+
+def reference_eligible(scheme, farmer):
+    # Original if/elif evaluation of one scheme's criteria
+    for key, req_value in scheme.eligibility.items():
+        if key in ('land_ownership', 'caste_category') and farmer[key] not in req_value:
+            return False
+        if key == 'annual_income_max' and farmer['annual_income'] > req_value:
+            return False
+        if key in ('bank_account', 'aadhaar_linked') and not farmer[key]:
+            return False
+        if key == 'age_min' and farmer['age'] < req_value:
+            return False
+        if key == 'age_max' and farmer['age'] > req_value:
+            return False
+    return True
+
+
+def all_farmers():
+    for land, caste, income, age, bank, aadhaar in itertools.product(
+            ['own', 'lease', 'none'], ['general', 'obc', 'sc', 'st'],
+            [0, 150000, 150001, 500000, 500001], [18, 50, 75, 76], [True, False], [True, False]):
+        yield {'land_ownership': land, 'caste_category': caste, 'annual_income': income,
+               'age': age, 'bank_account': bank, 'aadhaar_linked': aadhaar}
+
+
+def test_single_farmer_matches_reference():
+    for farmer in all_farmers():
+        expected = [scheme for scheme in SCHEMES if reference_eligible(scheme, farmer)]
+        assert check_scheme_eligibility(farmer) == expected
+
+
+def test_bulk_matrix_matches_single_checks():
+    farmers = list(all_farmers())
+    matrix = bulk_eligibility(pd.DataFrame(farmers))
+    assert matrix.shape == (len(farmers), len(SCHEMES))
+    for row, farmer in zip(matrix, farmers):
+        assert [s.name for s, ok in zip(SCHEMES, row) if ok] == \
+               [s.name for s in check_scheme_eligibility(farmer)]
+
+
+def test_bulk_from_csv_with_yes_no_flags():
+    csv_text = (
+        'name,land_ownership,caste_category,annual_income,age,bank_account,aadhaar_linked\n'
+        'A,own,general,100000,40,yes,yes\n'
+        'B,none,sc,100000,40,yes,yes\n'
+        'C,lease,obc,200000,80,no,yes\n'
+    )
+    matrix = bulk_eligibility(io.StringIO(csv_text), chunksize=2)
+    names = [scheme.name for scheme in SCHEMES]
+    assert matrix.shape == (3, len(SCHEMES))
+    assert matrix[0].all()
+    assert [names[j] for j in np.flatnonzero(matrix[1])] == ['Soil Health Card Scheme']
+    assert [names[j] for j in np.flatnonzero(matrix[2])] == [
+        'Soil Health Card Scheme', 'National Mission for Sustainable Agriculture'
+    ]
@@ -0,0 +1,38 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from model_registry import LoadedModel
+from shadow import ShadowEvaluator
+
+
+class CandidateRegistry:
+    def __init__(self, model):
+        self.loaded = LoadedModel('crop', {'model': model}, 0.0, None, None, 'v2') if model else None
+
+    def candidate(self, name):
+        return self.loaded
+
+
+def test_sampled_predictions_are_compared_with_candidate():
+    executor = ThreadPoolExecutor(max_workers=1)
+    evaluator = ShadowEvaluator('crop', lambda loaded, row: loaded.model(row), CandidateRegistry(lambda row: row % 2),
+                                sample_rate=1.0, executor=executor)
+    for row in range(4):
+        assert evaluator.observe(row, 0, 0.001, 'v1')
+    executor.shutdown(wait=True)
+
+    stats = evaluator.stats()
+    assert stats['samples'] == 4
+    assert stats['agreement'] == 0.5
+    assert stats['primary_mean_ms'] == 1.0
+
+
+def test_nothing_is_queued_when_sampling_is_off_or_there_is_no_candidate():
+    executor = ThreadPoolExecutor(max_workers=1)
+    off = ShadowEvaluator('crop', lambda loaded, row: row, CandidateRegistry(abs), sample_rate=0.0)
+    assert not off.observe(1, 1, 0.001)
+
+    no_candidate = ShadowEvaluator('crop', lambda loaded, row: row, CandidateRegistry(None),
+                                   sample_rate=1.0, executor=executor)
+    assert no_candidate.observe(1, 1, 0.001)
+    executor.shutdown(wait=True)
+    assert no_candidate.stats()['samples'] == 0
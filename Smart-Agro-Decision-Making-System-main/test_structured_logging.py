@@ -0,0 +1,79 @@
+import io
+import json
+import logging
+import threading
+
+import pytest
+
+from app import app
+from structured_logging import configure_logging, dropped_records, shutdown_logging, parse_sample_rates
+
+
+@pytest.fixture
+def log_stream():
+    stream = io.StringIO()
+    yield stream
+    configure_logging()
+
+
+def read_entries(stream):
+    shutdown_logging()  # drains the writer thread
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_records_are_written_as_json_by_the_listener(log_stream):
+    configure_logging('DEBUG', json_output=True, sample_rates={}, target=logging.StreamHandler(log_stream))
+    try:
+        raise ValueError('bad model')
+    except ValueError:
+        logging.getLogger('test').warning('Scored %d crops', 3, exc_info=True, extra={'fields': {
+            'state': 'Kerala', 'message': 'spoofed', 'level': 'DEBUG'}})
+
+    [entry] = read_entries(log_stream)
+    assert entry['level'] == 'WARNING'
+    assert entry['message'] == 'Scored 3 crops'
+    assert entry['state'] == 'Kerala'
+    assert (entry['fields.message'], entry['fields.level']) == ('spoofed', 'DEBUG')
+    assert 'ValueError: bad model' in entry['exc']
+
+
+def test_route_sampling_keeps_warnings(log_stream):
+    configure_logging('DEBUG', sample_rates={'/disaster': 0.0}, target=logging.StreamHandler(log_stream))
+    logger = logging.getLogger('test')
+    with app.test_request_context('/disaster'):
+        app.preprocess_request()
+        logger.debug('dropped')
+        logger.warning('kept')
+    logger.debug('outside a request')
+
+    entries = read_entries(log_stream)
+    assert [entry['message'] for entry in entries] == ['kept', 'outside a request']
+    assert entries[0]['route'] == '/disaster'
+
+
+class StalledHandler(logging.StreamHandler):
+    def __init__(self, stream, release):
+        super().__init__(stream)
+        self.release = release
+
+    def emit(self, record):
+        self.release.wait()
+        super().emit(record)
+
+
+def test_full_queue_drops_and_counts_records(log_stream):
+    release = threading.Event()
+    configure_logging('INFO', sample_rates={}, target=StalledHandler(log_stream, release), queue_size=5)
+    for i in range(50):
+        logging.getLogger('test').info('record %d', i)
+    dropped = dropped_records()
+    assert 50 - 5 - 1 <= dropped < 50  # the writer holds at most one record besides the queue
+    release.set()
+    assert len(read_entries(log_stream)) == 50 - dropped
+
+
+def test_parse_sample_rates():
+    assert parse_sample_rates('/crop-recommendation=0.1, *=0.5') == ({'/crop-recommendation': 0.1}, 0.5)
+    assert parse_sample_rates('') == ({}, 1.0)
+    with pytest.raises(ValueError):
+        parse_sample_rates('0.5')
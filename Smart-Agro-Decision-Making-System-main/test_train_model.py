@@ -0,0 +1,43 @@
+import train_model
+
+
+def test_allocate_cores_by_weight():
+    cores = train_model.allocate_cores(['crop', 'market', 'disaster', 'schemes'], total=12)
+    assert cores == {'crop': 3, 'market': 5, 'disaster': 3, 'schemes': 1}
+    assert train_model.allocate_cores(['schemes'], total=4) == {'schemes': 1}
+    assert all(n == 1 for n in train_model.allocate_cores(['crop', 'market'], total=1).values())
+
+
+def test_unchanged_stage_is_skipped(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'input.csv').write_text('a,b\n1,2\n')
+    calls = []
+
+    def fake_stage(n_jobs=None):
+        calls.append(n_jobs)
+        (tmp_path / 'artifact.bin').write_text('model')
+        return True
+
+    monkeypatch.setattr(train_model, 'STAMP_FILE', 'models/.stages.json')
+    monkeypatch.setattr(train_model, 'STAGES', {'fake': {
+        'func': fake_stage, 'inputs': ['input.csv'], 'params': {'depth': 3},
+        'outputs': ['artifact.bin'], 'weight': 1,
+    }})
+
+    assert train_model.main(parallel=False)['fake'][0] is True
+    assert train_model.main(parallel=False)['fake'][0] == 'SKIPPED'
+    assert len(calls) == 1
+
+    (tmp_path / 'input.csv').write_text('a,b\n1,3\n')
+    assert train_model.main(parallel=False)['fake'][0] is True
+    assert len(calls) == 2
+
+    train_model.STAGES['fake']['params'] = {'depth': 4}
+    assert train_model.main(parallel=False)['fake'][0] is True
+    assert train_model.main(parallel=False, force=True)['fake'][0] is True
+    assert len(calls) == 4
+
+    (tmp_path / 'input.csv').write_text('a,b\n1,4\n')
+    assert train_model.main(parallel=False, candidate=True)['fake'][0] is True
+    assert train_model.main(parallel=False)['fake'][0] is True  # the candidate run left no stamp
+    assert len(calls) == 6
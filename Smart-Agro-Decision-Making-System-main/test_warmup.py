@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+
+from flask import Flask
+
+from warmup import Readiness, init_app
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_python(code, **env):
+    return subprocess.run([sys.executable, '-c', code], cwd=HERE, capture_output=True, text=True,
+                          env={**os.environ, **env}, timeout=60)
+
+
+def test_importing_app_does_not_import_heavy_libraries():
+    result = run_python("import sys, app; print(sorted(m for m in ('pandas', 'sklearn', 'joblib') if m in sys.modules))")
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == '[]'
+
+
+def test_readyz_flips_after_warmup_and_records_failures():
+    def broken():
+        raise RuntimeError('no model')
+
+    state = Readiness(steps={'ok': lambda: {'rows': 1}, 'broken': broken}, budget=60)
+    app = Flask(__name__)
+    init_app(app, mode='probe', state=state)
+    client = app.test_client()
+
+    assert client.get('/healthz').status_code == 200
+    client.get('/readyz')
+    assert state.wait(timeout=10)
+    response = client.get('/readyz')
+    assert response.status_code == 200
+    steps = response.get_json()['steps']
+    assert steps['ok']['ok'] and steps['ok']['rows'] == 1
+    assert steps['broken'] == {'ok': False, 'seconds': steps['broken']['seconds'], 'error': 'no model'}
+
+
+def test_logging_keeps_working_in_forked_workers():
+    code = (
+        "import logging, os, app, structured_logging\n"
+        "pid = os.fork()\n"
+        "if pid == 0:\n"
+        "    logging.getLogger('worker').warning('from worker')\n"
+        "    structured_logging.shutdown_logging()\n"
+        "    os._exit(0)\n"
+        "os.waitpid(pid, 0)\n"
+    )
+    result = run_python(code, SMART_AGRO_WARMUP='off')
+    assert result.returncode == 0, result.stderr
+    assert 'from worker' in result.stderr
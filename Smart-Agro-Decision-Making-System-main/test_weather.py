@@ -0,0 +1,66 @@
+import asyncio
+import threading
+import time
+
+from weather import HttpWeatherProvider, ReplayServer, WeatherProvider, WeatherService, mock_forecast
+
+
+def recordings(n):
+    return {('Kerala', f'District {i}'): [{**day, 'high': i} for day in mock_forecast()] for i in range(n)}
+
+
+def test_http_provider_fetches_many_districts_over_pooled_connections():
+    with ReplayServer(recordings(20), latency=0.01) as server:
+        provider = HttpWeatherProvider(server.url, pool_size=4)
+        districts = [('kerala', f'district {i}') for i in range(20)] + [('kerala', 'nowhere')]
+        results = asyncio.run(provider.fetch_many(districts))
+
+    assert [days[0]['high'] for days in results[:20]] == list(range(20))
+    assert isinstance(results[20], ConnectionError)
+    assert server.requests == 21
+    assert provider.connections_opened == server.connections <= 4
+
+
+class CountingProvider(WeatherProvider):
+    def __init__(self):
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    async def fetch(self, state, district):
+        self.calls += 1
+        while not self.release.is_set():
+            await asyncio.sleep(0.005)
+        return [{'call': self.calls}]
+
+
+def test_service_serves_fresh_then_stale_while_revalidating():
+    now = [0.0]
+    provider = CountingProvider()
+    service = WeatherService(provider, ttl=10, stale_ttl=100, clock=lambda: now[0])
+
+    assert service.forecast('Kerala', 'Wayanad') == [{'call': 1}]
+    assert service.forecast(' kerala', 'WAYANAD ') == [{'call': 1}]
+
+    now[0] = 50
+    provider.release.clear()
+    assert service.forecast('Kerala', 'Wayanad') == [{'call': 1}]  # stale, refresh started
+    assert service.forecast('Kerala', 'Wayanad') == [{'call': 1}]  # refresh already running
+    provider.release.set()
+    deadline = time.time() + 5
+    while service.forecast('Kerala', 'Wayanad') != [{'call': 2}] and time.time() < deadline:
+        time.sleep(0.01)
+    assert provider.calls == 2
+
+    now[0] = 500
+    assert service.forecast('Kerala', 'Wayanad') == [{'call': 3}]
+
+
+def test_slow_provider_does_not_block_past_wait_seconds():
+    provider = CountingProvider()
+    provider.release.clear()
+    service = WeatherService(provider, wait_seconds=0.05)
+    start = time.perf_counter()
+    assert service.forecast('Kerala', 'Wayanad') is None
+    assert time.perf_counter() - start < 1
+    provider.release.set()
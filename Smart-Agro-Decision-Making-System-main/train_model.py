@@ -5,9 +5,43 @@ from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 import joblib
+import argparse
+import hashlib
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
-def train_crop_recommendation():
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from rainfall_store import MONTHS
+from feature_store import EXTENDED_FEATURES, FEATURE_VERSION, subdivision_features
+from model_registry import publish, CURRENT, CANDIDATE
+from model_selection import best_params
+from production_ingest import PRODUCTION_CSV, fit_encoders, training_chunks, rss_mb
+
+# Hyperparameters per stage; they are part of each stage's content hash
+CROP_PARAMS = {'n_estimators': 100, 'random_state': 42}
+MARKET_PARAMS = {'n_estimators': 100, 'random_state': 42}
+DISASTER_PARAMS = {'n_estimators': 100, 'random_state': 42, 'class_weight': 'balanced'}
+
+# Cap on the market model's held-out rows; the holdout share shrinks below 20% to stay under it
+MARKET_HOLDOUT_ROWS = 200_000
+
+# Disaster model inputs: 'monthly' (the 12 months) or 'extended' (feature_store.EXTENDED_FEATURES)
+DISASTER_FEATURE_SET = os.environ.get('SMART_AGRO_DISASTER_FEATURES', 'monthly')
+
+# Pointer a finished model is published under: CURRENT, or CANDIDATE with --candidate
+PUBLISH_POINTER = CURRENT
+
+# With --select, the crop and disaster stages search hyperparameters (see model_selection.py)
+SELECT_PARAMS = False
+
+def train_crop_recommendation(n_jobs=None):
     """Train crop recommendation model"""
     try:
         print("\n=== Training Crop Recommendation Model ===")
@@ -20,13 +54,15 @@ def train_crop_recommendation():
         # Split and train
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
         
-        model = RandomForestClassifier(n_estimators=100, random_state=42)
+        params = CROP_PARAMS
+        if SELECT_PARAMS:
+            params = best_params(X_train, y_train, CROP_PARAMS, classifier=True, n_jobs=n_jobs)
+        model = RandomForestClassifier(**params, n_jobs=n_jobs)
         model.fit(X_train, y_train)
         
-        # Save model
-        model_path = 'models/crop/model.joblib'
-        joblib.dump(model, model_path)
-        print(f"Model saved to {model_path}")
+        # Save model as a new version
+        version = publish('crop', {'model': model}, models_dir='models', pointer=PUBLISH_POINTER)
+        print(f"Model saved as crop version {version} ({PUBLISH_POINTER})")
         print(f"Test Accuracy: {model.score(X_test, y_test):.4f}")
         return True
         
@@ -34,68 +70,61 @@ def train_crop_recommendation():
         print(f"Error in crop recommendation training: {str(e)}")
         return False
 
-def train_market_price():
-    """Train market price prediction model"""
+def train_market_price(n_jobs=None):
+    """Train the market model, which predicts production in tonnes, streaming the production archive in chunks"""
     try:
         print("\n=== Training Market Price Model ===")
-        df = pd.read_csv('dataset/crop_production.csv')
-        print(f"Loaded {len(df)} records")
-        
-        # Preprocessing
-        df = df.dropna()
-        le_crop = LabelEncoder()
-        le_district = LabelEncoder()
-        
-        X = pd.DataFrame({
-            'crop': le_crop.fit_transform(df['Crop']),
-            'district': le_district.fit_transform(df['District_Name']),
-            'season': df['Season'].map({'Kharif': 0, 'Rabi': 1, 'Whole Year': 2, 'Summer': 3}).fillna(-1),
-            'area': df['Area']
-        })
-        y = df['Production']
-        
-        # Split and train
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        
-        model = RandomForestRegressor(n_estimators=100, random_state=42)
-        model.fit(X_train, y_train)
-        
-        # Save model and encoders
-        model_path = 'models/market/'
-        os.makedirs(model_path, exist_ok=True)
-        joblib.dump(model, os.path.join(model_path, 'model.joblib'))
-        joblib.dump(le_crop, os.path.join(model_path, 'crop_encoder.joblib'))
-        joblib.dump(le_district, os.path.join(model_path, 'district_encoder.joblib'))
-        
-        print(f"Model saved to {model_path}")
-        print(f"Test R² Score: {model.score(X_test, y_test):.4f}")
+        # First pass: encoder vocabularies and the row count
+        le_crop, le_district, total = fit_encoders(PRODUCTION_CSV)
+        print(f"Found {total} records, {len(le_crop.classes_)} crops, {len(le_district.classes_)} districts")
+        if not total:
+            raise ValueError(f"{PRODUCTION_CSV} has no complete rows")
+        
+        # Second pass: grow the forest chunk by chunk, each chunk adding its
+        # share of the trees, and hold out the same fraction of every chunk
+        holdout = min(0.2, MARKET_HOLDOUT_ROWS / total)
+        target = MARKET_PARAMS['n_estimators']
+        model = RandomForestRegressor(**{**MARKET_PARAMS, 'n_estimators': 0}, warm_start=True, n_jobs=n_jobs)
+        X_tests, y_tests = [], []
+        seen = 0
+        for i, (X, y) in enumerate(training_chunks(le_crop, le_district, PRODUCTION_CSV)):
+            test = np.random.default_rng(MARKET_PARAMS['random_state'] + i).random(len(y)) < holdout
+            X_tests.append(X[test])
+            y_tests.append(y[test])
+            seen += len(y)
+            model.n_estimators = max(model.n_estimators + 1, round(target * seen / total))
+            model.fit(X[~test], y[~test])
+            print(f"Chunk {i + 1}: {seen}/{total} rows, {model.n_estimators} trees, {rss_mb():.0f} MB")
+        
+        # Save model and encoders as a new version
+        version = publish('market', {
+            'model': model, 'crop_encoder': le_crop, 'district_encoder': le_district,
+        }, models_dir='models', pointer=PUBLISH_POINTER)
+        
+        print(f"Model saved as market version {version} ({PUBLISH_POINTER})")
+        print(f"Test R² Score: {model.score(pd.concat(X_tests), np.concatenate(y_tests)):.4f}")
         return True
         
     except Exception as e:
         print(f"Error in market price training: {str(e)}")
         return False
 
-def train_disaster_management():
+def train_disaster_management(n_jobs=-1):
     """Train disaster management model"""
     try:
         print("\n=== Training Disaster Management Model ===")
-        # Load and combine disaster datasets
-        rainfall = pd.read_csv('dataset/disastermanagement/rainfall in india 1901-2015.csv')
-        district_rain = pd.read_csv('dataset/disastermanagement/district wise rainfall normal.csv')
-        
-        print("Original rainfall data shape:", rainfall.shape)
-        print("Missing values before cleaning:")
-        print(rainfall.isnull().sum())
-        
-        # Handle missing values by filling with column mean
-        rainfall = rainfall.fillna(rainfall.mean(numeric_only=True))
+        # Read from the feature store; missing months are filled per subdivision.
+        # This stage builds the cache, which is recomputed only when the rainfall CSVs change
+        store = subdivision_features()
+        rainfall = store.frame()
+        print(f"Rainfall feature rows: {rainfall.shape} (feature store {store.data_hash})")
         
         # Create target variable: 1 if annual rainfall is in top 10%, else 0
         rainfall['is_flood_risk'] = (rainfall['ANNUAL'] > rainfall['ANNUAL'].quantile(0.9)).astype(int)
         
-        # Select features - using monthly rainfall data
-        features = ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 
-                   'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC']
+        # Select features - monthly rainfall, or the extended set
+        features = list(EXTENDED_FEATURES if DISASTER_FEATURE_SET == 'extended' else MONTHS)
+        print(f"Using {DISASTER_FEATURE_SET} features ({len(features)})")
         
         X = rainfall[features]
         y = rainfall['is_flood_risk']
@@ -108,12 +137,10 @@ def train_disaster_management():
         )
         
         # Train model with balanced class weights
-        model = RandomForestClassifier(
-            n_estimators=100, 
-            random_state=42,
-            class_weight='balanced',
-            n_jobs=-1  # Use all CPU cores
-        )
+        params = DISASTER_PARAMS
+        if SELECT_PARAMS:
+            params = best_params(X_train, y_train, DISASTER_PARAMS, classifier=True, n_jobs=n_jobs)
+        model = RandomForestClassifier(**params, n_jobs=n_jobs)
         
         print("\nTraining model...")
         model.fit(X_train, y_train)
@@ -122,14 +149,11 @@ def train_disaster_management():
         train_accuracy = model.score(X_train, y_train)
         test_accuracy = model.score(X_test, y_test)
         
-        # Save model and metadata
-        model_path = 'models/disaster/'
-        os.makedirs(model_path, exist_ok=True)
+        # Save model and metadata as a new version
+        version = publish('disaster', {'model': model, 'features': features},
+                          models_dir='models', pointer=PUBLISH_POINTER)
         
-        joblib.dump(model, os.path.join(model_path, 'model.joblib'))
-        joblib.dump(features, os.path.join(model_path, 'features.joblib'))
-        
-        print(f"\nModel saved to {model_path}")
+        print(f"\nModel saved as disaster version {version} ({PUBLISH_POINTER})")
         print(f"Training Accuracy: {train_accuracy:.4f}")
         print(f"Test Accuracy: {test_accuracy:.4f}")
         
@@ -147,7 +171,7 @@ def train_disaster_management():
         print("Traceback:", traceback.format_exc())
         return False
 
-def train_govt_schemes():
+def train_govt_schemes(n_jobs=None):
     """Train government scheme analysis model"""
     try:
         print("\n=== Training Government Scheme Analysis Model ===")
@@ -200,28 +224,188 @@ def train_govt_schemes():
         print("Traceback:", traceback.format_exc())
         return False
 
-def main():
+# Pipeline stages: inputs and hyperparameters decide whether a stage must rerun,
+# outputs must exist for a skip, and weight is its share of the CPU cores.
+STAGES = {
+    'crop': {
+        'func': train_crop_recommendation,
+        'inputs': ['dataset/Crop_recommendation.csv'],
+        'params': CROP_PARAMS,
+        'outputs': ['models/crop/CURRENT'],
+        'weight': 1,
+    },
+    'market': {
+        'func': train_market_price,
+        'inputs': [PRODUCTION_CSV],
+        'params': MARKET_PARAMS,
+        'outputs': ['models/market/CURRENT'],
+        'weight': 2,
+    },
+    'disaster': {
+        'func': train_disaster_management,
+        'inputs': ['dataset/disastermanagement/rainfall in india 1901-2015.csv',
+                   'dataset/disastermanagement/district wise rainfall normal.csv'],
+        'params': {**DISASTER_PARAMS, 'features': DISASTER_FEATURE_SET, 'feature_version': FEATURE_VERSION},
+        'outputs': ['models/disaster/CURRENT'],
+        'weight': 1,
+    },
+    'schemes': {
+        'func': train_govt_schemes,
+        'inputs': ['dataset/govtschemes.csv'],
+        'params': {},
+        'outputs': ['models/schemes/schemes_processed.csv', 'models/schemes/scheme_summary.csv',
+                    'models/schemes/states.joblib'],
+        'weight': 0,  # pandas only, a single core is enough
+    },
+}
+
+STAMP_FILE = 'models/.stages.json'
+
+def stage_hash(name):
+    """Content hash of a stage's input files and hyperparameters"""
+    stage = STAGES[name]
+    digest = hashlib.sha256(json.dumps(stage['params'], sort_keys=True).encode('utf-8'))
+    for path in stage['inputs']:
+        digest.update(path.encode('utf-8'))
+        if not os.path.exists(path):
+            digest.update(b'<missing>')
+            continue
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+def load_stamps():
+    try:
+        with open(STAMP_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_stamps(stamps):
+    os.makedirs(os.path.dirname(STAMP_FILE), exist_ok=True)
+    tmp_path = STAMP_FILE + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(stamps, f, indent=2)
+    os.replace(tmp_path, STAMP_FILE)
+
+def allocate_cores(names, total=None):
+    """Split the machine's cores across stages by weight; every stage gets at least one"""
+    total = total or os.cpu_count() or 1
+    weights = {name: STAGES[name]['weight'] for name in names}
+    weighted = sum(weights.values())
+    spare = max(total - len(names), 0)
+    return {
+        name: 1 + (spare * weight // weighted if weighted else 0)
+        for name, weight in weights.items()
+    }
+
+def run_stage(name, n_jobs, pointer=CURRENT, select=False):
+    """Run one stage in the current process; returns (success, seconds, peak RSS in MB)"""
+    global PUBLISH_POINTER, SELECT_PARAMS
+    # Set here rather than passed to the stage so it also reaches pool workers
+    PUBLISH_POINTER = pointer
+    SELECT_PARAMS = select
+    start = time.perf_counter()
+    success = STAGES[name]['func'](n_jobs=n_jobs)
+    seconds = time.perf_counter() - start
+    # ru_maxrss is KB on Linux. In a fresh worker this is the stage's own peak;
+    # with --serial it is the peak of the whole run so far.
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else None
+    return success, seconds, peak_mb
+
+def pool_context():
+    """
+    Start method for stage workers. A fork server with the heavy libraries
+    preloaded makes each fresh worker cheap; spawn is the portable fallback.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['pandas', 'sklearn.ensemble', 'train_model'])
+        return context
+    return multiprocessing.get_context('spawn')
+
+def main(force=False, parallel=True, stages=None, candidate=False, select=False):
     print(f"\n{'='*50}")
     print("Starting Model Training Pipeline")
     print(f"{'='*50}")
     
     start_time = datetime.now()
-    results = {
-        'crop': train_crop_recommendation(),
-        'market': train_market_price(),
-        'disaster': train_disaster_management(),
-        'schemes': train_govt_schemes()
-    }
+    names = list(stages or STAGES)
+    stamps = load_stamps()
+    hashes = {name: stage_hash(name) for name in names}
+    
+    # Skip stages whose inputs and hyperparameters are unchanged since the last run
+    results = {}
+    pending = []
+    for name in names:
+        unchanged = stamps.get(name) == hashes[name]
+        outputs_present = all(os.path.exists(path) for path in STAGES[name]['outputs'])
+        if unchanged and outputs_present and not force:
+            print(f"\n=== Skipping {name}: inputs unchanged, reusing existing artifacts ===")
+            results[name] = ('SKIPPED', 0.0, None)
+        else:
+            pending.append(name)
+    
+    cores = allocate_cores(pending) if pending else {}
+    pointer = CANDIDATE if candidate else CURRENT
+    if parallel and len(pending) > 1:
+        # A fresh process per stage keeps peak-memory figures per stage
+        workers = min(len(pending), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=pool_context(),
+                                 max_tasks_per_child=1) as pool:
+            futures = {name: pool.submit(run_stage, name, cores[name], pointer, select) for name in pending}
+            for name, future in futures.items():
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    print(f"Stage {name} crashed: {e}")
+                    results[name] = (False, 0.0, None)
+    else:
+        for name in pending:
+            results[name] = run_stage(name, cores[name], pointer, select)
+    
+    # Stamps describe what CURRENT was trained from; a candidate run leaves CURRENT
+    # alone, so it must not stamp, or the next plain run would skip its stages
+    if not candidate:
+        for name in pending:
+            if results[name][0] is True:
+                stamps[name] = hashes[name]
+            else:
+                stamps.pop(name, None)
+        save_stamps(stamps)
     
     # Print summary
     print("\n" + "="*50)
     print("Training Summary:")
-    for model, success in results.items():
-        status = "SUCCESS" if success else "FAILED"
-        print(f"{model.upper()}: {status}")
+    for model in names:
+        success, seconds, peak_mb = results[model]
+        if success == 'SKIPPED':
+            status = "SKIPPED"
+        else:
+            status = "SUCCESS" if success else "FAILED"
+        timing = f"{seconds:.2f}s" if success != 'SKIPPED' else "-"
+        memory = f", peak {peak_mb:.0f} MB" if peak_mb else ""
+        cpu = f", {cores[model]} cores" if model in cores else ""
+        print(f"{model.upper()}: {status} ({timing}{memory}{cpu})")
     
     print(f"\nTotal time taken: {datetime.now() - start_time}")
     print("="*50)
+    return results
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='Train the Smart Agro models')
+    parser.add_argument('--force', action='store_true', help='Retrain every stage even if its inputs are unchanged')
+    parser.add_argument('--serial', action='store_true', help='Run stages one after another in this process')
+    parser.add_argument('--candidate', action='store_true',
+                        help='Publish new models as CANDIDATE versions for shadow evaluation instead of CURRENT')
+    parser.add_argument('--select', action='store_true',
+                        help='Cross-validate hyperparameters for the crop and disaster models, weighing accuracy '
+                             'against latency and size (budget: SMART_AGRO_SELECT_BUDGET seconds); implies --force')
+    parser.add_argument('stages', nargs='*', help=f"Stages to run: {', '.join(STAGES)} (default: all)")
+    args = parser.parse_args()
+    unknown = sorted(set(args.stages) - set(STAGES))
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+    main(force=args.force or args.select, parallel=not args.serial, stages=args.stages or None,
+         candidate=args.candidate, select=args.select)
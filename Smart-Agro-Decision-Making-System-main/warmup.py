@@ -0,0 +1,190 @@
+"""
+Start-up warm-up and readiness.
+
+pandas, scikit-learn and joblib are only imported when a model is first used,
+so importing the app stays fast. Warm-up loads every model and runs one
+inference through each so the first real request does not pay for it.
+SMART_AGRO_WARMUP picks when that happens:
+
+    probe       (default) on the first /readyz call, in a background thread
+    background  in a background thread as soon as the app is imported
+    preload     synchronously at import; use with gunicorn --preload so the
+                master loads everything once and forked workers share it
+    off         never; /readyz reports ready immediately
+
+/healthz is liveness only. /readyz answers 503 until warm-up has finished.
+Start-up time is logged against SMART_AGRO_STARTUP_BUDGET (seconds).
+"""
+import logging
+import os
+import threading
+import time
+
+from flask import jsonify
+
+# Fallback start time where /proc is not available
+BOOT_STARTED = time.perf_counter()
+
+DEFAULT_BUDGET = 10.0
+
+logger = logging.getLogger(__name__)
+
+
+def process_uptime():
+    """Seconds since this process started (for a forked worker, since the fork)"""
+    try:
+        with open('/proc/self/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return uptime - int(fields[19]) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return time.perf_counter() - BOOT_STARTED
+
+
+def _warm_crop():
+    from crop_inference import crop_classifier
+    from crop_grid import crop_grid
+    from crop_scoring import score_crop_batch
+
+    score_crop_batch([{'soil_type': 'loamy', 'ph_level': 6.5, 'rainfall': 500, 'temperature': 28}])
+    # Lookup tables for the crop form's soil types
+    grid = crop_grid()
+    for soil in ('black', 'red', 'sandy', 'clay', 'loamy'):
+        grid.table(soil)
+    if crop_classifier.available():
+        # Straight to predict_proba: the micro-batcher thread must not start before a fork
+        crop_classifier.predict_proba([[90, 42, 43, 20.9, 82.0, 6.5, 203.0]])
+    return {'model': crop_classifier.available(), 'grid_rankings': len(grid.rankings)}
+
+
+def _warm_market():
+    from market_inference import market_model
+
+    usable = market_model.available()
+    if usable:
+        crops, districts = market_model.lookups()
+        if len(crops) and len(districts):
+            market_model.predict([(crops.labels[0], districts.labels[0], 'whole year', 1.0)])
+    return {'model': usable}
+
+
+def _warm_disaster():
+    from disaster_sweep import risk_table, score_districts
+    from rainfall_store import district_normals
+
+    normals = district_normals()
+    risk_table.lookup('')
+    score_districts(normals=normals)
+    return {'districts': len(normals)}
+
+
+def _warm_districts():
+    from districts import district_index
+
+    return {'districts': len(district_index().districts)}
+
+
+def _warm_schemes():
+    from scheme_analytics import pm_kisan
+
+    analytics = pm_kisan.current()
+    return {'states': len(analytics.states), 'instalments': len(analytics.instalments)}
+
+
+# name -> callable returning a small dict of details for /readyz
+STEPS = {
+    'crop': _warm_crop,
+    'market': _warm_market,
+    'disaster': _warm_disaster,
+    'districts': _warm_districts,
+    'schemes': _warm_schemes,
+}
+
+
+class Readiness:
+    """Tracks warm-up progress; ready once every step has run (failed steps included)"""
+
+    def __init__(self, steps=STEPS, budget=None):
+        self.steps = steps
+        self.budget = budget if budget is not None else float(
+            os.environ.get('SMART_AGRO_STARTUP_BUDGET', DEFAULT_BUDGET))
+        self.results = {}
+        self.boot_seconds = None
+        self._ready = threading.Event()
+        self._started = False
+        self._lock = threading.Lock()
+
+    def is_ready(self):
+        return self._ready.is_set()
+
+    def wait(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def mark_ready(self):
+        self.boot_seconds = process_uptime()
+        self._ready.set()
+
+    def run(self):
+        """Run every warm-up step in this thread, then report against the budget"""
+        for name, step in self.steps.items():
+            start = time.perf_counter()
+            try:
+                details = step()
+                self.results[name] = {'ok': True, 'seconds': round(time.perf_counter() - start, 3), **details}
+            except Exception as e:
+                logger.warning('Warm-up step %s failed: %s', name, e)
+                self.results[name] = {'ok': False, 'seconds': round(time.perf_counter() - start, 3),
+                                      'error': str(e)}
+        self.mark_ready()
+        level = logging.WARNING if self.boot_seconds > self.budget else logging.INFO
+        logger.log(level, 'Ready %.2fs after start (budget %.1fs)', self.boot_seconds, self.budget,
+                   extra={'fields': {'steps': self.results}})
+
+    def start(self, background=True):
+        """Begin warm-up once; in the background unless background is False"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        if background:
+            threading.Thread(target=self.run, name='warmup', daemon=True).start()
+        else:
+            self.run()
+
+    def status(self):
+        return {
+            'ready': self.is_ready(),
+            'boot_seconds': round(self.boot_seconds, 3) if self.boot_seconds is not None else None,
+            'budget_seconds': self.budget,
+            'steps': self.results,
+        }
+
+
+readiness = Readiness()
+
+
+def init_app(app, mode=None, state=readiness):
+    """Register /healthz and /readyz and start warm-up according to mode"""
+    mode = (mode or os.environ.get('SMART_AGRO_WARMUP', 'probe')).lower()
+    if mode not in ('probe', 'background', 'preload', 'off'):
+        raise ValueError(f'SMART_AGRO_WARMUP must be probe, background, preload or off, not {mode!r}')
+
+    @app.route('/healthz')
+    def healthz():
+        return jsonify({'status': 'ok'})
+
+    @app.route('/readyz')
+    def readyz():
+        if mode == 'probe':
+            state.start()
+        status = state.status()
+        return jsonify(status), (200 if status['ready'] else 503)
+
+    if mode == 'off':
+        state.mark_ready()
+    elif mode == 'background':
+        state.start()
+    elif mode == 'preload':
+        state.start(background=False)
+    return state
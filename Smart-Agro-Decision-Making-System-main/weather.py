@@ -0,0 +1,392 @@
+"""
+7-day district weather forecasts.
+
+WeatherService sits between the routes and a WeatherProvider. It caches each
+district's forecast for `ttl` seconds; for a further `stale_ttl` seconds the old
+forecast is still served while a refresh runs in the background, so only a
+district's very first request waits on the provider. Providers are asyncio
+coroutines run on one background event loop, which lets many districts be
+fetched concurrently over a small pool of keep-alive connections.
+
+Set SMART_AGRO_WEATHER_URL to an HTTP endpoint answering
+GET <url>?state=..&district=.. with {"days": [{"date": "YYYY-MM-DD",
+"condition": "Rainy", "high": 31, "low": 23, "rain_chance": 80,
+"wind_speed": "5-15"}, ...]}. Without it the mock provider generates forecasts.
+
+ReplayServer serves recorded forecasts in that format for tests and benchmarks.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import ssl
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlencode, urlsplit, parse_qs
+
+from rainfall_store import normalize_key
+
+DEFAULT_TTL = 30 * 60
+DEFAULT_STALE_TTL = 6 * 60 * 60
+FORECAST_DAYS = 7
+
+# Bootstrap icon names for the conditions providers report
+ICONS = {
+    'sunny': 'sun',
+    'clear': 'sun',
+    'partly cloudy': 'cloud-sun',
+    'cloudy': 'cloud',
+    'rainy': 'cloud-rain',
+    'drizzle': 'cloud-drizzle',
+    'thunderstorm': 'cloud-lightning-rain',
+}
+
+logger = logging.getLogger(__name__)
+
+
+def district_key(state, district):
+    return normalize_key(state), normalize_key(district)
+
+
+def display_forecast(days):
+    """Provider forecast days in the shape the disaster template renders"""
+    return [{
+        'date': date.fromisoformat(day['date']).strftime('%a, %b %d'),
+        'condition': day['condition'],
+        'icon': ICONS.get(str(day['condition']).lower(), 'cloud-sun'),
+        'high': day['high'],
+        'low': day['low'],
+        'rain_chance': day['rain_chance'],
+        'wind_speed': day['wind_speed'],
+    } for day in days]
+
+
+class WeatherProvider:
+    """Source of forecasts; subclasses implement fetch as a coroutine"""
+
+    async def fetch(self, state, district):
+        """List of forecast days for one district"""
+        raise NotImplementedError
+
+    async def fetch_many(self, districts):
+        """Forecasts for many (state, district) pairs, fetched concurrently; failures are exceptions in the list"""
+        return await asyncio.gather(*(self.fetch(state, district) for state, district in districts),
+                                    return_exceptions=True)
+
+    async def close(self):
+        pass
+
+
+def mock_forecast(start=None):
+    """Generated forecast: sunny with rain every third day"""
+    start = start or date.today()
+    days = []
+    for i in range(FORECAST_DAYS):
+        rainy = i % 3 == 2
+        days.append({
+            'date': (start + timedelta(days=i)).isoformat(),
+            'condition': 'Rainy' if rainy else 'Sunny',
+            'high': 32 + random.randint(-2, 3),
+            'low': 22 + random.randint(-2, 3),
+            'rain_chance': 70 + random.randint(0, 25) if rainy else 10,
+            'wind_speed': f"{5 + random.randint(0, 10)}-{15 + random.randint(0, 10)}"
+        })
+    return days
+
+
+class MockWeatherProvider(WeatherProvider):
+    """Generated forecasts, for running without a weather API"""
+
+    async def fetch(self, state, district):
+        return mock_forecast()
+
+
+class HttpWeatherProvider(WeatherProvider):
+    """
+    JSON-over-HTTP/1.1 provider with a pool of up to pool_size keep-alive
+    connections, written on asyncio streams so no HTTP client library is needed.
+    """
+
+    def __init__(self, url, pool_size=8, timeout=5.0):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f'Unsupported weather URL {url!r}')
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.ssl = ssl.create_default_context() if parts.scheme == 'https' else None
+        self.path = parts.path or '/'
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.connections_opened = 0
+        self._idle = []
+        self._slots = None
+
+    async def _open(self):
+        self.connections_opened += 1
+        return await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+
+    async def _request(self, query):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.pool_size)
+        async with self._slots:
+            reused = bool(self._idle)
+            connection = self._idle.pop() if reused else await self._open()
+            try:
+                status, headers, body = await self._exchange(connection, query)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                connection[1].close()
+                if not reused:
+                    raise
+                # The server closed an idle connection; retry once on a fresh one
+                connection = await self._open()
+                try:
+                    status, headers, body = await self._exchange(connection, query)
+                except BaseException:
+                    connection[1].close()
+                    raise
+            except BaseException:
+                connection[1].close()
+                raise
+            if headers.get('connection', '').lower() == 'close':
+                connection[1].close()
+            else:
+                self._idle.append(connection)
+        if status != 200:
+            raise ConnectionError(f'Weather provider returned HTTP {status}')
+        return json.loads(body)
+
+    async def _exchange(self, connection, query):
+        reader, writer = connection
+        writer.write((
+            f'GET {self.path}?{query} HTTP/1.1\r\n'
+            f'Host: {self.host}\r\n'
+            'Accept: application/json\r\n'
+            'Connection: keep-alive\r\n\r\n'
+        ).encode('ascii'))
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError('Connection closed by weather provider')
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if 'content-length' in headers:
+            body = await reader.readexactly(int(headers['content-length']))
+        elif headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            body = b''.join(chunks)
+        else:
+            body = await reader.read()
+            headers['connection'] = 'close'
+        return status, headers, body
+
+    async def fetch(self, state, district):
+        query = urlencode({'state': state, 'district': district})
+        payload = await asyncio.wait_for(self._request(query), self.timeout)
+        return payload['days']
+
+    async def close(self):
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
+
+
+class WeatherService:
+    """Synchronous, cached front end over a provider running on a background event loop"""
+
+    def __init__(self, provider, ttl=DEFAULT_TTL, stale_ttl=DEFAULT_STALE_TTL, wait_seconds=2.0,
+                 clock=time.monotonic):
+        self.provider = provider
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.wait_seconds = wait_seconds
+        self.clock = clock
+        self._cache = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._reset_loop()
+
+    def _reset_loop(self):
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+    def _event_loop(self):
+        if self._loop is None:
+            with self._loop_lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name='weather-loop', daemon=True).start()
+                    self._loop = loop
+        return self._loop
+
+    def _submit(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._event_loop())
+
+    def _store(self, key, days):
+        with self._lock:
+            self._cache[key] = (self.clock(), days)
+
+    def _refresh(self, state, district):
+        """Refetch one district in the background unless a refresh is already running"""
+        key = district_key(state, district)
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def done(future):
+            with self._lock:
+                self._refreshing.discard(key)
+            if future.exception() is None:
+                self._store(key, future.result())
+            else:
+                logger.warning('Weather refresh for %s failed: %s', key, future.exception())
+
+        self._submit(self.provider.fetch(state, district)).add_done_callback(done)
+
+    def forecast(self, state, district):
+        """
+        Forecast days for a district, or None if the provider could not answer in
+        wait_seconds and nothing is cached. Stale entries are returned immediately
+        and refreshed in the background.
+        """
+        key = district_key(state, district)
+        entry = self._cache.get(key)
+        if entry is not None:
+            age = self.clock() - entry[0]
+            if age < self.ttl:
+                return entry[1]
+            if age < self.ttl + self.stale_ttl:
+                self._refresh(state, district)
+                return entry[1]
+
+        future = self._submit(self.provider.fetch(state, district))
+        try:
+            days = future.result(timeout=self.wait_seconds)
+        except Exception as e:
+            future.cancel()
+            logger.warning('Weather forecast for %s unavailable: %s', key, e)
+            return None
+        self._store(key, days)
+        return days
+
+    def prefetch(self, districts, timeout=60.0):
+        """Fetch many (state, district) pairs concurrently and cache them; returns the failure count"""
+        districts = list(districts)
+        results = self._submit(self.provider.fetch_many(districts)).result(timeout=timeout)
+        failures = 0
+        for (state, district), days in zip(districts, results):
+            if isinstance(days, BaseException):
+                failures += 1
+            else:
+                self._store(district_key(state, district), days)
+        return failures
+
+    def stats(self):
+        return {'districts': len(self._cache), 'refreshing': len(self._refreshing)}
+
+
+def load_recordings(path):
+    """Recorded forecasts from a JSON object of {"STATE|DISTRICT": [days...]}"""
+    with open(path, encoding='utf-8') as f:
+        raw = json.load(f)
+    return {district_key(*name.split('|', 1)): days for name, days in raw.items()}
+
+
+class ReplayServer:
+    """
+    Local HTTP/1.1 server that answers forecast requests from recordings keyed by
+    (state, district). Runs in a background thread; use as a context manager.
+    """
+
+    def __init__(self, recordings, latency=0.0, host='127.0.0.1', port=0):
+        self.recordings = {district_key(*key): days for key, days in recordings.items()}
+        self.latency = latency
+        self.requests = 0
+        self.connections = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                server.connections += 1
+
+            def do_GET(self):
+                server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                query = parse_qs(urlsplit(self.path).query)
+                key = district_key(query.get('state', [''])[0], query.get('district', [''])[0])
+                days = server.recordings.get(key)
+                body = json.dumps({'days': days} if days is not None else {'error': 'unknown district'}).encode()
+                self.send_response(200 if days is not None else 404)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}/forecast'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='weather-replay', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def default_provider():
+    url = os.environ.get('SMART_AGRO_WEATHER_URL')
+    return HttpWeatherProvider(url) if url else MockWeatherProvider()
+
+
+weather_service = WeatherService(default_provider())
+
+
+def _reset_after_fork():
+    # The event loop thread does not survive fork; start a new loop on demand
+    weather_service._reset_loop()
+    if isinstance(weather_service.provider, HttpWeatherProvider):
+        weather_service.provider._idle = []
+        weather_service.provider._slots = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)